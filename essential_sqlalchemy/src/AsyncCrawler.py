@@ -0,0 +1,327 @@
+# Work with params of project
+from src.Params import Params
+
+# For work with TOR
+from src.TorCircuitPool import TorCircuitPool, Circuit
+
+# For limit rate of requests
+from src.RateLimiter import RateLimiter
+
+# For retries of requests
+from src.Retry import RetryPolicy, RetryableError, PermanentError
+
+# For cache of HTTP responses
+from src.ResponseCache import ResponseCache, CacheMissError
+
+# For work with asynchronous HTTP queries
+import asyncio
+import aiohttp
+from aiohttp_socks import ProxyConnector, ProxyError, ProxyConnectionError, ProxyTimeoutError
+
+# Work with parallelism
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# For work with date-time
+import time
+
+# For log of errors of handlers
+import logging
+
+# For work with data type
+from typing import Callable, Iterable
+
+# For monitoring cycle
+from tqdm.notebook import tqdm as tqdm_notebook
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncCrawler:
+    '''
+    Асинхронный обход URL с ограничением количества одновременных запросов.
+    '''
+    def __init__(
+        self,
+        concurrency: int = None,
+        timeout: int = 10,
+        headers: dict = None,
+        proxies: str = None,
+        circuit_pool: TorCircuitPool = None,
+        rate_limiter: RateLimiter = None,
+        retry_policy: RetryPolicy = None,
+        response_cache: ResponseCache = None
+    ) -> None:
+        '''
+        Init.
+
+        Parameters
+        ----------
+        concurrency : int, optional
+            Count of requests in flight, by default Params.crawl_concurrency.
+        timeout : int, optional
+            Timeout of request in seconds, by default 10.
+        headers : dict, optional
+            HTTP headers, by default None.
+        proxies : str, optional
+            Proxy url, by default Params.proxies.
+        circuit_pool : TorCircuitPool, optional
+            Pool of TOR circuits, every request gets circuit from pool, by default None (proxies).
+        rate_limiter : RateLimiter, optional
+            Limits of requests by hosts and circuits (waiting does not block other requests), by default None.
+        retry_policy : RetryPolicy, optional
+            Retries with backoff and breakers of hosts, by default RetryPolicy().
+        response_cache : ResponseCache, optional
+            Cache of HTTP responses, by default None (without cache).
+        '''
+        self.params = Params()
+        self.concurrency = concurrency or self.params.crawl_concurrency
+        self.timeout = timeout
+        self.headers = headers
+        self.proxies = self.params.proxies if proxies is None else proxies
+        self.circuit_pool = circuit_pool
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.response_cache = response_cache
+        self.sessions = {}
+        self.retired_sessions = []
+        self.stats = {}
+
+    def get_session(self, circuit: Circuit = None) -> aiohttp.ClientSession:
+        '''
+        Get session for circuit: one session per circuit keeps connections alive.
+        Session of rotated circuit is closed after timeout (when its requests are finished).
+
+        Parameters
+        ----------
+        circuit : Circuit, optional
+            Circuit of TOR, by default None (proxies).
+
+        Returns
+        -------
+        aiohttp.ClientSession
+            Session.
+        '''
+        key = circuit.number if circuit else None
+        proxies = circuit.proxies if circuit else self.proxies
+        if key in self.sessions:
+            session_proxies, session = self.sessions[key]
+            if session_proxies == proxies:
+                return session
+            self.retired_sessions.append(session)
+            asyncio.get_running_loop().call_later(self.timeout, lambda: asyncio.ensure_future(session.close()))
+        if proxies:
+            connector = ProxyConnector.from_url(proxies, limit=self.concurrency)
+        else:
+            connector = aiohttp.TCPConnector(limit=self.concurrency)
+        session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+        self.sessions[key] = (proxies, session)
+        return session
+
+    async def fetch(self, url: str) -> bytes:
+        '''
+        Get content of url by retry policy (from cache only in replay mode).
+
+        Parameters
+        ----------
+        url : str
+            Url.
+
+        Returns
+        -------
+        bytes
+            Content of response.
+
+        Raises
+        ------
+        PermanentError
+            Error is permanent (404, 410) or attempts are exhausted.
+        CacheMissError
+            Response is not in cache in replay mode.
+        '''
+        if self.response_cache and self.response_cache.replay:
+            content = self.response_cache.get(url)
+            if content is None:
+                raise CacheMissError(url)
+            return content
+
+        async def attempt():
+            circuit = self.circuit_pool.acquire() if self.circuit_pool else None
+            if self.rate_limiter:
+                await self.rate_limiter.acquire_async(url, circuit)
+            session = self.get_session(circuit)
+            try:
+                self.stats['requests'] += 1
+                async with session.get(url, headers=self.headers) as r:
+                    content = await r.read()
+                    status = r.status
+            except (
+                aiohttp.ClientError, asyncio.TimeoutError,
+                ProxyError, ProxyConnectionError, ProxyTimeoutError
+            ) as e:
+                self.stats['errors'] += 1
+                if circuit:
+                    self.circuit_pool.report(circuit, success=False)
+                raise RetryableError(f'{type(e).__name__}: {e}') from e
+            blocked = status in self.params.blocked_status_codes
+            if circuit:
+                self.circuit_pool.report(circuit, success=not blocked, blocked=blocked)
+            if self.rate_limiter:
+                self.rate_limiter.report(url, circuit, blocked=blocked)
+            if blocked:
+                self.stats['blocked'] += 1
+            self.retry_policy.check_status(status)
+            return content
+        return await self.retry_policy.run_async(url, attempt)
+
+    async def worker(
+        self,
+        queue: asyncio.Queue,
+        get_url: Callable,
+        handle: Callable,
+        handle_dead_letter: Callable,
+        writer: ThreadPoolExecutor,
+        progress: tqdm_notebook
+    ) -> None:
+        '''
+        Get items from queue, fetch them and pass content to handler.
+        Response is put into cache only after handler has parsed it.
+
+        Parameters
+        ----------
+        queue : asyncio.Queue
+            Queue of items, None - stop.
+        get_url : Callable
+            Function item -> url.
+        handle : Callable
+            Function (item, content) -> None, executed in writer thread.
+        handle_dead_letter : Callable
+            Function (item, PermanentError) -> None, executed in writer thread.
+        writer : ThreadPoolExecutor
+            Executor for parsing and writing into data base.
+        progress : tqdm_notebook
+            Progress bar.
+        '''
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            url = get_url(item)
+            try:
+                content = await self.fetch(url)
+            except CacheMissError:
+                self.stats['missed'] += 1
+                progress.update(1)
+                continue
+            except PermanentError as e:
+                self.stats['dead'] += 1
+                if handle_dead_letter:
+                    await loop.run_in_executor(writer, handle_dead_letter, item, e)
+                progress.update(1)
+                continue
+            try:
+                await loop.run_in_executor(writer, handle, item, content)
+                self.stats['items'] += 1
+            except Exception as e:
+                self.stats['failed'] += 1
+                self.stats['last_error'] = f'{type(e).__name__}: {e}'
+                logger.exception('Handler of %s failed', url)
+                progress.update(1)
+                continue
+            if self.response_cache and not self.response_cache.replay:
+                await loop.run_in_executor(writer, self.response_cache.put, url, content)
+            progress.update(1)
+
+    async def crawl_async(
+        self,
+        items: Iterable,
+        get_url: Callable,
+        handle: Callable,
+        handle_dead_letter: Callable = None
+    ) -> dict:
+        '''
+        Crawl items: requests are limited by concurrency, results are streamed into handler.
+
+        Parameters
+        ----------
+        items : Iterable
+            Items for crawl (ids, rectangles and etc.).
+        get_url : Callable
+            Function item -> url.
+        handle : Callable
+            Function (item, content) -> None, executed in one writer thread.
+        handle_dead_letter : Callable, optional
+            Function (item, PermanentError) -> None, executed in one writer thread, by default None.
+
+        Returns
+        -------
+        dict
+            Statistics of crawl.
+        '''
+        self.stats = {
+            'items': 0, 'failed': 0, 'dead': 0, 'missed': 0, 'requests': 0, 'errors': 0, 'blocked': 0, 'last_error': None
+            }
+        start = time.perf_counter()
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        progress = tqdm_notebook(total=len(items) if hasattr(items, '__len__') else None)
+        with ThreadPoolExecutor(max_workers=1) as writer:
+            workers = [
+                asyncio.create_task(self.worker(queue, get_url, handle, handle_dead_letter, writer, progress))
+                for _ in range(self.concurrency)
+                ]
+            try:
+                for item in items:
+                    await queue.put(item)
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+            finally:
+                for session in [session for _, session in self.sessions.values()] + self.retired_sessions:
+                    if not session.closed:
+                        await session.close()
+                self.sessions, self.retired_sessions = {}, []
+        progress.close()
+        self.stats['seconds'] = time.perf_counter() - start
+        self.stats['items_per_second'] = self.stats['items'] / self.stats['seconds']
+        return self.stats
+
+    def crawl(
+        self,
+        items: Iterable,
+        get_url: Callable,
+        handle: Callable,
+        handle_dead_letter: Callable = None
+    ) -> dict:
+        '''
+        Crawl items from synchronous code (also from notebook with running event loop).
+
+        Parameters
+        ----------
+        items : Iterable
+            Items for crawl (ids, rectangles and etc.).
+        get_url : Callable
+            Function item -> url.
+        handle : Callable
+            Function (item, content) -> None, executed in one writer thread.
+        handle_dead_letter : Callable, optional
+            Function (item, PermanentError) -> None, executed in one writer thread, by default None.
+
+        Returns
+        -------
+        dict
+            Statistics of crawl.
+        '''
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.crawl_async(items, get_url, handle, handle_dead_letter))
+
+# Event loop of notebook is running, so crawl in separate thread
+        result = {}
+        thread = threading.Thread(
+            target=lambda: result.update(asyncio.run(self.crawl_async(items, get_url, handle, handle_dead_letter)))
+            )
+        thread.start()
+        thread.join()
+        return result
@@ -0,0 +1,223 @@
+# Work with params of project
+from src.Params import Params
+
+# Work with data base
+from src.ORM import ORM
+
+# Work with ORM и SQL
+from sqlalchemy.ext.declarative.api import DeclarativeMeta
+from sqlalchemy.exc import IntegrityError
+
+# Work with parallelism
+import threading
+import queue
+import atexit
+
+# For work with date-time
+import time
+
+# Flush buffer and stop writer
+FLUSH = object()
+STOP = object()
+
+
+class BatchWriter:
+    '''
+    Фоновая пакетная запись: записи всех потоков собираются в очередь
+    и пишутся executemany одной транзакцией на пакет.
+    '''
+    def __init__(self, orm: ORM = None, batch_size: int = None, flush_interval: float = None) -> None:
+        '''
+        Init.
+
+        Parameters
+        ----------
+        orm : ORM, optional
+            Work with data base, by default ORM().
+        batch_size : int, optional
+            Count of rows for flush, by default Params.batch_size.
+        flush_interval : float, optional
+            Seconds between flushes, by default Params.batch_flush_interval.
+        '''
+        self.params = Params()
+        self.orm = orm or ORM()
+        self.batch_size = batch_size or self.params.batch_size
+        self.flush_interval = flush_interval or self.params.batch_flush_interval
+        self.queue = queue.Queue()
+        self.stats = {
+            'rows': 0,
+            'failed_rows': 0,
+            'batches': 0,
+            'write_seconds': 0.0,
+            'lock_wait_seconds': 0.0,
+            'last_error': None
+            }
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def put(self, records: list, table: DeclarativeMeta, replace: bool = False, ignore: bool = False) -> None:
+        '''
+        Put values into queue of writer.
+
+        Parameters
+        ----------
+        records : list
+            list of values for insert into table.
+        table : DeclarativeMeta
+            Table for insert values.
+        replace : bool, optional
+            Replace rows with the same primary key, by default False.
+        ignore : bool, optional
+            Skip rows with the same primary key, by default False.
+        '''
+        self.queue.put(((table, 'OR REPLACE' if replace else 'OR IGNORE' if ignore else None), records))
+
+    def flush(self) -> None:
+        '''
+        Write all values from queue and wait for it.
+        '''
+        if self.thread.is_alive():
+            self.queue.put(FLUSH)
+# Wait while writer is alive: values of stopped writer are written below
+            with self.queue.all_tasks_done:
+                while self.queue.unfinished_tasks and self.thread.is_alive():
+                    self.queue.all_tasks_done.wait(self.flush_interval)
+        self.write_queue()
+
+    def close(self) -> None:
+        '''
+        Write all values from queue and stop writer.
+        '''
+        if self.thread.is_alive():
+            self.queue.put(STOP)
+            self.thread.join()
+        self.write_queue()
+
+    def write_queue(self) -> None:
+        '''
+        Write values left in queue in this thread (writer is stopped).
+        '''
+        if self.thread.is_alive():
+            return
+        buffer = {}
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, tuple):
+                table, records = item
+                buffer.setdefault(table, []).extend(records)
+            self.queue.task_done()
+        if buffer:
+            self.write(buffer)
+
+    def run(self) -> None:
+        '''
+        Loop of writer: flush by size of buffer or by time.
+        '''
+        buffer, rows_number, pending = {}, 0, 0
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self.queue.get(timeout=max(0.0, last_flush + self.flush_interval - time.monotonic()))
+                pending += 1
+            except queue.Empty:
+                item = FLUSH
+            if isinstance(item, tuple):
+                table, records = item
+                buffer.setdefault(table, []).extend(records)
+                rows_number += len(records)
+            if item is FLUSH or item is STOP or rows_number >= self.batch_size:
+                try:
+                    self.write(buffer)
+                except Exception as e:
+# Writer must not stop: rows of buffer are counted as failed
+                    self.stats['failed_rows'] += rows_number
+                    self.stats['last_error'] = f'{type(e).__name__}: {e}'
+                buffer, rows_number = {}, 0
+                last_flush = time.monotonic()
+                for _ in range(pending):
+                    self.queue.task_done()
+                pending = 0
+            if item is STOP:
+                return
+
+    def write(self, buffer: dict) -> None:
+        '''
+        Write buffer: one transaction with executemany for every table (and set of columns).
+
+        Parameters
+        ----------
+        buffer : dict
+            Values by tables (and prefix of insert).
+        '''
+        groups = {}
+        for (table, prefix), records in buffer.items():
+            for record in records:
+                try:
+                    groups.setdefault((table, prefix, tuple(sorted(record))), []).append(record)
+                except TypeError as e:
+                    self.stats['failed_rows'] += 1
+                    self.stats['last_error'] = f'{type(e).__name__}: {e}'
+        for (table, prefix, _), records in groups.items():
+            start = time.perf_counter()
+            try:
+                self.write_batch(table, records, prefix)
+            except IntegrityError:
+# One duplicate must not drop batch: write rows one by one
+                for record in records:
+                    try:
+                        self.write_batch(table, [record], prefix)
+                    except Exception as e:
+                        self.stats['rows'] -= 1
+                        self.stats['failed_rows'] += 1
+                        self.stats['last_error'] = f'{type(e).__name__}: {e}'
+            except Exception as e:
+# Errors of driver and of records (not only of sqlalchemy) drop only this group
+                self.stats['rows'] -= len(records)
+                self.stats['failed_rows'] += len(records)
+                self.stats['last_error'] = f'{type(e).__name__}: {e}'
+            self.stats['rows'] += len(records)
+            self.stats['write_seconds'] += time.perf_counter() - start
+
+    def write_batch(self, table: DeclarativeMeta, records: list, prefix: str = None) -> None:
+        '''
+        Write values into table in one transaction.
+
+        Parameters
+        ----------
+        table : DeclarativeMeta
+            Table for insert values.
+        records : list
+            list of values for insert into table.
+        prefix : str, optional
+            Prefix of insert (OR REPLACE, OR IGNORE), by default None.
+        '''
+        stmt = table.__table__.insert()
+        if prefix:
+            stmt = stmt.prefix_with(prefix)
+        with self.orm.engine.begin() as conn:
+            if conn.dialect.name == 'sqlite':
+# Take lock of writer at start of transaction for measure of waiting
+                start = time.perf_counter()
+                conn.execute('BEGIN IMMEDIATE')
+                self.stats['lock_wait_seconds'] += time.perf_counter() - start
+            conn.execute(stmt, records)
+        self.stats['batches'] += 1
+
+    def get_stats(self) -> dict:
+        '''
+        Get statistics of writer.
+
+        Returns
+        -------
+        dict
+            Count of rows, failed rows and batches, rows per second, time of waiting of lock, state of writer.
+        '''
+        stats = dict(self.stats)
+        stats['rows_per_second'] = stats['rows'] / stats['write_seconds'] if stats['write_seconds'] else None
+        stats['queue_size'] = self.queue.qsize()
+        stats['alive'] = self.thread.is_alive()
+        return stats
@@ -0,0 +1,183 @@
+# Work with params of project
+from src.Params import Params
+
+# Work with compression
+import zlib
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Work with operating system
+import os
+
+# Work with parallelism
+import threading
+
+# For work with date-time
+import time
+
+# Magic number of zstd frame
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+class ContentStore:
+    '''
+    Сжатое хранение исходных ответов (zlib или zstd со словарем, обученным на страницах hh.ru).
+    Кодек определяется по заголовку данных, поэтому читаются данные любого кодека.
+    '''
+    def __init__(self, codec: str = None, level: int = None, dictionary_path: str = None) -> None:
+        '''
+        Init.
+
+        Parameters
+        ----------
+        codec : str, optional
+            Codec of compression: zlib or zstd, by default Params.content_codec.
+        level : int, optional
+            Level of compression, by default Params.content_level.
+        dictionary_path : str, optional
+            Path of zstd dictionary, by default Params.content_dictionary_path (used if file exists).
+        '''
+        self.params = Params()
+        self.codec = codec or self.params.content_codec
+        self.level = level or self.params.content_level
+        self.dictionary_path = dictionary_path or self.params.content_dictionary_path
+        if self.codec not in ['zlib', 'zstd']:
+            raise ValueError(f'Unknown codec of content store: {self.codec}')
+        if self.codec == 'zstd' and zstandard is None:
+            raise ImportError('zstandard is not installed')
+        self.dictionary = None
+        self.local = threading.local()
+        if zstandard and os.path.exists(self.dictionary_path):
+            with open(self.dictionary_path, 'rb') as f:
+                self.dictionary = zstandard.ZstdCompressionDict(f.read())
+
+    def compress(self, content: bytes) -> bytes:
+        '''
+        Compress content.
+
+        Parameters
+        ----------
+        content : bytes
+            Content of response.
+
+        Returns
+        -------
+        bytes
+            Compressed content.
+        '''
+        if self.codec == 'zstd':
+            return self.get_zstd('compressor').compress(content)
+        return zlib.compress(content, self.level)
+
+    def decompress(self, data: bytes) -> bytes:
+        '''
+        Decompress content of any codec.
+
+        Parameters
+        ----------
+        data : bytes
+            Compressed content.
+
+        Returns
+        -------
+        bytes
+            Content of response.
+        '''
+        if data[:4] == ZSTD_MAGIC:
+            if zstandard is None:
+                raise ImportError('zstandard is not installed')
+            return self.get_zstd('decompressor').decompress(data)
+        return zlib.decompress(data)
+
+    def get_zstd(self, kind: str) -> object:
+        '''
+        Get zstd compressor or decompressor of thread (they are not thread safe, and creation with dictionary is expensive).
+
+        Parameters
+        ----------
+        kind : str
+            compressor or decompressor.
+
+        Returns
+        -------
+        object
+            Compressor or decompressor.
+        '''
+        if not hasattr(self.local, kind):
+            if kind == 'compressor':
+                setattr(self.local, kind, zstandard.ZstdCompressor(level=self.level, dict_data=self.dictionary))
+            else:
+                setattr(self.local, kind, zstandard.ZstdDecompressor(dict_data=self.dictionary))
+        return getattr(self.local, kind)
+
+    def decode(self, data: bytes) -> str:
+        '''
+        Decompress content and decode it into text.
+
+        Parameters
+        ----------
+        data : bytes
+            Compressed content.
+
+        Returns
+        -------
+        str
+            Text of page.
+        '''
+        return self.decompress(data).decode('utf-8', errors='replace')
+
+    def train_dictionary(self, content_list: list, size: int = None) -> None:
+        '''
+        Train zstd dictionary on pages and save it into dictionary_path.
+        Data compressed with dictionary can be read only with the same dictionary.
+
+        Parameters
+        ----------
+        content_list : list
+            Contents of responses (bytes).
+        size : int, optional
+            Size of dictionary in bytes, by default Params.content_dictionary_size.
+        '''
+        if zstandard is None:
+            raise ImportError('zstandard is not installed')
+        self.dictionary = zstandard.train_dictionary(size or self.params.content_dictionary_size, content_list)
+        self.local = threading.local()
+        with open(self.dictionary_path, 'wb') as f:
+            f.write(self.dictionary.as_bytes())
+
+    def benchmark(self, content_list: list) -> dict:
+        '''
+        Benchmark size ratio and cost of write and read of codecs on pages.
+
+        Parameters
+        ----------
+        content_list : list
+            Contents of responses (bytes).
+
+        Returns
+        -------
+        dict
+            Ratio of sizes, milliseconds of compression and decompression of page by codec.
+        '''
+        stores = {'zlib': ContentStore(codec='zlib', level=self.level, dictionary_path=self.dictionary_path)}
+        if zstandard:
+            level = self.level if self.codec == 'zstd' else self.params.content_zstd_level
+            stores['zstd'] = ContentStore(codec='zstd', level=level, dictionary_path=self.dictionary_path)
+        size = sum(len(content) for content in content_list)
+        result = {}
+        for codec, store in stores.items():
+            start = time.perf_counter()
+            data_list = [store.compress(content) for content in content_list]
+            write_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            for data in data_list:
+                store.decompress(data)
+            read_seconds = time.perf_counter() - start
+            result[codec] = {
+                'ratio': size / sum(len(data) for data in data_list),
+                'write_ms': write_seconds * 1000 / len(content_list),
+                'read_ms': read_seconds * 1000 / len(content_list)
+                }
+        return result
@@ -1,11 +1,22 @@
 # For work with spatial data
+import shapely
 from shapely.geometry import Polygon, MultiPolygon
+# For vectorized computations
+import numpy as np
+# For benchmark
+import time
+# For rounding
+import math
 
 # Work with params of project
 from src.Params import Params
 
 # For work with HTML-queries
 import requests
+import json
+
+# For cache of HTTP responses
+from src.ResponseCache import ResponseCache, CacheMissError
 # For generate fake user agent
 from fake_useragent import UserAgent
 ua = UserAgent(verify_ssl=False, cache=True)
@@ -17,7 +28,8 @@ class Geo():
     '''
     def __init__(
         self,
-        city='Москва'
+        city='Москва',
+        response_cache: ResponseCache = None
     ):
         '''
         Init.
@@ -26,9 +38,12 @@ class Geo():
         ----------
         city : str, optional
             Name of city, by default 'Москва'
+        response_cache : ResponseCache, optional
+            Cache of HTTP responses, by default None (without cache).
         '''
         self.params = Params()
         self.city = city
+        self.response_cache = response_cache
 # In degree 111,11 кm, 325 metrs - width of rectangle, 180 metrs - heigth of rectangle.
         self.dlon = 0.325/111.11
         self.dlat = 0.180/111.11
@@ -43,11 +58,22 @@ class Geo():
             Tuple of the city data.
         '''
         params = {'format': 'json', 'limit': '1', 'polygon_geojson': '10', 'state': self.city}
-        city = requests.get(self.params.osm_url, params=params)
+# Responses are read from cache only in replay mode
+        replay = self.response_cache is not None and self.response_cache.replay
+        content = self.response_cache.get(self.params.osm_url, params) if replay else None
+        if content is None:
+            if replay:
+                raise CacheMissError(self.params.osm_url)
+            city = requests.get(self.params.osm_url, params=params)
+            city.raise_for_status()
+            content = city.content
+            if self.response_cache:
+                self.response_cache.put(self.params.osm_url, content, params)
+        city_json = json.loads(content)
 
 # Get min and max coordinates
-        min_coordinates = city.json()[0]['boundingbox'][0::2]
-        max_coordinates = city.json()[0]['boundingbox'][1::2]
+        min_coordinates = city_json[0]['boundingbox'][0::2]
+        max_coordinates = city_json[0]['boundingbox'][1::2]
 
 # Get polygon
         polygon_rectangle = Polygon([
@@ -56,7 +82,7 @@ class Geo():
             (float(max_coordinates[1]), float(max_coordinates[0])),
             (float(max_coordinates[1]), float(min_coordinates[0]))
         ])
-        return (city.json(), polygon_rectangle, min_coordinates, max_coordinates)
+        return (city_json, polygon_rectangle, min_coordinates, max_coordinates)
 
     def get_rectangle(self, longitude: float, latitude: float) -> Polygon:
         '''
@@ -84,9 +110,33 @@ class Geo():
             ])
         return polygon_rectangle
 
-    def generate_rectangle(self) -> list:
+    def get_city_multipolygon(self, city_geojson: list) -> MultiPolygon:
         '''
-        Generation of polygons what will be fill polygon of the city.
+        Multipolygon of the city from geojson.
+
+        Parameters
+        ----------
+        city_geojson : list
+            Response of OSM with geojson of the city.
+
+        Returns
+        -------
+        MultiPolygon
+            Multipolygon of the city.
+        '''
+        return MultiPolygon(
+            [Polygon([tuple(j) for j in i[0]]) for i in city_geojson[0]['geojson']['coordinates']]
+            )
+
+    def generate_rectangle_loop(self, city_data: tuple = None) -> list:
+        '''
+        Generation of polygons what will be fill polygon of the city (cell by cell).
+        Reference implementation for generate_rectangle.
+
+        Parameters
+        ----------
+        city_data : tuple, optional
+            Result of get_city_polygon, by default None (request to OSM).
 
         Returns
         -------
@@ -95,10 +145,8 @@ class Geo():
         '''
 
 # Get city data
-        city_geojson, polygon_rectangle, min_coordinates, max_coordinates = self.get_city_polygon()
-        city_multipolygon = MultiPolygon(
-            [Polygon([tuple(j) for j in i[0]]) for i in city_geojson[0]['geojson']['coordinates']]
-            )
+        city_geojson, polygon_rectangle, min_coordinates, max_coordinates = city_data or self.get_city_polygon()
+        city_multipolygon = self.get_city_multipolygon(city_geojson)
         city_boundary = [
             list(coordinates) for coordinates in list(polygon_rectangle.boundary.coords)
             ]
@@ -119,3 +167,121 @@ class Geo():
                 if current_rectangle.intersects(city_multipolygon):
                     rectangle_all.append(current_rectangle)
         return rectangle_all
+
+    def generate_rectangle(self, city_data: tuple = None, level: int = 0) -> list:
+        '''
+        Generation of polygons what will be fill polygon of the city.
+        Bounds of cells are computed with numpy, polygons are built in bulk
+        and filtered by STRtree query against the city multipolygon.
+
+        Parameters
+        ----------
+        city_data : tuple, optional
+            Result of get_city_polygon, by default None (request to OSM).
+        level : int, optional
+            Level of tiles: side of tile is 2 ** level sides of base rectangle, by default 0.
+            Tiles of level above 0 cover the whole rectangle of the city.
+
+        Returns
+        -------
+        list
+            List with bounds of polygon.
+        '''
+
+# Get city data
+        city_geojson, polygon_rectangle, min_coordinates, max_coordinates = city_data or self.get_city_polygon()
+        city_multipolygon = self.get_city_multipolygon(city_geojson)
+        city_boundary = np.array(polygon_rectangle.boundary.coords)
+        dlon, dlat = self.dlon * 2 ** level, self.dlat * 2 ** level
+
+        rounding = round if level <= 0 else math.ceil
+        rows_number = rounding((city_boundary[1][1] - city_boundary[0][1]) / dlat)
+        columns_number = rounding((city_boundary[3][0] - city_boundary[0][0]) / dlon)
+        if rows_number <= 0 or columns_number <= 0:
+            return []
+
+# Cumulative sum repeats float additions of the cell by cell pass, so the cells are the same
+        latitudes = np.cumsum(np.r_[city_boundary[0][1] - dlat, np.full(rows_number, dlat)])[1:]
+        longitudes = np.cumsum(np.r_[city_boundary[0][0], np.full(columns_number - 1, dlon)])
+        longitude, latitude = np.meshgrid(longitudes, latitudes)
+        longitude, latitude = longitude.ravel(), latitude.ravel()
+
+# Vertices of rectangles in the order of get_rectangle
+        coordinates = np.stack([
+            np.stack([longitude, latitude], axis=-1),
+            np.stack([longitude, latitude + dlat], axis=-1),
+            np.stack([longitude + dlon, latitude + dlat], axis=-1),
+            np.stack([longitude + dlon, latitude], axis=-1),
+            np.stack([longitude, latitude], axis=-1)
+            ], axis=1)
+        rectangles = shapely.polygons(coordinates)
+
+# Filter rectangles what intersect the city
+        tree = shapely.STRtree(rectangles)
+        indexes = np.sort(tree.query(city_multipolygon, predicate='intersects'))
+        return list(rectangles[indexes])
+
+    def split_rectangle(self, rectangle: Polygon, city_multipolygon: MultiPolygon = None) -> list:
+        '''
+        Split rectangle into four quadrants (node of quadtree).
+
+        Parameters
+        ----------
+        rectangle : Polygon
+            Rectangle for split.
+        city_multipolygon : MultiPolygon, optional
+            Quadrants what not intersect the city are dropped, by default None.
+
+        Returns
+        -------
+        list
+            List of quadrants.
+        '''
+        min_longitude, min_latitude, max_longitude, max_latitude = rectangle.bounds
+        middle_longitude = (min_longitude + max_longitude) / 2
+        middle_latitude = (min_latitude + max_latitude) / 2
+        quadrants = []
+        for longitude, next_longitude in [(min_longitude, middle_longitude), (middle_longitude, max_longitude)]:
+            for latitude, next_latitude in [(min_latitude, middle_latitude), (middle_latitude, max_latitude)]:
+                quadrants.append(Polygon([
+                    (longitude, latitude),
+                    (longitude, next_latitude),
+                    (next_longitude, next_latitude),
+                    (next_longitude, latitude)
+                    ]))
+        if city_multipolygon is not None:
+            shapely.prepare(city_multipolygon)
+            quadrants = [i for i in quadrants if city_multipolygon.intersects(i)]
+        return quadrants
+
+    def benchmark_generate_rectangle(self, repeat: int = 3, city_data: tuple = None) -> dict:
+        '''
+        Benchmark generate_rectangle against generate_rectangle_loop.
+
+        Parameters
+        ----------
+        repeat : int, optional
+            Count of repeats, by default 3.
+        city_data : tuple, optional
+            Result of get_city_polygon, by default None (request to OSM).
+
+        Returns
+        -------
+        dict
+            Best time of each implementation in seconds, speedup and equality of cells.
+        '''
+        city_data = city_data or self.get_city_polygon()
+        result = {}
+        for name, method in [('loop', self.generate_rectangle_loop), ('vectorized', self.generate_rectangle)]:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                rectangles = method(city_data=city_data)
+                timings.append(time.perf_counter() - start)
+            result[name] = {'seconds': min(timings), 'rectangles': rectangles}
+        result['speedup'] = result['loop']['seconds'] / result['vectorized']['seconds']
+        result['equal'] = (
+            [i.bounds for i in result['loop'].pop('rectangles')]
+            == [i.bounds for i in result['vectorized'].pop('rectangles')]
+            )
+        return result
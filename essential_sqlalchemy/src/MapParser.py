@@ -0,0 +1,159 @@
+# Work with json
+import json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Work with HTML
+from bs4 import BeautifulSoup
+
+# For work with date-time
+from datetime import datetime
+import time
+
+
+class MapParser:
+    '''
+    Разбор ответа карты вакансий hh.ru: JSON читается напрямую (orjson, если установлен)
+    и все вакансии ответа переводятся в колоночный пакет для записи в базу.
+    '''
+    # Columns of map table and path to value in vacancy of response
+    columns = {
+        'vacancy_id': ('id',),
+        'vacancy_name': ('name',),
+        'company_id': ('company', 'id'),
+        'company_name': ('company', 'name'),
+        'longitude': ('address', 'lat'),
+        'latitude': ('address', 'lng'),
+        'compensation_from': ('compensation', 'from'),
+        'compensation_to': ('compensation', 'to'),
+        'compensation_currency_code': ('compensation', 'currencyCode')
+        }
+
+    def __init__(self, backend: str = None) -> None:
+        '''
+        Init.
+
+        Parameters
+        ----------
+        backend : str, optional
+            Backend of json: orjson or json, by default orjson if it is installed.
+        '''
+        self.backend = backend or ('orjson' if orjson else 'json')
+        if self.backend == 'orjson' and orjson is None:
+            raise ImportError('orjson is not installed')
+        self.loads = orjson.loads if self.backend == 'orjson' else json.loads
+
+    def parse(self, content: bytes) -> list:
+        '''
+        Parse response of map.
+
+        Parameters
+        ----------
+        content : bytes
+            Content of response.
+
+        Returns
+        -------
+        list
+            Vacancies from response of map.
+        '''
+        if not content or not content.strip():
+            return []
+        return self.loads(content).get('vacancies') or []
+
+    def parse_html5lib(self, content: bytes) -> list:
+        '''
+        Parse response of map through html5lib (old implementation, kept for benchmark).
+
+        Parameters
+        ----------
+        content : bytes
+            Content of response.
+
+        Returns
+        -------
+        list
+            Vacancies from response of map.
+        '''
+        bsObj = BeautifulSoup(content, 'html5lib')
+        if bsObj.text:
+            return json.loads(bsObj.text)['vacancies'] or []
+        return []
+
+    def get_columns(self, vacancies: list, date_load: datetime = None) -> dict:
+        '''
+        Get columnar batch of vacancies.
+
+        Parameters
+        ----------
+        vacancies : list
+            Vacancies from response of map.
+        date_load : datetime, optional
+            Date of load of batch, by default datetime.utcnow().
+
+        Returns
+        -------
+        dict
+            List of values by column of map table.
+        '''
+        result = {column: [] for column in self.columns}
+        for vacancy in vacancies:
+            for column, (key, *nested_keys) in self.columns.items():
+                value = vacancy.get(key)
+                for nested_key in nested_keys:
+                    value = value.get(nested_key) if value else None
+                result[column].append(value)
+        result['date_load'] = [date_load or datetime.utcnow()] * len(vacancies)
+        return result
+
+    def get_records(self, vacancies: list, date_load: datetime = None) -> list:
+        '''
+        Get vacancies for write into data base (all vacancies of response).
+
+        Parameters
+        ----------
+        vacancies : list
+            Vacancies from response of map.
+        date_load : datetime, optional
+            Date of load of response, by default datetime.utcnow().
+
+        Returns
+        -------
+        list
+            List of values by rows for executemany.
+        '''
+        columns = self.get_columns(vacancies, date_load)
+        return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+    def benchmark(self, content: bytes, repeat: int = 100) -> dict:
+        '''
+        Benchmark parse time of one tile: html5lib against direct json backends.
+
+        Parameters
+        ----------
+        content : bytes
+            Content of response of map.
+        repeat : int, optional
+            Count of repeats, by default 100.
+
+        Returns
+        -------
+        dict
+            Mean seconds per tile of each implementation, count of rows and speedup.
+        '''
+        implementations = [('html5lib', lambda content: self.get_records(self.parse_html5lib(content)))]
+        for backend in ['json', 'orjson']:
+            if backend == 'json' or orjson:
+                parser = MapParser(backend=backend)
+                implementations.append((backend, lambda content, parser=parser: parser.get_records(parser.parse(content))))
+        result = {}
+        for name, method in implementations:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                rows = method(content)
+            result[name] = {'seconds': (time.perf_counter() - start) / repeat, 'rows': len(rows)}
+        for name, _ in implementations[1:]:
+            result[name]['speedup'] = result['html5lib']['seconds'] / result[name]['seconds']
+        return result
@@ -2,20 +2,47 @@
 from src.Params import Params
 
 # Work with datetime
-from datetime import datetime
+from datetime import datetime, timedelta
+
+# For work with data type
+from typing import Iterator, Callable
+
+# Work with parallelism
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+# For work with functions
+import functools
+
+# For benchmark of data base
+import tempfile
+import numpy as np
+
+# For work with date-time
+import time
 
 # Work with ORM и SQL
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.ext.declarative.api import DeclarativeMeta
 from sqlalchemy import (
-    create_engine, distinct, select, func,
+    create_engine, distinct, select, exists, func, or_, and_, cast, case,
     Column, String, INTEGER, FLOAT,
-    DateTime, TEXT,
-    PrimaryKeyConstraint, inspect
+    DateTime, Date, TEXT, LargeBinary, bindparam,
+    PrimaryKeyConstraint, UniqueConstraint, Index, inspect
     )
+from sqlalchemy.sql import table, column
+from sqlalchemy.pool import QueuePool
+from sqlalchemy import event
+
+# Work with geometry
+from shapely.geometry import Polygon
 
 # Work with HTML
-from bs4 import BeautifulSoup
+from src.SkillExtractor import init_process, extract_vacancy_skills, normalize_skill, get_skill_key
+
+# Work with compressed pages
+from src.ContentStore import ContentStore
 
 # Work wih pandas table
 import pandas as pd
@@ -109,6 +136,7 @@ class VacancyHTML(Base):
     __tablename__ = 'vacncy_html'
     __table_args__ = (
         PrimaryKeyConstraint('vacancy_id'),
+        Index('vacncy_html_date_load_idx', 'date_load'),
         {
             'comment': '''Вакансии с HTML'''
         }
@@ -122,8 +150,57 @@ class VacancyHTML(Base):
     html = Column(
         'html',
         TEXT(),
+        nullable=True,
+        comment='Текст HTML (без сжатия)'
+        )
+    content = Column(
+        'content',
+        LargeBinary(),
+        nullable=True,
+        comment='Сжатый исходный ответ'
+        )
+    date_load = Column(
+        'date_load',
+        DateTime(),
         nullable=False,
-        comment='Текст HTML'
+        default=datetime.utcnow(),
+        comment='Дата и время вставки данных (UTC)'
+        )
+
+
+class SkillDict(Base):
+    '''
+    Словарь навыков.
+    '''
+
+    params = Params()
+    __tablename__ = 'skill_dict'
+    __table_args__ = (
+        PrimaryKeyConstraint('skill_id'),
+        UniqueConstraint('skill'),
+        Index('skill_dict_skill_key_idx', 'skill_key', unique=True),
+        {
+            'comment': '''Словарь навыков'''
+        }
+    )
+    skill_id = Column(
+        'skill_id',
+        INTEGER(),
+        nullable=False,
+        comment='ID навыка'
+        )
+    skill = Column(
+        'skill',
+        String(),
+        nullable=False,
+        comment='Нормализованный текст навыка (первое написание)'
+        )
+    skill_key = Column(
+        'skill_key',
+        String(),
+        nullable=False,
+        default='',
+        comment='Ключ навыка (текст без учета регистра)'
         )
     date_load = Column(
         'date_load',
@@ -142,7 +219,9 @@ class Skill(Base):
     params = Params()
     __tablename__ = 'skill'
     __table_args__ = (
-        PrimaryKeyConstraint('skill', 'vacancy_id'),
+        PrimaryKeyConstraint('skill_id', 'vacancy_id'),
+        Index('skill_vacancy_id_idx', 'vacancy_id'),
+        Index('skill_date_load_idx', 'date_load'),
         {
             'comment': '''Навыки'''
         }
@@ -153,11 +232,171 @@ class Skill(Base):
         nullable=False,
         comment='ID вакансии'
         )
-    skill = Column(
-        'skill',
+    skill_id = Column(
+        'skill_id',
+        INTEGER(),
+        nullable=False,
+        comment='ID навыка (skill_dict)'
+        )
+    date_load = Column(
+        'date_load',
+        DateTime(),
+        nullable=False,
+        default=datetime.utcnow(),
+        comment='Дата и время вставки данных (UTC)'
+        )
+
+
+class DeadLetter(Base):
+    '''
+    Элементы с постоянными ошибками загрузки.
+    '''
+
+    params = Params()
+    __tablename__ = 'dead_letter'
+    __table_args__ = (
+        PrimaryKeyConstraint('kind', 'key', 'date_load'),
+        {
+            'comment': '''Элементы с постоянными ошибками загрузки'''
+        }
+    )
+    kind = Column(
+        'kind',
+        String(),
+        nullable=False,
+        comment='Вид элемента (map, vacancy_html)'
+        )
+    key = Column(
+        'key',
+        String(),
+        nullable=False,
+        comment='Ключ элемента (url, ID вакансии)'
+        )
+    error = Column(
+        'error',
+        TEXT(),
+        nullable=True,
+        comment='Текст ошибки'
+        )
+    attempts = Column(
+        'attempts',
+        INTEGER(),
+        nullable=False,
+        comment='Количество попыток'
+        )
+    reason = Column(
+        'reason',
+        String(),
+        nullable=True,
+        comment='Причина (permanent - постоянная ошибка, exhausted - исчерпаны попытки)'
+        )
+    date_load = Column(
+        'date_load',
+        DateTime(),
+        nullable=False,
+        default=datetime.utcnow(),
+        comment='Дата и время вставки данных (UTC)'
+        )
+
+
+class SkillStats(Base):
+    '''
+    Количество вакансий по навыкам (агрегат по дням и ячейкам сетки координат).
+    '''
+
+    params = Params()
+    __tablename__ = 'skill_stats'
+    __table_args__ = (
+        PrimaryKeyConstraint('skill_id', 'date', 'cell_x', 'cell_y'),
+        Index('skill_stats_date_idx', 'date'),
+        {
+            'comment': '''Количество вакансий по навыкам'''
+        }
+    )
+    skill_id = Column(
+        'skill_id',
+        INTEGER(),
+        nullable=False,
+        comment='ID навыка (skill_dict)'
+        )
+    date = Column(
+        'date',
+        Date(),
+        nullable=False,
+        comment='Дата первого появления вакансии на карте (UTC)'
+        )
+    cell_x = Column(
+        'cell_x',
+        INTEGER(),
+        nullable=False,
+        comment='Ячейка сетки по долготе вакансии'
+        )
+    cell_y = Column(
+        'cell_y',
+        INTEGER(),
+        nullable=False,
+        comment='Ячейка сетки по широте вакансии'
+        )
+    count_vacancy = Column(
+        'count_vacancy',
+        INTEGER(),
+        nullable=False,
+        comment='Количество вакансий'
+        )
+
+
+class SkillTotal(Base):
+    '''
+    Количество вакансий по навыкам за все время (топ без фильтров).
+    '''
+
+    params = Params()
+    __tablename__ = 'skill_total'
+    __table_args__ = (
+        PrimaryKeyConstraint('skill_id'),
+        Index('skill_total_count_vacancy_idx', 'count_vacancy'),
+        {
+            'comment': '''Количество вакансий по навыкам за все время'''
+        }
+    )
+    skill_id = Column(
+        'skill_id',
+        INTEGER(),
+        nullable=False,
+        comment='ID навыка (skill_dict)'
+        )
+    count_vacancy = Column(
+        'count_vacancy',
+        INTEGER(),
+        nullable=False,
+        comment='Количество вакансий'
+        )
+
+
+class Watermark(Base):
+    '''
+    Отметки обработанных данных.
+    '''
+
+    params = Params()
+    __tablename__ = 'watermark'
+    __table_args__ = (
+        PrimaryKeyConstraint('name'),
+        {
+            'comment': '''Отметки обработанных данных'''
+        }
+    )
+    name = Column(
+        'name',
         String(),
         nullable=False,
-        comment='Навыки'
+        comment='Наименование обработки (skill)'
+        )
+    value = Column(
+        'value',
+        DateTime(),
+        nullable=False,
+        comment='Дата и время загрузки последних обработанных данных (UTC)'
         )
     date_load = Column(
         'date_load',
@@ -174,12 +413,80 @@ class ORM:
         Работа с ORM.
         """
         self.params = Params()
-        self.engine = create_engine(self.params.string_connection, connect_args={'timeout': 100})
+# Engine of writes and engine of reads (the same engine if data base is not managed SQLite file)
+        self.engine, self.reader_engine = self.create_engines(self.params.string_connection)
         self.inspector = inspect(self.engine)
+        self.content_store = ContentStore()
+# Interning cache of skills: key of skill (casefold of normalized text) -> ID of skill_dict
+        self.skill_id_cache = {}
+        self.skill_id_lock = threading.Lock()
+
+    def create_engines(self, string_connection: str, managed: bool = None) -> tuple:
+        '''
+        Create engines of data base. Managed SQLite file: pragmas (WAL, synchronous, cache_size, mmap_size)
+        are set by connect event, writes go through one connection, reads go through pool of read-only connections.
+
+        Parameters
+        ----------
+        string_connection : str
+            String of connection.
+        managed : bool, optional
+            Managed SQLite mode, by default Params.sqlite_managed.
+
+        Returns
+        -------
+        tuple
+            Engine of writes and engine of reads.
+        '''
+        managed = self.params.sqlite_managed if managed is None else managed
+        engine = create_engine(string_connection, connect_args={'timeout': 100})
+        if not managed or engine.dialect.name != 'sqlite' or engine.url.database in (None, '', ':memory:'):
+            return engine, engine
+        engine.dispose()
+        connect_args = {'timeout': self.params.sqlite_busy_timeout, 'check_same_thread': False}
+        engine = create_engine(
+            string_connection,
+            connect_args=connect_args,
+            poolclass=QueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=self.params.sqlite_busy_timeout
+            )
+        reader_engine = create_engine(
+            string_connection,
+            connect_args=connect_args,
+            poolclass=QueuePool,
+            pool_size=self.params.sqlite_reader_pool_size,
+            max_overflow=0,
+            pool_timeout=self.params.sqlite_busy_timeout
+            )
+        event.listen(engine, 'connect', self.set_sqlite_pragmas)
+        event.listen(reader_engine, 'connect', functools.partial(self.set_sqlite_pragmas, query_only=True))
+        return engine, reader_engine
+
+    def set_sqlite_pragmas(self, dbapi_connection: object, connection_record: object, query_only: bool = False) -> None:
+        '''
+        Set pragmas of new SQLite connection (connect event of engine).
+
+        Parameters
+        ----------
+        dbapi_connection : object
+            Connection of sqlite3.
+        connection_record : object
+            Record of pool.
+        query_only : bool, optional
+            Connection of reads, by default False.
+        '''
+        cursor = dbapi_connection.cursor()
+        for name, value in self.params.sqlite_pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        if query_only:
+            cursor.execute('PRAGMA query_only = ON')
+        cursor.close()
 
     def create_delete_tables(
         self,
-        table_list: list = [Map, VacancyHTML, Skill],
+        table_list: list = [Map, VacancyHTML, SkillDict, Skill, SkillStats, SkillTotal, DeadLetter, Watermark],
         delete: bool = False
     ) -> None:
         '''
@@ -198,8 +505,23 @@ class ORM:
             for table in table_list:
                 table.__table__.drop(bind=self.engine, checkfirst=True)
         else:
+            if VacancyHTML in table_list:
+                self.migrate_vacancy_html()
+            if SkillDict in table_list:
+                self.migrate_skill_dict()
+            if Skill in table_list:
+                self.migrate_skill()
+            if DeadLetter in table_list:
+                self.migrate_dead_letter()
             for table in table_list:
                 table.__table__.create(bind=self.engine, checkfirst=True)
+# Create indexes what were added after table
+                index_names = {i['name'] for i in inspect(self.engine).get_indexes(table.__tablename__)}
+                for index in table.__table__.indexes:
+                    if index.name not in index_names:
+                        index.create(bind=self.engine)
+            if SkillStats in table_list and Watermark in table_list:
+                self.migrate_skill_stats()
 
     def insert_values(
         self,
@@ -235,60 +557,923 @@ class ORM:
         stmt = select([distinct(Map.vacancy_id)]).select_from(Map)
 # Get id
         id_list = []
-        with self.engine.connect().execution_options(autocommit=True) as conn:
+        with self.reader_engine.connect().execution_options(autocommit=True) as conn:
             result = conn.execute(stmt)
             for row in result:
                 id_list.append(row[0])
         return id_list
 
-    def insert_skill(self) -> None:
+    def get_missing_vacancy_id(self, stale_days: int = None, chunk_size: int = None) -> Iterator[int]:
+        '''
+        Get id from map table what are not in vacncy_html (or are stale) by chunks.
+        Chunks are read by keyset pagination, so read lock is not held during crawl,
+        and vacncy_html itself is checkpoint: interrupted crawl resumes with not loaded id.
+
+        Parameters
+        ----------
+        stale_days : int, optional
+            Pages older than stale_days are loaded again, by default None (only missing pages).
+        chunk_size : int, optional
+            Count of id in one query, by default Params.missing_id_chunk_size.
+
+        Returns
+        -------
+        Iterator[int]
+            Id of vacancies in ascending order.
         '''
-        insert skill to table.
+        chunk_size = chunk_size or self.params.missing_id_chunk_size
+        condition = VacancyHTML.vacancy_id == None
+        if stale_days is not None:
+            condition = or_(condition, VacancyHTML.date_load < datetime.utcnow() - timedelta(days=stale_days))
+        dead = exists().where(self.get_dead_letter_condition('vacancy_html')).where(
+            cast(DeadLetter.key, INTEGER) == Map.vacancy_id
+            )
+        last_id = None
+        while True:
+            stmt = (
+                select([distinct(Map.vacancy_id)]).
+                select_from(Map.__table__.outerjoin(VacancyHTML.__table__, Map.vacancy_id == VacancyHTML.vacancy_id)).
+                where(condition).
+                where(~dead)
+            )
+            if last_id is not None:
+                stmt = stmt.where(Map.vacancy_id > last_id)
+            stmt = stmt.order_by(Map.vacancy_id).limit(chunk_size)
+            with self.reader_engine.connect().execution_options(autocommit=True) as conn:
+                id_list = [row[0] for row in conn.execute(stmt)]
+            if not id_list:
+                return
+            yield from id_list
+            last_id = id_list[-1]
+
+    def get_dead_letter_condition(self, kind: str) -> object:
         '''
+        Get condition of dead letter what are not loaded again: permanent errors
+        and exhausted attempts younger than Params.dead_letter_retry_days.
+
+        Parameters
+        ----------
+        kind : str
+            Kind of elements (map, vacancy_html).
 
-        select_query = select([VacancyHTML.vacancy_id, VacancyHTML.html]).select_from(VacancyHTML)
+        Returns
+        -------
+        object
+            Condition of DeadLetter.
+        '''
+        return and_(
+            DeadLetter.kind == kind,
+            or_(
+                DeadLetter.reason == 'permanent',
+                DeadLetter.date_load > datetime.utcnow() - timedelta(days=self.params.dead_letter_retry_days)
+                )
+            )
 
+    def get_dead_letter_keys(self, kind: str) -> set:
+        '''
+        Get keys of elements what are not loaded again (see get_dead_letter_condition).
+
+        Parameters
+        ----------
+        kind : str
+            Kind of elements (map, vacancy_html).
+
+        Returns
+        -------
+        set
+            Keys of elements.
+        '''
+        stmt = select([distinct(DeadLetter.key)]).where(self.get_dead_letter_condition(kind))
+        with self.reader_engine.connect().execution_options(autocommit=True) as conn:
+            return {row[0] for row in conn.execute(stmt)}
+
+    def rebuild_table(
+        self,
+        new_table: DeclarativeMeta,
+        marker_column: str,
+        old_columns: list,
+        transform: Callable,
+        chunk_size: int = None
+    ) -> int:
+        '''
+        Rebuild table of old schema (SQLite can not change columns): table is renamed, table of new schema is created,
+        rows are copied by chunks and removed from old table in the same transaction,
+        so interrupted migration is resumed by next call.
+
+        Parameters
+        ----------
+        new_table : DeclarativeMeta
+            Table of new schema.
+        marker_column : str
+            Column of new schema (table with this column is migrated).
+        old_columns : list
+            Columns of old table for transform (name, type).
+        transform : Callable
+            Function rows of old table -> values for insert into new table.
+        chunk_size : int, optional
+            Count of rows in one transaction, by default Params.skill_chunk_size.
+
+        Returns
+        -------
+        int
+            Count of migrated rows.
+        '''
+        chunk_size = chunk_size or self.params.skill_chunk_size
+        old_name = f'{new_table.__tablename__}_old'
+        inspector = inspect(self.engine)
+        table_names = inspector.get_table_names()
+        if old_name not in table_names:
+            if new_table.__tablename__ not in table_names:
+                return 0
+            if marker_column in {i['name'] for i in inspector.get_columns(new_table.__tablename__)}:
+                return 0
+            with self.engine.begin() as conn:
+                conn.execute(f'ALTER TABLE {new_table.__tablename__} RENAME TO {old_name}')
+                for index in new_table.__table__.indexes:
+                    conn.execute(f'DROP INDEX IF EXISTS {index.name}')
+            new_table.__table__.create(bind=self.engine)
+        old_table = table(old_name, column('rowid', INTEGER()), *[column(name, type_) for name, type_ in old_columns])
+        rows_number = 0
+        while True:
+            stmt = select([old_table.c.rowid] + [old_table.c[name] for name, _ in old_columns])
+            stmt = stmt.order_by(old_table.c.rowid).limit(chunk_size)
+            with self.reader_engine.connect().execution_options(autocommit=True) as conn:
+                rows = conn.execute(stmt).fetchall()
+            if not rows:
+                break
+            records = transform([tuple(row)[1:] for row in rows])
+            with self.engine.begin() as conn:
+                if records:
+                    conn.execute(new_table.__table__.insert().prefix_with('OR IGNORE'), records)
+                conn.execute(old_table.delete().where(old_table.c.rowid <= rows[-1][0]))
+            rows_number += len(rows)
+        with self.engine.begin() as conn:
+            conn.execute(f'DROP TABLE {old_name}')
+# Return free pages of file to file system
         with self.engine.connect().execution_options(autocommit=True) as conn:
-            result = conn.execute(select_query)
-            for row in result:
-                vacancy_id = row[0]
-                html = row[1]
-                bsobj = BeautifulSoup(html, 'html5lib')
-                tags = bsobj.find_all('span', {'class': 'bloko-tag__section bloko-tag__section_text'})
-                if tags:
-                    tag_list = []
-                    [tag_list.append(i.text) for i in tags]
-                    records = []
-                    for tag in tag_list:
-                        record = {
-                            'vacancy_id': vacancy_id,
-                            'skill': tag
-                        }
-                        records.append(record)
-                    insert_query = Skill.__table__.insert(records)
-                    conn.execute(insert_query)
+            conn.execute('VACUUM')
+        return rows_number
 
-    def get_skill_df(self) -> pd.DataFrame:
+    def migrate_dead_letter(self) -> None:
+        '''
+        Migrate dead_letter without column reason: errors with exhausted attempts
+        (text of RetryableError) are marked as exhausted, the rest as permanent.
+        '''
+        inspector = inspect(self.engine)
+        if DeadLetter.__tablename__ not in inspector.get_table_names():
+            return
+        if 'reason' in {i['name'] for i in inspector.get_columns(DeadLetter.__tablename__)}:
+            return
+        with self.engine.begin() as conn:
+            conn.execute(f'ALTER TABLE {DeadLetter.__tablename__} ADD COLUMN reason VARCHAR')
+            conn.execute(
+                DeadLetter.__table__.update().values(
+                    reason=case([(DeadLetter.error.like('RetryableError:%'), 'exhausted')], else_='permanent')
+                    )
+                )
+
+    def migrate_vacancy_html(self, chunk_size: int = None) -> dict:
+        '''
+        Migrate vacncy_html without column content: pages are compressed into content.
+
+        Parameters
+        ----------
+        chunk_size : int, optional
+            Count of pages in one transaction, by default Params.skill_chunk_size.
+
+        Returns
+        -------
+        dict
+            Count of migrated pages, size before and after in bytes.
         '''
-        Get pandas data frame with skills and count vacansies.
+        result = {'size_before': 0, 'size_after': 0}
+
+        def transform(rows: list) -> list:
+            records = []
+            for vacancy_id, html, date_load in rows:
+                content = html.encode('utf-8')
+                records.append({
+                    'vacancy_id': vacancy_id,
+                    'content': self.content_store.compress(content),
+                    'date_load': date_load
+                    })
+                result['size_before'] += len(content)
+                result['size_after'] += len(records[-1]['content'])
+            return records
+
+        result['pages'] = self.rebuild_table(
+            VacancyHTML,
+            marker_column='content',
+            old_columns=[('vacancy_id', INTEGER()), ('html', TEXT()), ('date_load', DateTime())],
+            transform=transform,
+            chunk_size=chunk_size
+            )
+        return result
+
+    def migrate_skill_dict(self) -> int:
+        '''
+        Migrate skill_dict without column skill_key: spellings of skill what differ only by case
+        are merged into the first ID, skills of vacancies are moved to it,
+        skill_stats and skill_total are counted again by next update_skill_stats.
 
         Returns
         -------
-        pd.DataFrame
-            Result of excecute query.
+        int
+            Count of merged skills.
         '''
+        inspector = inspect(self.engine)
+        table_names = inspector.get_table_names()
+        if SkillDict.__tablename__ not in table_names:
+            return 0
+        if 'skill_key' in {i['name'] for i in inspector.get_columns(SkillDict.__tablename__)}:
+            return 0
+        skill_columns = set()
+        if Skill.__tablename__ in table_names:
+            skill_columns = {i['name'] for i in inspector.get_columns(Skill.__tablename__)}
+        with self.engine.begin() as conn:
+            conn.execute(f"ALTER TABLE {SkillDict.__tablename__} ADD COLUMN skill_key VARCHAR NOT NULL DEFAULT ''")
+            skill_id, merged = {}, []
+            for row in conn.execute(select([SkillDict.skill_id, SkillDict.skill]).order_by(SkillDict.skill_id)):
+                key = get_skill_key(row[1])
+                if key in skill_id:
+                    merged.append({'old_skill_id': row[0], 'new_skill_id': skill_id[key]})
+                else:
+                    skill_id[key] = row[0]
+            conn.execute(
+                SkillDict.__table__.update().
+                values(skill_key=bindparam('key')).
+                where(SkillDict.skill_id == bindparam('key_skill_id')),
+                [{'key': key, 'key_skill_id': value} for key, value in skill_id.items()]
+                )
+            if not merged:
+                return 0
+# Vacancy with both spellings keeps one row of skill
+            if 'skill_id' in skill_columns:
+                conn.execute(
+                    Skill.__table__.update().prefix_with('OR IGNORE').
+                    values(skill_id=bindparam('new_skill_id')).
+                    where(Skill.skill_id == bindparam('old_skill_id')),
+                    merged
+                    )
+                conn.execute(Skill.__table__.delete().where(Skill.skill_id == bindparam('old_skill_id')), merged)
+            conn.execute(SkillDict.__table__.delete().where(SkillDict.skill_id == bindparam('old_skill_id')), merged)
+            for table in [SkillStats, SkillTotal]:
+                if table.__tablename__ in table_names:
+                    conn.execute(table.__table__.delete())
+            if Watermark.__tablename__ in table_names:
+                conn.execute(Watermark.__table__.delete().where(Watermark.name == 'skill_stats'))
+        return len(merged)
 
-# Generate query
+    def migrate_skill(self, chunk_size: int = None) -> int:
+        '''
+        Migrate skill with text of skill: text is normalized and replaced by ID of skill_dict.
+
+        Parameters
+        ----------
+        chunk_size : int, optional
+            Count of rows in one transaction, by default Params.batch_size.
+
+        Returns
+        -------
+        int
+            Count of migrated rows.
+        '''
+        SkillDict.__table__.create(bind=self.engine, checkfirst=True)
+
+        def transform(rows: list) -> list:
+            skill_id = self.get_skill_id([normalize_skill(skill) for _, skill, _ in rows])
+            return [
+                {'vacancy_id': vacancy_id, 'skill_id': skill_id[normalize_skill(skill)], 'date_load': date_load}
+                for vacancy_id, skill, date_load in rows
+                ]
+
+        return self.rebuild_table(
+            Skill,
+            marker_column='skill_id',
+            old_columns=[('vacancy_id', INTEGER()), ('skill', String()), ('date_load', DateTime())],
+            transform=transform,
+            chunk_size=chunk_size or self.params.batch_size
+            )
+
+    def get_vacancy_html_size(self) -> dict:
+        '''
+        Get size of pages in data base.
+
+        Returns
+        -------
+        dict
+            Count of pages, bytes of uncompressed html and compressed content.
+        '''
+        stmt = select([
+            func.count(VacancyHTML.vacancy_id),
+            func.coalesce(func.sum(func.length(cast(VacancyHTML.html, LargeBinary))), 0),
+            func.coalesce(func.sum(func.length(VacancyHTML.content)), 0)
+            ])
+        with self.reader_engine.connect().execution_options(autocommit=True) as conn:
+            pages, html_size, content_size = conn.execute(stmt).fetchone()
+        return {'pages': pages, 'html_size': html_size, 'content_size': content_size}
+
+    def get_vacancy_html_list(self, limit: int = 100) -> list:
+        '''
+        Get HTML of vacancies (corpus for compare and benchmark of skill extractors).
+
+        Parameters
+        ----------
+        limit : int, optional
+            Count of pages, by default 100.
+
+        Returns
+        -------
+        list
+            HTML of vacancies.
+        '''
+        stmt = select([VacancyHTML.content, VacancyHTML.html]).order_by(VacancyHTML.vacancy_id).limit(limit)
+        with self.reader_engine.connect().execution_options(autocommit=True) as conn:
+            return [
+                self.content_store.decode(content) if content is not None else html
+                for content, html in conn.execute(stmt)
+                ]
+
+    def get_vacancy_html_chunks(
+        self,
+        chunk_size: int = None,
+        date_from: datetime = None,
+        date_to: datetime = None
+    ) -> Iterator[list]:
+        '''
+        Get pages of vacancies by chunks with keyset pagination (every query is short,
+        so read does not hold connection and lock while pages are parsed).
+
+        Parameters
+        ----------
+        chunk_size : int, optional
+            Count of pages in one query, by default Params.skill_chunk_size.
+        date_from : datetime, optional
+            Only pages loaded after date_from, by default None.
+        date_to : datetime, optional
+            Only pages loaded not later than date_to, by default None.
+
+        Returns
+        -------
+        Iterator[list]
+            Lists of (vacancy_id, compressed content or html), content is decompressed by reader.
+        '''
+        chunk_size = chunk_size or self.params.skill_chunk_size
+        last_id = None
+        while True:
+            stmt = select([VacancyHTML.vacancy_id, VacancyHTML.content, VacancyHTML.html])
+            if date_from is not None:
+                stmt = stmt.where(VacancyHTML.date_load > date_from)
+            if date_to is not None:
+                stmt = stmt.where(VacancyHTML.date_load <= date_to)
+            if last_id is not None:
+                stmt = stmt.where(VacancyHTML.vacancy_id > last_id)
+            stmt = stmt.order_by(VacancyHTML.vacancy_id).limit(chunk_size)
+            with self.reader_engine.connect().execution_options(autocommit=True) as conn:
+                rows = [
+                    (vacancy_id, content if content is not None else html)
+                    for vacancy_id, content, html in conn.execute(stmt)
+                    ]
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1][0]
+
+    def get_watermark(self, name: str) -> datetime:
+        '''
+        Get watermark of processing.
+
+        Parameters
+        ----------
+        name : str
+            Name of processing.
+
+        Returns
+        -------
+        datetime
+            Date of load of the last processed data, None if data were not processed.
+        '''
+        stmt = select([Watermark.value]).where(Watermark.name == name)
+        with self.reader_engine.connect().execution_options(autocommit=True) as conn:
+            return conn.execute(stmt).scalar()
+
+    def set_watermark(self, name: str, value: datetime) -> None:
+        '''
+        Set watermark of processing.
+
+        Parameters
+        ----------
+        name : str
+            Name of processing.
+        value : datetime
+            Date of load of the last processed data.
+        '''
+        stmt = Watermark.__table__.insert().prefix_with('OR REPLACE')
+        with self.engine.begin() as conn:
+            conn.execute(stmt, {'name': name, 'value': value, 'date_load': datetime.utcnow()})
+
+    def get_skill_id(self, skills: list) -> dict:
+        '''
+        Get ID of skills from interning cache, new skills are inserted into skill_dict
+        (spellings what differ only by case get one ID, the first spelling is kept in skill_dict).
+
+        Parameters
+        ----------
+        skills : list
+            Normalized texts of skills.
+
+        Returns
+        -------
+        dict
+            ID of skill by text.
+        '''
+        with self.skill_id_lock:
+            missing = {}
+            for skill in skills:
+                key = get_skill_key(skill)
+                if key not in self.skill_id_cache:
+                    missing.setdefault(key, skill)
+            missing = list(missing.items())
+# Parameters of one query are limited in SQLite
+            for i in range(0, len(missing), self.params.skill_dict_chunk_size):
+                chunk = missing[i:i + self.params.skill_dict_chunk_size]
+                date_load = datetime.utcnow()
+                with self.engine.begin() as conn:
+                    conn.execute(
+                        SkillDict.__table__.insert().prefix_with('OR IGNORE'),
+                        [{'skill': skill, 'skill_key': key, 'date_load': date_load} for key, skill in chunk]
+                        )
+                    stmt = select([SkillDict.skill_key, SkillDict.skill_id]).where(
+                        SkillDict.skill_key.in_([key for key, _ in chunk])
+                        )
+                    self.skill_id_cache.update(conn.execute(stmt).fetchall())
+            return {skill: self.skill_id_cache[get_skill_key(skill)] for skill in skills}
+
+    def insert_skill_records(self, records: list) -> None:
+        '''
+        Insert skills by one transaction with executemany (existing skills are ignored).
+
+        Parameters
+        ----------
+        records : list
+            list of values for insert into skill.
+        '''
+        if records:
+            with self.engine.begin() as conn:
+                conn.execute(Skill.__table__.insert().prefix_with('OR IGNORE'), records)
+
+    def insert_skill(
+        self,
+        backend: str = None,
+        processes: int = None,
+        incremental: bool = True,
+        watermark_lag: float = None
+    ) -> dict:
+        '''
+        insert skill to table: pages are streamed by chunks, parsed by process pool
+        (one task - one page, so huge page holds only one process) and skills are written
+        by batches in this process.
+        Incremental run parses only pages loaded after watermark of previous run.
+
+        Parameters
+        ----------
+        backend : str, optional
+            Engine of skill extraction (html5lib, lxml, regex), by default Params.skill_extractor_backend.
+        processes : int, optional
+            Count of processes, by default Params.skill_processes (count of cores).
+        incremental : bool, optional
+            Parse only new pages, by default True (False - all pages).
+        watermark_lag : float, optional
+            Seconds of lag of watermark, by default Params.skill_watermark_lag
+            (0 if all pages are written, for example after flush of writer).
+
+        Returns
+        -------
+        dict
+            Count of pages and skills, rows of skill_stats, pages per second.
+        '''
+
+        processes = processes or self.params.skill_processes or os.cpu_count()
+        max_tasks = processes * self.params.skill_tasks_per_process
+        stats = {'processes': processes, 'pages': 0, 'skills': 0}
+        records = []
+        start = time.perf_counter()
+# Pages what can be still in queue of batch writer are left for next run
+        date_from = self.get_watermark('skill') if incremental else None
+        watermark_lag = self.params.skill_watermark_lag if watermark_lag is None else watermark_lag
+        date_to = datetime.utcnow() - timedelta(seconds=watermark_lag)
+
+        def collect(futures: set) -> None:
+            for future in futures:
+                vacancy_id, skills = future.result()
+                stats['pages'] += 1
+                stats['skills'] += len(skills)
+                date_load = datetime.utcnow()
+                skill_id = self.get_skill_id(skills)
+                records.extend(
+                    {'vacancy_id': vacancy_id, 'skill_id': skill_id[skill], 'date_load': date_load} for skill in skills
+                    )
+            if len(records) >= self.params.batch_size:
+                self.insert_skill_records(records)
+                records.clear()
+
+        with ProcessPoolExecutor(processes, initializer=init_process, initargs=(backend,)) as executor:
+            futures = set()
+            for chunk in self.get_vacancy_html_chunks(date_from=date_from, date_to=date_to):
+                for vacancy_id, html in chunk:
+# Limit pages in flight: pages are read from data base as pool parses them
+                    if len(futures) >= max_tasks:
+                        done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    futures.add(executor.submit(extract_vacancy_skills, vacancy_id, html))
+            collect(wait(futures).done)
+        self.insert_skill_records(records)
+        self.set_watermark('skill', max(date_to, date_from or date_to))
+        stats['skill_stats'] = self.update_skill_stats()
+        stats['seconds'] = time.perf_counter() - start
+        stats['pages_per_second'] = stats['pages'] / stats['seconds']
+        return stats
+
+    def update_skill_stats(self) -> int:
+        '''
+        Add skills inserted after watermark of skill_stats into skill_stats
+        (vacancy is counted by date of first appearance on map and by cell of its coordinates) and skill_total.
+        Skills of vacancy without map are not counted.
+
+        Returns
+        -------
+        int
+            Count of changed rows of skill_stats.
+        '''
+        date_from = self.get_watermark('skill_stats')
+        cell_size = self.params.skill_stats_cell_size
+        new_skill = select([Skill.vacancy_id, Skill.skill_id, Skill.date_load])
+        if date_from:
+            new_skill = new_skill.where(Skill.date_load > date_from)
+        new_skill = new_skill.alias('new_skill')
+# Column longitude of map is filled by lat of hh and column latitude by lng (see MapParser.columns)
+        vacancy = (
+            select([
+                Map.vacancy_id,
+                func.min(Map.date_load).label('date_load'),
+                func.min(Map.latitude).label('longitude'),
+                func.min(Map.longitude).label('latitude')
+                ]).
+            where(Map.vacancy_id.in_(select([distinct(new_skill.c.vacancy_id)]))).
+            group_by(Map.vacancy_id)
+        ).alias('vacancy')
+        date = func.date(vacancy.c.date_load, type_=Date)
+        cell_x = cast(vacancy.c.longitude / cell_size, INTEGER)
+        cell_y = cast(vacancy.c.latitude / cell_size, INTEGER)
         stmt = (
             select([
-                Skill.skill,
-                (func.count(Skill.vacancy_id)).label('count_vacancy')
+                new_skill.c.skill_id,
+                date.label('date'),
+                cell_x.label('cell_x'),
+                cell_y.label('cell_y'),
+                func.count().label('count_vacancy'),
+                func.max(new_skill.c.date_load).label('date_load')
                 ]).
-            where(Skill.vacancy_id == Map.vacancy_id).
-            group_by(Skill.skill).
-            order_by(func.count(Skill.vacancy_id).desc()).
-            limit(10)
+            select_from(new_skill.join(vacancy, vacancy.c.vacancy_id == new_skill.c.vacancy_id)).
+            group_by(new_skill.c.skill_id, date, cell_x, cell_y)
+        )
+        update_stats = (
+            SkillStats.__table__.update().
+            values(count_vacancy=SkillStats.count_vacancy + bindparam('delta')).
+            where(SkillStats.skill_id == bindparam('key_skill_id')).
+            where(SkillStats.date == bindparam('key_date')).
+            where(SkillStats.cell_x == bindparam('key_cell_x')).
+            where(SkillStats.cell_y == bindparam('key_cell_y'))
+        )
+        update_total = (
+            SkillTotal.__table__.update().
+            values(count_vacancy=SkillTotal.count_vacancy + bindparam('delta')).
+            where(SkillTotal.skill_id == bindparam('key_skill_id'))
+        )
+# Aggregate, counters and watermark are changed in one transaction
+        with self.engine.begin() as conn:
+            rows = conn.execute(stmt).fetchall()
+            if not rows:
+                return 0
+            total = {}
+            for row in rows:
+                total[row[0]] = total.get(row[0], 0) + row[4]
+# Counters are created with zero and increased, so new and existing keys are updated the same way
+            conn.execute(
+                SkillStats.__table__.insert().prefix_with('OR IGNORE'),
+                [{'skill_id': i[0], 'date': i[1], 'cell_x': i[2], 'cell_y': i[3], 'count_vacancy': 0} for i in rows]
+                )
+            conn.execute(update_stats, [
+                {'key_skill_id': i[0], 'key_date': i[1], 'key_cell_x': i[2], 'key_cell_y': i[3], 'delta': i[4]}
+                for i in rows
+                ])
+            conn.execute(
+                SkillTotal.__table__.insert().prefix_with('OR IGNORE'),
+                [{'skill_id': skill_id, 'count_vacancy': 0} for skill_id in total]
+                )
+            conn.execute(update_total, [{'key_skill_id': key, 'delta': value} for key, value in total.items()])
+            conn.execute(
+                Watermark.__table__.insert().prefix_with('OR REPLACE'),
+                {'name': 'skill_stats', 'value': max(i[5] for i in rows), 'date_load': datetime.utcnow()}
+                )
+        return len(rows)
+
+    def rebuild_skill_stats(self) -> int:
+        '''
+        Build skill_stats from all skills again.
 
+        Returns
+        -------
+        int
+            Count of rows of skill_stats.
+        '''
+        with self.engine.begin() as conn:
+            conn.execute(SkillStats.__table__.delete())
+            conn.execute(SkillTotal.__table__.delete())
+            conn.execute(Watermark.__table__.delete().where(Watermark.name == 'skill_stats'))
+        return self.update_skill_stats()
+
+    def migrate_skill_stats(self) -> int:
+        '''
+        Migrate skill_stats counted with swapped axes of grid (cell_x by latitude):
+        skill_stats is built again once, watermark skill_stats_grid marks built grid.
+
+        Returns
+        -------
+        int
+            Count of rows of skill_stats.
+        '''
+        if self.get_watermark('skill_stats_grid') is not None:
+            return 0
+        with self.reader_engine.connect().execution_options(autocommit=True) as conn:
+            rows_number = conn.execute(select([func.count()]).select_from(SkillStats.__table__)).scalar()
+        if rows_number:
+            rows_number = self.rebuild_skill_stats()
+        self.set_watermark('skill_stats_grid', datetime.utcnow())
+        return rows_number
+
+    def get_top_skill(
+        self,
+        limit: int = 10,
+        date_from: datetime = None,
+        date_to: datetime = None,
+        rectangle: Polygon = None
+    ) -> pd.DataFrame:
+        '''
+        Get top skills by count of vacancies from skill_stats (from skill_total without filters).
+
+        Parameters
+        ----------
+        limit : int, optional
+            Count of skills, by default 10.
+        date_from : datetime, optional
+            First date of appearance of vacancy on map (inclusive), by default None.
+        date_to : datetime, optional
+            Last date of appearance of vacancy on map (inclusive), by default None.
+        rectangle : Polygon, optional
+            Region: vacancies of cells of grid what intersect bounds of rectangle, by default None.
+
+        Returns
+        -------
+        pd.DataFrame
+            Skills and count of vacancies.
+        '''
+        if not (date_from or date_to or rectangle is not None):
+            count_vacancy = (
+                select([SkillTotal.skill_id, SkillTotal.count_vacancy]).
+                order_by(SkillTotal.count_vacancy.desc()).
+                limit(limit)
+            ).alias('count_vacancy')
+            return self.get_skill_name_df(count_vacancy)
+        count_vacancy = select([
+            SkillStats.skill_id,
+            func.sum(SkillStats.count_vacancy).label('count_vacancy')
+            ])
+        if date_from:
+            count_vacancy = count_vacancy.where(SkillStats.date >= date_from.date())
+        if date_to:
+            count_vacancy = count_vacancy.where(SkillStats.date <= date_to.date())
+        if rectangle is not None:
+            min_longitude, min_latitude, max_longitude, max_latitude = rectangle.bounds
+            cell_size = self.params.skill_stats_cell_size
+            count_vacancy = count_vacancy.where(
+                SkillStats.cell_x.between(int(min_longitude / cell_size), int(max_longitude / cell_size))
+                ).where(
+                SkillStats.cell_y.between(int(min_latitude / cell_size), int(max_latitude / cell_size))
+                )
+        count_vacancy = (
+            count_vacancy.
+            group_by(SkillStats.skill_id).
+            order_by(func.sum(SkillStats.count_vacancy).desc()).
+            limit(limit)
+        ).alias('count_vacancy')
+        return self.get_skill_name_df(count_vacancy)
+
+    def get_skill_name_df(self, count_vacancy: object) -> pd.DataFrame:
+        '''
+        Get pandas data frame with text of skills for subquery of top skills.
+
+        Parameters
+        ----------
+        count_vacancy : object
+            Subquery with columns skill_id and count_vacancy.
+
+        Returns
+        -------
+        pd.DataFrame
+            Skills and count of vacancies.
+        '''
+        stmt = (
+            select([SkillDict.skill, count_vacancy.c.count_vacancy]).
+            select_from(count_vacancy.join(SkillDict, SkillDict.skill_id == count_vacancy.c.skill_id)).
+            order_by(count_vacancy.c.count_vacancy.desc())
         )
 
-        return pd.read_sql(sql=stmt, con=self.engine)
+        return pd.read_sql(sql=stmt, con=self.reader_engine)
+
+    def get_skill_df(self) -> pd.DataFrame:
+        '''
+        Get pandas data frame with skills and count vacansies (top 10 of skill_stats).
+
+        Returns
+        -------
+        pd.DataFrame
+            Result of excecute query.
+        '''
+        return self.get_top_skill()
+
+    def get_salary_snapshot(self) -> datetime:
+        '''
+        Get the last snapshot of map.
+
+        Returns
+        -------
+        datetime
+            The last date_load of map, None if map is empty.
+        '''
+        with self.reader_engine.connect().execution_options(autocommit=True) as conn:
+            return conn.execute(select([func.max(Map.date_load)])).scalar()
+
+    def get_skill_snapshot(self) -> datetime:
+        '''
+        Get the last load of skills (skills of vacancies are inserted after map).
+
+        Returns
+        -------
+        datetime
+            The last date_load of skill, None if skill is empty.
+        '''
+        with self.reader_engine.connect().execution_options(autocommit=True) as conn:
+            return conn.execute(select([func.max(Skill.date_load)])).scalar()
+
+    def get_salary_chunks(self, snapshot: datetime = None, chunk_size: int = None) -> Iterator[np.ndarray]:
+        '''
+        Get salaries of skills by columnar chunks of vacancies (keyset pagination by vacancy_id):
+        the last row of map of vacancy not later than snapshot, salary in roubles by Params.salary_currency_rate.
+        Vacancies without salary or with unknown currency are skipped.
+
+        Parameters
+        ----------
+        snapshot : datetime, optional
+            The last date_load of map, by default None (all rows of map).
+        chunk_size : int, optional
+            Count of vacancies in one query, by default Params.salary_chunk_size.
+
+        Returns
+        -------
+        Iterator[np.ndarray]
+            Arrays with columns skill_id, salary from and salary to in roubles (nan if salary is not set).
+        '''
+        chunk_size = chunk_size or self.params.salary_chunk_size
+        rate = case(self.params.salary_currency_rate, value=Map.compensation_currency_code, else_=None)
+        last_id = None
+        while True:
+            stmt = select([Map.vacancy_id])
+            if snapshot is not None:
+                stmt = stmt.where(Map.date_load <= snapshot)
+            if last_id is not None:
+                stmt = stmt.where(Map.vacancy_id > last_id)
+            stmt = stmt.group_by(Map.vacancy_id).order_by(Map.vacancy_id).limit(chunk_size)
+            with self.reader_engine.connect().execution_options(autocommit=True) as conn:
+                vacancy_id_list = [i[0] for i in conn.execute(stmt)]
+            if not vacancy_id_list:
+                return
+            vacancy = (
+                select([Map.vacancy_id, func.max(Map.date_load).label('date_load')]).
+                where(Map.vacancy_id.between(vacancy_id_list[0], vacancy_id_list[-1]))
+            )
+            if snapshot is not None:
+                vacancy = vacancy.where(Map.date_load <= snapshot)
+            vacancy = vacancy.group_by(Map.vacancy_id).alias('vacancy')
+            stmt = (
+                select([Skill.skill_id, Map.compensation_from * rate, Map.compensation_to * rate]).
+                select_from(
+                    vacancy.
+                    join(Map, and_(Map.vacancy_id == vacancy.c.vacancy_id, Map.date_load == vacancy.c.date_load)).
+                    join(Skill, Skill.vacancy_id == vacancy.c.vacancy_id)
+                    ).
+                where(rate.isnot(None)).
+                where(or_(Map.compensation_from.isnot(None), Map.compensation_to.isnot(None)))
+            )
+            with self.reader_engine.connect().execution_options(autocommit=True) as conn:
+                rows = [tuple(row) for row in conn.execute(stmt)]
+            if rows:
+                yield np.array(rows, dtype=np.float64)
+            last_id = vacancy_id_list[-1]
+
+    def get_skill_name(self, skill_ids: list) -> dict:
+        '''
+        Get text of skills by ID.
+
+        Parameters
+        ----------
+        skill_ids : list
+            ID of skills.
+
+        Returns
+        -------
+        dict
+            Text of skill by ID.
+        '''
+        skill_ids = list(skill_ids)
+        result = {}
+        for i in range(0, len(skill_ids), self.params.skill_dict_chunk_size):
+            stmt = (
+                select([SkillDict.skill_id, SkillDict.skill]).
+                where(SkillDict.skill_id.in_(skill_ids[i:i + self.params.skill_dict_chunk_size]))
+            )
+            with self.reader_engine.connect().execution_options(autocommit=True) as conn:
+                result.update(conn.execute(stmt).fetchall())
+        return result
+
+    def benchmark_sqlite(self, threads_number: int = 25, rows_number: int = 200, batch_size: int = 1) -> dict:
+        '''
+        Benchmark default and managed SQLite on temporary file: concurrent writes of threads
+        and latency of analytical read (query of get_skill_df) under load of writes.
+
+        Parameters
+        ----------
+        threads_number : int, optional
+            Count of threads of writes, by default 25.
+        rows_number : int, optional
+            Count of rows of one thread, by default 200.
+        batch_size : int, optional
+            Count of rows in one transaction, by default 1 (as page of crawl).
+
+        Returns
+        -------
+        dict
+            Rows per second of writes, median and 95 percentile of read latency in seconds by mode.
+        '''
+        result = {}
+        for mode, managed in [('default', False), ('managed', True)]:
+            with tempfile.TemporaryDirectory() as directory:
+                engine, reader_engine = self.create_engines(f'sqlite:///{directory}/benchmark.db', managed=managed)
+                for table in [Map, Skill]:
+                    table.__table__.create(bind=engine)
+                read_seconds = []
+                writing = threading.Event()
+                writing.set()
+
+                def write(thread_number: int) -> None:
+                    for i in range(0, rows_number, batch_size):
+                        records = [
+                            {'vacancy_id': thread_number * rows_number + j, 'skill_id': j % 50, 'date_load': datetime.utcnow()}
+                            for j in range(i, min(i + batch_size, rows_number))
+                            ]
+                        with engine.begin() as conn:
+                            conn.execute(Skill.__table__.insert(), records)
+
+                def read() -> None:
+                    stmt = (
+                        select([Skill.skill_id, func.count(Skill.vacancy_id)]).
+                        group_by(Skill.skill_id).
+                        order_by(func.count(Skill.vacancy_id).desc()).
+                        limit(10)
+                        )
+                    while writing.is_set():
+                        start = time.perf_counter()
+                        with reader_engine.connect() as conn:
+                            conn.execute(stmt).fetchall()
+                        read_seconds.append(time.perf_counter() - start)
+
+                reader = threading.Thread(target=read)
+                reader.start()
+                start = time.perf_counter()
+                writers = [threading.Thread(target=write, args=(i,)) for i in range(threads_number)]
+                for writer in writers:
+                    writer.start()
+                for writer in writers:
+                    writer.join()
+                seconds = time.perf_counter() - start
+                writing.clear()
+                reader.join()
+                engine.dispose()
+                reader_engine.dispose()
+            result[mode] = {
+                'rows_per_second': threads_number * rows_number / seconds,
+                'read_seconds_median': float(np.median(read_seconds)) if read_seconds else None,
+                'read_seconds_p95': float(np.percentile(read_seconds, 95)) if read_seconds else None,
+                'reads': len(read_seconds)
+                }
+        return result
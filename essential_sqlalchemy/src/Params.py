@@ -12,19 +12,115 @@ class Params():
         '''
 # Data base
         self.string_connection = 'sqlite:////root/jupyterlab/books/essential_sqlalchemy/hh.db'
+# Managed SQLite: pragmas of connections, one connection of writes and pool of read-only connections
+        self.sqlite_managed = True
+        self.sqlite_pragmas = {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'cache_size': -64000,
+            'mmap_size': 268435456,
+            'temp_store': 'MEMORY'
+        }
+        self.sqlite_reader_pool_size = 5
+        self.sqlite_busy_timeout = 100
 # TOR
         self.tor_host = os.environ['TOR_HOST']
         self.tor_control_port = os.environ['TOR_CONTROL_PORT']
         self.tor_socks_port = os.environ['TOR_SOCKS_PORT']
         self.tor_password = os.environ['TOR_PASSWORD']
+# TOR circuit pool: SOCKS ports (comma separated), isolated circuits on every port, failures before rotation
+        self.tor_socks_ports = os.environ.get('TOR_SOCKS_PORTS', self.tor_socks_port).split(',')
+        self.tor_circuits_per_port = 5
+        self.tor_max_failures = 3
+        self.blocked_status_codes = [403, 429]
 # Proxies
         self.proxies = f'socks5://{self.tor_host}:{self.tor_socks_port}'
         self.url_get_external_ip = 'https://ipinfo.io/ip'
+# Pool of HTTP sessions: cached pools of hosts, connections to one host, timeout of request in seconds
+        self.http_pool_connections = 10
+        self.http_pool_maxsize = 25
+        self.http_timeout = 10
 # OSM
         self.osm_url = 'https://nominatim.openstreetmap.org/search?'
 # Head hunter
-        self.hh_map_vacancy_url = 'https://hh.ru/shards/vacancymap/searchvacancymap?area=1&clusters=false&enable_snippets=true&industry=7&items_on_page=100&label=with_address&no_magic=true&search_field=company_name&search_field=description&text=&bottom_left_lat={bottom_left_lat}&bottom_left_lng={bottom_left_lng}&top_right_lat={top_right_lat}&top_right_lng={top_right_lng}&width=1258&height=610.983'
+        self.hh_map_vacancy_url = 'https://hh.ru/shards/vacancymap/searchvacancymap?area=1&clusters=false&enable_snippets=true&industry=7&items_on_page={items_on_page}&label=with_address&no_magic=true&search_field=company_name&search_field=description&text=&bottom_left_lat={bottom_left_lat}&bottom_left_lng={bottom_left_lng}&top_right_lat={top_right_lat}&top_right_lng={top_right_lng}&width=1258&height=610.983'
         self.hh_main_url = 'https://hh.ru/vacancy/'
+# Limit of vacancies in response of map (cap for split tile of quadtree)
+        self.hh_map_items_on_page = 100
+# Levels of quadtree tiles: side of tile is 2 ** level sides of base rectangle
+        self.quadtree_start_level = 4
+        self.quadtree_min_level = -2
+# Asynchronous crawl: requests in flight
+        self.crawl_concurrency = 200
+# Rate limits (requests per second): start rates of hosts and circuit, tuning by 429/ban (step of increase is fraction of start rate)
+        self.rate_limit_hosts = {
+            'hh.ru': 2.0,
+            'yandex.ru': 1.0,
+            'nominatim.openstreetmap.org': 1.0
+        }
+        self.rate_limit_default = 1.0
+        self.rate_limit_circuit = 0.5
+        self.rate_limit_increase = 0.01
+        self.rate_limit_decrease = 0.5
+# Retries: attempts, exponential backoff with jitter (seconds), classification of statuses, breaker of host
+        self.retry_max_attempts = 5
+        self.retry_base_delay = 1
+        self.retry_max_delay = 60
+        self.retry_status_codes = [403, 429, 500, 502, 503, 504]
+        self.retry_permanent_status_codes = [404, 410]
+        self.breaker_failure_threshold = 20
+        self.breaker_reset_timeout = 60
+# Days before elements with exhausted attempts (not permanent errors) in dead letter are loaded again
+        self.dead_letter_retry_days = 1
+# Batch writer into data base: rows for flush, seconds between flushes
+        self.batch_size = 500
+        self.batch_flush_interval = 1.0
+# Count of id of vacancies in one query of incremental crawl
+        self.missing_id_chunk_size = 10000
+# Engine of skill extraction: html5lib, lxml or regex
+        self.skill_extractor_backend = 'lxml'
+# Skill extraction by process pool: count of processes (None - count of cores),
+# count of pages in one query, count of pages in flight per process
+        self.skill_processes = None
+        self.skill_chunk_size = 200
+        self.skill_tasks_per_process = 4
+# Seconds of lag of watermark of skill extraction (pages written later are parsed by next run)
+        self.skill_watermark_lag = 600
+# Count of new skills in one query of interning into skill_dict
+        self.skill_dict_chunk_size = 500
+# Size of cell of grid of skill_stats in degrees (region filter of top skills)
+        self.skill_stats_cell_size = 0.05
+# Salary by skills: roubles for unit of currency of hh.ru (approximate rates, other currencies are skipped),
+# percentiles, count of vacancies in one query, minimum count of vacancies of skill, count of cached snapshots
+        self.salary_currency_rate = {
+            'RUR': 1.0,
+            'USD': 90.0,
+            'EUR': 98.0,
+            'KZT': 0.19,
+            'BYR': 28.0,
+            'UZS': 0.0072,
+            'KGS': 1.0,
+            'AZN': 53.0,
+            'GEL': 33.0
+        }
+        self.salary_percentiles = [10, 25, 50, 75, 90]
+        self.salary_chunk_size = 10000
+        self.salary_min_count = 10
+        self.salary_cache_size = 8
+# Compressed store of pages: codec (zlib or zstd), level, level of zstd for benchmark, zstd dictionary
+        self.content_codec = 'zlib'
+        self.content_level = 6
+        self.content_zstd_level = 3
+        self.content_dictionary_path = '/root/jupyterlab/books/essential_sqlalchemy/hh.zdict'
+        self.content_dictionary_size = 112640
+# Cache of HTTP responses: directory, time to live in seconds, maximum size in bytes,
+# replay mode (only cache, without network), writes between checks of size, rows in one query
+        self.response_cache_path = '/root/jupyterlab/books/essential_sqlalchemy/response_cache'
+        self.response_cache_ttl = 7 * 24 * 60 * 60
+        self.response_cache_max_size = 10 * 1024 ** 3
+        self.response_cache_replay = False
+        self.response_cache_evict_every = 1000
+        self.response_cache_chunk_size = 1000
 # Test
         self.test_connection = 'sqlite:///:memory:'
         self.test_records_vacancy_html = [{
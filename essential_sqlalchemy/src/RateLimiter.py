@@ -0,0 +1,238 @@
+# Work with params of project
+from src.Params import Params
+
+# For work with TOR
+from src.TorCircuitPool import Circuit
+
+# For work with asynchronous code
+import asyncio
+
+# Work with parallelism
+import threading
+
+# For work with date-time
+import time
+
+# For work with url
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    '''
+    Корзина токенов с подстройкой скорости (AIMD): рост при успехе, снижение при блокировке.
+    '''
+    def __init__(self, rate: float, capacity: float = 1.0, min_rate: float = None, max_rate: float = None) -> None:
+        '''
+        Init.
+
+        Parameters
+        ----------
+        rate : float
+            Start rate (requests per second).
+        capacity : float, optional
+            Size of burst, by default 1.0.
+        min_rate : float, optional
+            Minimum rate, by default rate / 10.
+        max_rate : float, optional
+            Maximum rate, by default rate * 4.
+        '''
+        self.rate = rate
+        self.start_rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate or rate / 10
+        self.max_rate = max_rate or rate * 4
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.blocks = 0
+
+    def reserve(self) -> float:
+        '''
+        Reserve token.
+
+        Returns
+        -------
+        float
+            Seconds to wait before request.
+        '''
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+    def increase(self, step: float) -> None:
+        '''
+        Additive increase of rate after successful request.
+
+        Parameters
+        ----------
+        step : float
+            Step of rate.
+        '''
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + step)
+
+    def decrease(self, factor: float) -> None:
+        '''
+        Multiplicative decrease of rate after block (429, ban page).
+
+        Parameters
+        ----------
+        factor : float
+            Factor of rate.
+        '''
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate * factor)
+            self.tokens = min(self.tokens, 0.0)
+            self.blocks += 1
+
+
+class RateLimiter:
+    '''
+    Ограничение скорости запросов по хостам и цепочкам TOR (потокобезопасно, работает и с asyncio).
+    '''
+    def __init__(self, host_rates: dict = None, circuit_rate: float = None) -> None:
+        '''
+        Init.
+
+        Parameters
+        ----------
+        host_rates : dict, optional
+            Start rate (requests per second) by host, by default Params.rate_limit_hosts.
+        circuit_rate : float, optional
+            Start rate of one circuit, by default Params.rate_limit_circuit.
+        '''
+        self.params = Params()
+        self.host_rates = host_rates or self.params.rate_limit_hosts
+        self.circuit_rate = circuit_rate or self.params.rate_limit_circuit
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def get_host(self, url: str) -> str:
+        '''
+        Get host of budget: known host or its parent domain, otherwise host of url.
+
+        Parameters
+        ----------
+        url : str
+            Url.
+
+        Returns
+        -------
+        str
+            Host.
+        '''
+        host = urlsplit(url).hostname or ''
+        for known_host in self.host_rates:
+            if host == known_host or host.endswith(f'.{known_host}'):
+                return known_host
+        return host
+
+    def get_buckets(self, url: str, circuit: Circuit = None) -> list:
+        '''
+        Get buckets of host and circuit.
+
+        Parameters
+        ----------
+        url : str
+            Url.
+        circuit : Circuit, optional
+            Circuit of TOR, by default None.
+
+        Returns
+        -------
+        list
+            Buckets.
+        '''
+        host = self.get_host(url)
+        keys = [('host', host, self.host_rates.get(host, self.params.rate_limit_default))]
+        if circuit is not None:
+            keys.append(('circuit', (host, circuit.number), self.circuit_rate))
+        buckets = []
+        with self.lock:
+            for kind, key, rate in keys:
+                if (kind, key) not in self.buckets:
+                    self.buckets[(kind, key)] = TokenBucket(rate=rate)
+                buckets.append(self.buckets[(kind, key)])
+        return buckets
+
+    def reserve(self, url: str, circuit: Circuit = None) -> float:
+        '''
+        Reserve tokens of host and circuit.
+
+        Parameters
+        ----------
+        url : str
+            Url.
+        circuit : Circuit, optional
+            Circuit of TOR, by default None.
+
+        Returns
+        -------
+        float
+            Seconds to wait before request.
+        '''
+        return max(bucket.reserve() for bucket in self.get_buckets(url, circuit))
+
+    def acquire(self, url: str, circuit: Circuit = None) -> None:
+        '''
+        Wait for permission of request (thread).
+
+        Parameters
+        ----------
+        url : str
+            Url.
+        circuit : Circuit, optional
+            Circuit of TOR, by default None.
+        '''
+        time.sleep(self.reserve(url, circuit))
+
+    async def acquire_async(self, url: str, circuit: Circuit = None) -> None:
+        '''
+        Wait for permission of request (coroutine).
+
+        Parameters
+        ----------
+        url : str
+            Url.
+        circuit : Circuit, optional
+            Circuit of TOR, by default None.
+        '''
+        await asyncio.sleep(self.reserve(url, circuit))
+
+    def report(self, url: str, circuit: Circuit = None, blocked: bool = False) -> None:
+        '''
+        Tune rates by result of request.
+
+        Parameters
+        ----------
+        url : str
+            Url.
+        circuit : Circuit, optional
+            Circuit of TOR, by default None.
+        blocked : bool, optional
+            Response is rate limit or ban, by default False.
+        '''
+# Step of increase is constant (fraction of start rate), so rate grows linearly between blocks
+        for bucket in self.get_buckets(url, circuit):
+            if blocked:
+                bucket.decrease(self.params.rate_limit_decrease)
+            else:
+                bucket.increase(bucket.start_rate * self.params.rate_limit_increase)
+
+    def get_stats(self) -> dict:
+        '''
+        Get current rates of hosts and circuits.
+
+        Returns
+        -------
+        dict
+            Rate (requests per second) and count of blocks of every bucket.
+        '''
+        with self.lock:
+            return {
+                f'{kind}:{key}': {'rate': bucket.rate, 'blocks': bucket.blocks}
+                for (kind, key), bucket in self.buckets.items()
+                }
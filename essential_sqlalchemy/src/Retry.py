@@ -0,0 +1,352 @@
+# Work with params of project
+from src.Params import Params
+
+# For work with asynchronous code
+import asyncio
+
+# Work with parallelism
+import threading
+
+# For work with date-time
+import time
+
+# Work with random objects
+import random
+
+# For work with data type
+from typing import Callable
+
+# For work with url
+from urllib.parse import urlsplit
+
+
+class RetryableError(Exception):
+    '''
+    Временная ошибка: запрос можно повторить.
+    '''
+
+
+class PermanentError(Exception):
+    '''
+    Постоянная ошибка: запрос не повторяется, элемент пишется в dead letter.
+    '''
+    # Reason of dead letter
+    reason = 'permanent'
+
+    def __init__(self, message: str, attempts: int = 1) -> None:
+        '''
+        Init.
+
+        Parameters
+        ----------
+        message : str
+            Text of error.
+        attempts : int, optional
+            Count of attempts, by default 1.
+        '''
+        super().__init__(message)
+        self.attempts = attempts
+
+
+class RetriesExhaustedError(PermanentError):
+    '''
+    Попытки исчерпаны на временной ошибке: элемент пишется в dead letter и загружается повторно после срока.
+    '''
+    reason = 'exhausted'
+
+
+class CircuitBreaker:
+    '''
+    Предохранитель хоста: после серии ошибок запросы к хосту приостанавливаются.
+    '''
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        '''
+        Init.
+
+        Parameters
+        ----------
+        failure_threshold : int
+            Count of failures in a row for open.
+        reset_timeout : float
+            Seconds in open state before trial request (half open).
+        '''
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened = None
+        self.openings = 0
+        self.lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        '''
+        State of breaker.
+
+        Returns
+        -------
+        str
+            closed, open or half_open.
+        '''
+        if self.opened is None:
+            return 'closed'
+        if time.monotonic() - self.opened < self.reset_timeout:
+            return 'open'
+        return 'half_open'
+
+    def get_wait(self) -> float:
+        '''
+        Get seconds to wait before request.
+
+        Returns
+        -------
+        float
+            Seconds, 0 if breaker is closed or half open.
+        '''
+        with self.lock:
+            if self.opened is None:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened))
+
+    def record_success(self) -> None:
+        '''
+        Close breaker after successful request.
+        '''
+        with self.lock:
+            self.failures = 0
+            self.opened = None
+
+    def record_failure(self) -> None:
+        '''
+        Count failure, open breaker after failure_threshold failures in a row or failure in half open state.
+        '''
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold or self.opened is not None:
+                self.opened = time.monotonic()
+                self.openings += 1
+
+
+class RetryPolicy:
+    '''
+    Повторы запросов: ограничение попыток, экспоненциальная задержка со случайным разбросом,
+    классификация ошибок и предохранители по хостам.
+    '''
+    def __init__(
+        self,
+        max_attempts: int = None,
+        base_delay: float = None,
+        max_delay: float = None,
+        failure_threshold: int = None,
+        reset_timeout: float = None
+    ) -> None:
+        '''
+        Init.
+
+        Parameters
+        ----------
+        max_attempts : int, optional
+            Count of attempts, by default Params.retry_max_attempts.
+        base_delay : float, optional
+            Delay after first attempt in seconds, by default Params.retry_base_delay.
+        max_delay : float, optional
+            Maximum delay in seconds, by default Params.retry_max_delay.
+        failure_threshold : int, optional
+            Count of failures of host in a row for open breaker, by default Params.breaker_failure_threshold.
+        reset_timeout : float, optional
+            Seconds of open breaker, by default Params.breaker_reset_timeout.
+        '''
+        self.params = Params()
+        self.max_attempts = max_attempts or self.params.retry_max_attempts
+        self.base_delay = base_delay or self.params.retry_base_delay
+        self.max_delay = max_delay or self.params.retry_max_delay
+        self.failure_threshold = failure_threshold or self.params.breaker_failure_threshold
+        self.reset_timeout = reset_timeout or self.params.breaker_reset_timeout
+        self.breakers = {}
+        self.lock = threading.Lock()
+        self.stats = {'retries': 0, 'permanent': 0, 'exhausted': 0}
+
+    def get_breaker(self, url: str) -> CircuitBreaker:
+        '''
+        Get breaker of host of url.
+
+        Parameters
+        ----------
+        url : str
+            Url.
+
+        Returns
+        -------
+        CircuitBreaker
+            Breaker.
+        '''
+        host = urlsplit(url).hostname
+        with self.lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self.breakers[host]
+
+    def get_delay(self, attempt: int) -> float:
+        '''
+        Get delay before next attempt: exponential backoff with full jitter.
+
+        Parameters
+        ----------
+        attempt : int
+            Number of attempt (from 0).
+
+        Returns
+        -------
+        float
+            Seconds.
+        '''
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def check_status(self, status_code: int) -> None:
+        '''
+        Classify status of response.
+
+        Parameters
+        ----------
+        status_code : int
+            Status of response.
+
+        Raises
+        ------
+        PermanentError
+            Status is permanent failure (404, 410).
+        RetryableError
+            Status is temporary failure (403, 429, 5xx).
+        '''
+        if status_code in self.params.retry_permanent_status_codes:
+            raise PermanentError(f'HTTP {status_code}')
+        if status_code in self.params.retry_status_codes:
+            raise RetryableError(f'HTTP {status_code}')
+
+    def register_failure(self, breaker: CircuitBreaker, attempt: int, error: Exception) -> None:
+        '''
+        Register failure of attempt.
+
+        Parameters
+        ----------
+        breaker : CircuitBreaker
+            Breaker of host.
+        attempt : int
+            Number of attempt (from 0).
+        error : Exception
+            Error of attempt.
+
+        Raises
+        ------
+        PermanentError
+            Error is permanent.
+        RetriesExhaustedError
+            Attempts are exhausted.
+        '''
+        if isinstance(error, PermanentError):
+            breaker.record_success()
+            self.count('permanent')
+            error.attempts = attempt + 1
+            raise error
+        breaker.record_failure()
+        if attempt + 1 >= self.max_attempts:
+            self.count('exhausted')
+            raise RetriesExhaustedError(f'{type(error).__name__}: {error}', attempts=attempt + 1) from error
+        self.count('retries')
+
+    def count(self, name: str) -> None:
+        '''
+        Increment counter of statistics.
+
+        Parameters
+        ----------
+        name : str
+            Name of counter.
+        '''
+        with self.lock:
+            self.stats[name] += 1
+
+    def run(self, url: str, attempt_function: Callable) -> object:
+        '''
+        Run attempts of request.
+
+        Parameters
+        ----------
+        url : str
+            Url (host of url selects breaker).
+        attempt_function : Callable
+            Function without arguments, raises RetryableError or PermanentError.
+
+        Returns
+        -------
+        object
+            Result of attempt_function.
+
+        Raises
+        ------
+        PermanentError
+            Error is permanent.
+        RetriesExhaustedError
+            Attempts are exhausted.
+        '''
+        breaker = self.get_breaker(url)
+        for attempt in range(self.max_attempts):
+            time.sleep(breaker.get_wait())
+            try:
+                result = attempt_function()
+            except (RetryableError, PermanentError) as error:
+                self.register_failure(breaker, attempt, error)
+                time.sleep(self.get_delay(attempt))
+                continue
+            breaker.record_success()
+            return result
+
+    async def run_async(self, url: str, attempt_function: Callable) -> object:
+        '''
+        Run attempts of request (coroutine).
+
+        Parameters
+        ----------
+        url : str
+            Url (host of url selects breaker).
+        attempt_function : Callable
+            Coroutine function without arguments, raises RetryableError or PermanentError.
+
+        Returns
+        -------
+        object
+            Result of attempt_function.
+
+        Raises
+        ------
+        PermanentError
+            Error is permanent.
+        RetriesExhaustedError
+            Attempts are exhausted.
+        '''
+        breaker = self.get_breaker(url)
+        for attempt in range(self.max_attempts):
+            await asyncio.sleep(breaker.get_wait())
+            try:
+                result = await attempt_function()
+            except (RetryableError, PermanentError) as error:
+                self.register_failure(breaker, attempt, error)
+                await asyncio.sleep(self.get_delay(attempt))
+                continue
+            breaker.record_success()
+            return result
+
+    def get_stats(self) -> dict:
+        '''
+        Get statistics of retries and breakers.
+
+        Returns
+        -------
+        dict
+            Count of retries, permanent failures, exhausted items and state of breakers.
+        '''
+        with self.lock:
+            breakers = {
+                host: {'state': breaker.state, 'openings': breaker.openings}
+                for host, breaker in self.breakers.items()
+                }
+            return dict(self.stats, breakers=breakers)
@@ -0,0 +1,142 @@
+# Work with params of project
+from src.Params import Params
+
+# Work with data base
+from src.ORM import ORM
+
+# Work with arrays and tables
+import numpy as np
+import pandas as pd
+
+# For work with date-time
+from datetime import datetime
+
+
+class SalaryAnalytics:
+    '''
+    Зарплаты по навыкам: зарплаты вакансий читаются колоночными пакетами,
+    приводятся к рублям, распределение (перцентили, медиана, среднее) считается векторно.
+    Результат кэшируется по снимку карты (date_load).
+    '''
+    def __init__(self, orm: ORM = None) -> None:
+        '''
+        Init.
+
+        Parameters
+        ----------
+        orm : ORM, optional
+            Work with data base, by default ORM().
+        '''
+        self.params = Params()
+        self.orm = orm or ORM()
+        self.cache = {}
+
+    @staticmethod
+    def get_salary(compensation_from: np.ndarray, compensation_to: np.ndarray) -> np.ndarray:
+        '''
+        Get salary of vacancy: middle of range, or the bound what is set.
+
+        Parameters
+        ----------
+        compensation_from : np.ndarray
+            Salary from (nan if it is not set).
+        compensation_to : np.ndarray
+            Salary to (nan if it is not set).
+
+        Returns
+        -------
+        np.ndarray
+            Salary.
+        '''
+        return np.where(
+            np.isnan(compensation_from),
+            compensation_to,
+            np.where(np.isnan(compensation_to), compensation_from, (compensation_from + compensation_to) / 2)
+            )
+
+    @staticmethod
+    def get_distribution(skill_id: np.ndarray, salary: np.ndarray, percentiles: list) -> dict:
+        '''
+        Get distribution of salary by skills in one sort (percentiles are linear, as numpy.percentile).
+
+        Parameters
+        ----------
+        skill_id : np.ndarray
+            ID of skill of every salary.
+        salary : np.ndarray
+            Salaries.
+        percentiles : list
+            Percentiles (0-100).
+
+        Returns
+        -------
+        dict
+            Arrays of skill_id, count_vacancy, salary_mean and salary_p<percentile>.
+        '''
+        order = np.lexsort((salary, skill_id))
+        skill_id, salary = skill_id[order], salary[order]
+        skill_ids, start, count = np.unique(skill_id, return_index=True, return_counts=True)
+        result = {
+            'skill_id': skill_ids,
+            'count_vacancy': count,
+            'salary_mean': np.add.reduceat(salary, start) / count if len(salary) else np.empty(0)
+            }
+        for percentile in percentiles:
+            position = start + percentile / 100 * (count - 1)
+            low = np.floor(position).astype(np.int64)
+            high = np.ceil(position).astype(np.int64)
+            result[f'salary_p{percentile}'] = salary[low] + (salary[high] - salary[low]) * (position - low)
+        return result
+
+    def get_skill_salary_df(
+        self,
+        snapshot: datetime = None,
+        percentiles: list = None,
+        min_count: int = None
+    ) -> pd.DataFrame:
+        '''
+        Get distribution of salary in roubles by skills for snapshot of map.
+
+        Parameters
+        ----------
+        snapshot : datetime, optional
+            The last date_load of map, by default the last snapshot.
+        percentiles : list, optional
+            Percentiles (0-100), by default Params.salary_percentiles.
+        min_count : int, optional
+            Minimum count of vacancies of skill, by default Params.salary_min_count.
+
+        Returns
+        -------
+        pd.DataFrame
+            Skills, count of vacancies, mean and percentiles of salary (sorted by median).
+        '''
+        snapshot = snapshot or self.orm.get_salary_snapshot()
+        percentiles = tuple(percentiles or self.params.salary_percentiles)
+        min_count = self.params.salary_min_count if min_count is None else min_count
+# Skills of vacancies of snapshot are inserted later than map, so result depends on load of skills too
+        key = (snapshot, self.orm.get_skill_snapshot(), percentiles, min_count)
+        if key in self.cache:
+            return self.cache[key].copy()
+
+# Only two columns of all rows are kept in memory
+        skill_id_list, salary_list = [], []
+        for chunk in self.orm.get_salary_chunks(snapshot):
+            skill_id_list.append(chunk[:, 0].astype(np.int64))
+            salary_list.append(self.get_salary(chunk[:, 1], chunk[:, 2]))
+        skill_id = np.concatenate(skill_id_list) if skill_id_list else np.empty(0, dtype=np.int64)
+        salary = np.concatenate(salary_list) if salary_list else np.empty(0)
+        distribution = self.get_distribution(skill_id, salary, percentiles)
+
+        df = pd.DataFrame(distribution)
+        df = df[df['count_vacancy'] >= min_count]
+        skill_name = self.orm.get_skill_name(df['skill_id'].tolist())
+        df.insert(1, 'skill', df['skill_id'].map(skill_name))
+        if 50 in percentiles:
+            df = df.sort_values('salary_p50', ascending=False)
+        df = df.reset_index(drop=True)
+
+        if len(self.cache) >= self.params.salary_cache_size:
+            del self.cache[next(iter(self.cache))]
+        self.cache[key] = df
+        return df.copy()
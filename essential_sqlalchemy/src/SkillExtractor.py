@@ -0,0 +1,250 @@
+# Work with params of project
+from src.Params import Params
+
+# Work with HTML
+from bs4 import BeautifulSoup
+import html as html_entities
+import re
+import unicodedata
+try:
+    from lxml import etree
+    import lxml.html
+except ImportError:
+    lxml = None
+
+# Work with compressed pages
+from src.ContentStore import ContentStore
+
+# For work with date-time
+import time
+
+# Class of tag with skill on page of vacancy
+SKILL_CLASS = 'bloko-tag__section bloko-tag__section_text'
+
+# Extractor and store of pages of process of pool
+process_extractor = None
+process_content_store = None
+
+
+class SkillExtractor:
+    '''
+    Извлечение навыков со страницы вакансии с выбором движка:
+    html5lib (эталон), lxml (XPath) или регулярное выражение по блоку навыков.
+    '''
+    backends = ['html5lib', 'lxml', 'regex']
+    skill_xpath = etree.XPath(f'//span[@class="{SKILL_CLASS}"]') if lxml else None
+    html_parser = lxml.html.HTMLParser(encoding='utf-8') if lxml else None
+    skill_pattern = re.compile(
+        rf'<span\b[^>]*\bclass\s*=\s*["\']{SKILL_CLASS}["\'][^>]*>(.*?)</span\s*>',
+        re.DOTALL
+        )
+    tag_pattern = re.compile(r'<[^>]*>')
+
+    def __init__(self, backend: str = None) -> None:
+        '''
+        Init.
+
+        Parameters
+        ----------
+        backend : str, optional
+            Engine of extraction: html5lib, lxml or regex, by default Params.skill_extractor_backend.
+        '''
+        self.params = Params()
+        self.backend = backend or self.params.skill_extractor_backend
+        if self.backend not in self.backends:
+            raise ValueError(f'Unknown backend of skill extractor: {self.backend}')
+        if self.backend == 'lxml' and lxml is None:
+            raise ImportError('lxml is not installed')
+        self.extract = getattr(self, f'extract_{self.backend}')
+
+    def extract_html5lib(self, html: str) -> list:
+        '''
+        Extract skills with html5lib (full tree of page).
+
+        Parameters
+        ----------
+        html : str
+            HTML of vacancy.
+
+        Returns
+        -------
+        list
+            Skills.
+        '''
+        bsobj = BeautifulSoup(html, 'html5lib')
+        return [i.text for i in bsobj.find_all('span', {'class': SKILL_CLASS})]
+
+    def extract_lxml(self, html: str) -> list:
+        '''
+        Extract skills with lxml and compiled XPath.
+
+        Parameters
+        ----------
+        html : str
+            HTML of vacancy.
+
+        Returns
+        -------
+        list
+            Skills.
+        '''
+        try:
+            document = lxml.html.document_fromstring(html.encode('utf-8'), parser=self.html_parser)
+        except etree.ParserError:
+            return []
+        return [i.text_content() for i in self.skill_xpath(document)]
+
+    def extract_regex(self, html: str) -> list:
+        '''
+        Extract skills with compiled regular expression: search starts from the skills block,
+        the rest of page is not parsed.
+
+        Parameters
+        ----------
+        html : str
+            HTML of vacancy.
+
+        Returns
+        -------
+        list
+            Skills.
+        '''
+        start = html.find(SKILL_CLASS)
+        if start == -1:
+            return []
+        start = html.rfind('<', 0, start)
+        return [
+            html_entities.unescape(self.tag_pattern.sub('', i))
+            for i in self.skill_pattern.findall(html, start)
+            ]
+
+    def compare(self, html_list: list, reference: str = 'html5lib') -> dict:
+        '''
+        Compare output of backends with reference backend on corpus of pages.
+
+        Parameters
+        ----------
+        html_list : list
+            HTML of vacancies.
+        reference : str, optional
+            Reference backend, by default html5lib.
+
+        Returns
+        -------
+        dict
+            Count of pages with other skills by backend.
+        '''
+        extractors = {backend: SkillExtractor(backend) for backend in self.get_available_backends()}
+        expected = [extractors[reference].extract(html) for html in html_list]
+        return {
+            backend: sum(extractor.extract(html) != skills for html, skills in zip(html_list, expected))
+            for backend, extractor in extractors.items() if backend != reference
+            }
+
+    def benchmark(self, html_list: list) -> dict:
+        '''
+        Benchmark throughput of backends on corpus of pages.
+
+        Parameters
+        ----------
+        html_list : list
+            HTML of vacancies.
+
+        Returns
+        -------
+        dict
+            Pages per second by backend.
+        '''
+        result = {}
+        for backend in self.get_available_backends():
+            extract = SkillExtractor(backend).extract
+            start = time.perf_counter()
+            for html in html_list:
+                extract(html)
+            result[backend] = len(html_list) / (time.perf_counter() - start)
+        return result
+
+    def get_available_backends(self) -> list:
+        '''
+        Get backends what can be used (lxml is optional).
+
+        Returns
+        -------
+        list
+            Names of backends.
+        '''
+        return [backend for backend in self.backends if backend != 'lxml' or lxml]
+
+
+def normalize_skill(skill: str) -> str:
+    '''
+    Normalize text of skill: unicode normal form, spaces are collapsed.
+
+    Parameters
+    ----------
+    skill : str
+        Text of skill.
+
+    Returns
+    -------
+    str
+        Normalized text of skill.
+    '''
+    return ' '.join(unicodedata.normalize('NFKC', skill).split())
+
+
+def get_skill_key(skill: str) -> str:
+    '''
+    Get key of interning of skill: spellings of skill what differ only by case are one skill.
+
+    Parameters
+    ----------
+    skill : str
+        Normalized text of skill.
+
+    Returns
+    -------
+    str
+        Key of skill.
+    '''
+    return skill.casefold()
+
+
+def init_process(backend: str = None) -> None:
+    '''
+    Create extractor of process of pool.
+
+    Parameters
+    ----------
+    backend : str, optional
+        Engine of extraction, by default Params.skill_extractor_backend.
+    '''
+    global process_extractor, process_content_store
+    process_extractor = SkillExtractor(backend)
+    process_content_store = ContentStore()
+
+
+def extract_vacancy_skills(vacancy_id: int, html: object) -> tuple:
+    '''
+    Extract skills of one page in process of pool (compressed page is decompressed here).
+
+    Parameters
+    ----------
+    vacancy_id : int
+        ID of vacancy.
+    html : object
+        HTML of vacancy or compressed content (bytes).
+
+    Returns
+    -------
+    tuple
+        ID of vacancy and unique normalized skills (the first spelling of skill).
+    '''
+    if isinstance(html, bytes):
+        html = process_content_store.decode(html)
+    skills = {}
+    for skill in process_extractor.extract(html):
+        skill = normalize_skill(skill)
+        if skill:
+            skills.setdefault(get_skill_key(skill), skill)
+    return vacancy_id, list(skills.values())
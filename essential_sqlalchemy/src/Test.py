@@ -1,5 +1,10 @@
 # For work with tests
 import unittest
+from unittest import mock
+
+# For work with files
+import os
+import tempfile
 
 # For work with parametrs of project
 from src.Params import Params
@@ -9,7 +14,31 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import (
     create_engine, select
     )
-from src.ORM import VacancyHTML
+from src.ORM import ORM, VacancyHTML, SkillDict, Skill, Map, DeadLetter
+from src.BatchWriter import BatchWriter
+from datetime import datetime, timedelta
+import time
+
+# For work with requests
+from src.Retry import CircuitBreaker
+from src.RateLimiter import RateLimiter
+from src.ResponseCache import ResponseCache
+from src.WebScraper import WebScraper
+
+# For work with spatial data
+from shapely.geometry import Polygon
+from src.Geo import Geo
+
+# For work with response of map
+import json
+from src.MapParser import MapParser
+
+# For work with skills
+from src.SkillExtractor import SkillExtractor, init_process, extract_vacancy_skills
+
+# For work with salary
+import numpy as np
+from src.SalaryAnalytics import SalaryAnalytics
 
 Base = declarative_base()
 params = Params()
@@ -65,3 +94,415 @@ class Test(unittest.TestCase):
         self.assertEqual(result, [tuple(params.test_records_vacancy_html[0].values())])
 
 
+def get_test_city_data() -> tuple:
+    '''
+    Get test city data in format of Geo.get_city_polygon.
+
+    Returns
+    -------
+    tuple
+        Tuple of the city data.
+    '''
+    ring = [[37.50, 55.70], [37.50, 55.76], [37.58, 55.80], [37.66, 55.74], [37.60, 55.70], [37.50, 55.70]]
+    city_geojson = [{'geojson': {'coordinates': [[ring]]}}]
+    min_coordinates, max_coordinates = ['55.70', '37.50'], ['55.80', '37.66']
+    polygon_rectangle = Polygon([(37.50, 55.70), (37.50, 55.80), (37.66, 55.80), (37.66, 55.70)])
+    return (city_geojson, polygon_rectangle, min_coordinates, max_coordinates)
+
+
+class TestGeo(unittest.TestCase):
+    def test_generate_rectangle(self) -> None:
+        '''
+        Test generate_rectangle returns the same cells as generate_rectangle_loop.
+        '''
+        geo = Geo()
+        city_data = get_test_city_data()
+        expected = [list(i.exterior.coords) for i in geo.generate_rectangle_loop(city_data=city_data)]
+        result = [list(i.exterior.coords) for i in geo.generate_rectangle(city_data=city_data)]
+        self.assertTrue(expected)
+        self.assertEqual(result, expected)
+
+
+class TestMapParser(unittest.TestCase):
+    def test_get_records(self) -> None:
+        '''
+        Test direct parse returns all vacancies of response, as parse through html5lib.
+        '''
+        parser = MapParser(backend='json')
+        vacancies = [
+            {'id': i, 'name': f'name {i}', 'company': None, 'address': {'lat': 55.7, 'lng': 37.6}, 'compensation': None}
+            for i in range(3)
+            ]
+        content = json.dumps({'vacancies': vacancies}).encode()
+        records = parser.get_records(parser.parse(content))
+        self.assertEqual([i['vacancy_id'] for i in records], [0, 1, 2])
+        self.assertEqual(parser.parse(content), parser.parse_html5lib(content))
+
+
+class TestSkillExtractor(unittest.TestCase):
+    def test_compare(self) -> None:
+        '''
+        Test fast backends return the same skills as html5lib.
+        '''
+        tags = ''.join(
+            f'<div class="bloko-tag"><span class="bloko-tag__section bloko-tag__section_text">{i}</span></div>'
+            for i in ['Python', 'C&#43;&#43;', 'SQL &amp; NoSQL', 'Машинное обучение']
+            )
+        html_list = [
+            f'<html><body><p>Описание &amp; <b>вакансии</b></p><div>{tags}</div></body></html>',
+            '<html><body><span class="bloko-tag__section">Python</span></body></html>',
+            ''
+            ]
+        extractor = SkillExtractor(backend='html5lib')
+        self.assertEqual(extractor.extract(html_list[0])[1:3], ['C++', 'SQL & NoSQL'])
+        self.assertEqual(set(extractor.compare(html_list).values()), {0})
+
+    def test_extract_vacancy_skills(self) -> None:
+        '''
+        Test skills of page are normalized and spellings what differ only by case are one skill.
+        '''
+        init_process('html5lib')
+        tags = ''.join(
+            f'<span class="bloko-tag__section bloko-tag__section_text">{i}</span>'
+            for i in ['Python', 'python ', 'ＳＱＬ', 'SQL']
+            )
+        self.assertEqual(extract_vacancy_skills(1, f'<html><body>{tags}</body></html>'), (1, ['Python', 'SQL']))
+
+
+def get_test_orm(string_connection: str = None) -> ORM:
+    '''
+    Get ORM of test data base.
+
+    Parameters
+    ----------
+    string_connection : str, optional
+        String of connection, by default params.test_connection (in memory, only for one thread).
+
+    Returns
+    -------
+    ORM
+        ORM of test data base.
+    '''
+    test_params = Params()
+    test_params.string_connection = string_connection or params.test_connection
+    with mock.patch('src.ORM.Params', return_value=test_params):
+        return ORM()
+
+
+class TestORM(unittest.TestCase):
+    def test_migrate_skill(self) -> None:
+        '''
+        Test migration of skill with text: spellings what differ only by case get one ID of skill_dict.
+        '''
+        orm = get_test_orm()
+        date_load = datetime(2024, 1, 1)
+        orm.engine.execute('CREATE TABLE skill (vacancy_id INTEGER, skill VARCHAR, date_load DATETIME)')
+        orm.engine.execute(
+            'INSERT INTO skill VALUES (?, ?, ?)',
+            [(1, 'Python', date_load), (1, 'python ', date_load), (2, 'PYTHON', date_load), (2, 'ＳＱＬ', date_load)]
+            )
+        orm.create_delete_tables()
+        skill_dict = dict(orm.engine.execute(select([SkillDict.skill, SkillDict.skill_id])).fetchall())
+        self.assertEqual(set(skill_dict), {'Python', 'SQL'})
+        skills = orm.engine.execute(select([Skill.vacancy_id, Skill.skill_id]).order_by(Skill.vacancy_id)).fetchall()
+        self.assertEqual(
+            sorted(skills),
+            sorted([(1, skill_dict['Python']), (2, skill_dict['Python']), (2, skill_dict['SQL'])])
+            )
+        self.assertEqual(
+            orm.get_skill_id(['pyTHON', 'Sql']),
+            {'pyTHON': skill_dict['Python'], 'Sql': skill_dict['SQL']}
+            )
+        new_id = orm.get_skill_id(['Go', 'GO'])
+        self.assertEqual(new_id['Go'], new_id['GO'])
+
+
+    def test_get_top_skill(self) -> None:
+        '''
+        Test top skills of region: rectangle with vacancies returns their skills, rectangle without - nothing.
+        '''
+        orm = get_test_orm()
+        orm.create_delete_tables()
+        date_load = datetime(2024, 1, 1)
+# Coordinates of map as written by MapParser: longitude is lat of hh, latitude is lng of hh
+        orm.insert_values([
+            {'vacancy_id': i, 'vacancy_name': 'name', 'longitude': 55.75, 'latitude': 37.6, 'date_load': date_load}
+            for i in range(30)
+            ], Map)
+        skill_id = orm.get_skill_id(['Python', 'SQL'])
+        orm.insert_skill_records([
+            {'vacancy_id': i, 'skill_id': skill_id[skill], 'date_load': date_load}
+            for i in range(30) for skill in ['Python', 'SQL']
+            ])
+        orm.update_skill_stats()
+        rectangle = Polygon([(37.5, 55.7), (37.5, 55.8), (37.7, 55.8), (37.7, 55.7)])
+        result = orm.get_top_skill(rectangle=rectangle)
+        self.assertEqual(sorted(zip(result['skill'], result['count_vacancy'])), [('Python', 30), ('SQL', 30)])
+        rectangle = Polygon([(30.2, 59.9), (30.2, 60.0), (30.4, 60.0), (30.4, 59.9)])
+        self.assertTrue(orm.get_top_skill(rectangle=rectangle).empty)
+
+
+def get_test_map_records(vacancy_id_list: list) -> list:
+    '''
+    Get rows of map for test.
+
+    Parameters
+    ----------
+    vacancy_id_list : list
+        Id of vacancies.
+
+    Returns
+    -------
+    list
+        Rows of map.
+    '''
+    date_load = datetime(2024, 1, 1)
+    return [
+        {'vacancy_id': i, 'vacancy_name': 'name', 'longitude': 55.75, 'latitude': 37.6, 'date_load': date_load}
+        for i in vacancy_id_list
+        ]
+
+
+class TestBatchWriter(unittest.TestCase):
+    def setUp(self) -> None:
+        '''
+        Create ORM of temporary data base file (writer writes from its own thread).
+        '''
+        self.orm = get_test_orm(f'sqlite:///{os.path.join(tempfile.mkdtemp(), "test.db")}')
+        self.orm.create_delete_tables()
+
+    def get_map_id(self) -> list:
+        '''
+        Get id of vacancies of map.
+
+        Returns
+        -------
+        list
+            Id of vacancies.
+        '''
+        return [i[0] for i in self.orm.engine.execute(select([Map.vacancy_id]).order_by(Map.vacancy_id))]
+
+    def test_batch(self) -> None:
+        '''
+        Test rows of many puts are written by batches of batch_size.
+        '''
+        writer = BatchWriter(self.orm, batch_size=4, flush_interval=60)
+        for i in range(10):
+            writer.put(get_test_map_records([i]), Map)
+        writer.flush()
+        self.assertEqual(self.get_map_id(), list(range(10)))
+        self.assertEqual(writer.get_stats()['rows'], 10)
+        self.assertEqual(writer.get_stats()['batches'], 3)
+        writer.close()
+
+    def test_integrity_error(self) -> None:
+        '''
+        Test duplicate does not drop batch: rows are written one by one, ignore skips duplicates.
+        '''
+        writer = BatchWriter(self.orm, batch_size=100, flush_interval=60)
+        writer.put(get_test_map_records([1, 2, 2, 3]), Map)
+        writer.flush()
+        self.assertEqual(self.get_map_id(), [1, 2, 3])
+        self.assertEqual(writer.get_stats()['failed_rows'], 1)
+        writer.put(get_test_map_records([3, 4]), Map, ignore=True)
+        writer.flush()
+        self.assertEqual(self.get_map_id(), [1, 2, 3, 4])
+        self.assertEqual(writer.get_stats()['failed_rows'], 1)
+        writer.close()
+
+    def test_flush_close(self) -> None:
+        '''
+        Test bad record does not stop writer and rows put after close are written by flush.
+        '''
+        writer = BatchWriter(self.orm, batch_size=100, flush_interval=60)
+        writer.put([None], Map)
+        writer.put(get_test_map_records([1]), Map)
+        writer.flush()
+        self.assertTrue(writer.get_stats()['alive'])
+        self.assertEqual(writer.get_stats()['failed_rows'], 1)
+        writer.close()
+        self.assertFalse(writer.get_stats()['alive'])
+        writer.put(get_test_map_records([2]), Map)
+        writer.flush()
+        self.assertEqual(self.get_map_id(), [1, 2])
+        self.assertEqual(writer.get_stats()['queue_size'], 0)
+
+
+class TestIncrementalCrawl(unittest.TestCase):
+    def setUp(self) -> None:
+        '''
+        Create ORM of temporary data base file with map of vacancies 1-7: pages of 2 and 6 are fresh,
+        page of 4 is old, vacancy 7 is in dead letter.
+        '''
+        self.orm = get_test_orm(f'sqlite:///{os.path.join(tempfile.mkdtemp(), "test.db")}')
+        self.orm.create_delete_tables()
+        self.orm.insert_values(get_test_map_records(range(1, 8)), Map)
+        now = datetime.utcnow() - timedelta(minutes=1)
+        tags = '<span class="bloko-tag__section bloko-tag__section_text">Python</span>'
+        self.orm.insert_values([
+            {'vacancy_id': i, 'html': f'<html><body>{tags}</body></html>', 'date_load': date_load}
+            for i, date_load in [(2, now), (4, now - timedelta(days=30)), (6, now)]
+            ], VacancyHTML)
+        self.orm.insert_values(
+            [{'kind': 'vacancy_html', 'key': '7', 'error': 'HTTP 404', 'attempts': 1, 'reason': 'permanent', 'date_load': now}],
+            DeadLetter
+            )
+
+    def test_get_missing_vacancy_id(self) -> None:
+        '''
+        Test missing id are read by chunks without dead letter, stale pages are loaded again.
+        '''
+        self.assertEqual(list(self.orm.get_missing_vacancy_id(chunk_size=2)), [1, 3, 5])
+        self.assertEqual(list(self.orm.get_missing_vacancy_id(stale_days=10, chunk_size=2)), [1, 3, 4, 5])
+
+    def test_insert_skill(self) -> None:
+        '''
+        Test second incremental run processes nothing, pages loaded after watermark are processed by next run.
+        '''
+        self.assertEqual(self.orm.insert_skill(backend='html5lib', processes=1, watermark_lag=0)['pages'], 3)
+        self.assertEqual(self.orm.insert_skill(backend='html5lib', processes=1, watermark_lag=0)['pages'], 0)
+        self.orm.insert_values([{'vacancy_id': 1, 'html': '<html></html>', 'date_load': datetime.utcnow()}], VacancyHTML)
+        self.assertEqual(self.orm.insert_skill(backend='html5lib', processes=1, watermark_lag=0)['pages'], 1)
+        self.assertEqual(self.orm.engine.execute(select([Skill.vacancy_id]).order_by(Skill.vacancy_id)).fetchall(), [
+            (2,), (4,), (6,)
+            ])
+
+    def test_write_mass_vacancies_html(self) -> None:
+        '''
+        Test incremental crawl (replay of cache) loads only missing pages and second run writes nothing.
+        '''
+        cache = ResponseCache(path=tempfile.mkdtemp(), replay=True)
+        with mock.patch('src.WebScraper.ORM', return_value=self.orm), \
+                mock.patch('src.WebScraper.ResponseCache', return_value=cache), \
+                mock.patch('src.WebScraper.TorCircuitPool'), \
+                mock.patch('src.WebScraper.webdriver'), \
+                mock.patch('src.WebScraper.tqdm_notebook', side_effect=lambda iterable: iterable):
+            scraper = WebScraper()
+            for i in [1, 3, 4]:
+                cache.put(scraper.get_vacancy_url(i), f'<html>{i}</html>'.encode())
+            self.assertEqual(scraper.write_mass_vacancies_html(threads_namber=2, incremental=True)['items'], 3)
+            self.assertEqual(list(self.orm.get_missing_vacancy_id()), [5])
+            self.assertEqual(scraper.write_mass_vacancies_html(threads_namber=2, incremental=True)['items'], 1)
+            self.assertEqual(scraper.writer.get_stats()['rows'], 2)
+            scraper.writer.close()
+        cache.close()
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_state(self) -> None:
+        '''
+        Test transitions: closed -> open after threshold -> half open after timeout -> open or closed.
+        '''
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        now = time.monotonic()
+        with mock.patch('src.Retry.time.monotonic', return_value=now):
+            breaker.record_failure()
+            self.assertEqual(breaker.state, 'closed')
+            self.assertEqual(breaker.get_wait(), 0.0)
+            breaker.record_failure()
+            self.assertEqual(breaker.state, 'open')
+            self.assertEqual(breaker.get_wait(), 60)
+        with mock.patch('src.Retry.time.monotonic', return_value=now + 61):
+            self.assertEqual(breaker.state, 'half_open')
+            self.assertEqual(breaker.get_wait(), 0.0)
+# Failure of trial request opens breaker again
+            breaker.record_failure()
+            self.assertEqual(breaker.state, 'open')
+            self.assertEqual(breaker.openings, 2)
+        with mock.patch('src.Retry.time.monotonic', return_value=now + 122):
+            self.assertEqual(breaker.state, 'half_open')
+            breaker.record_success()
+            self.assertEqual(breaker.state, 'closed')
+            self.assertEqual(breaker.failures, 0)
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_report(self) -> None:
+        '''
+        Test AIMD: additive increase by fraction of start rate, multiplicative decrease after block, limits of rate.
+        '''
+        limiter = RateLimiter(host_rates={'hh.ru': 2.0}, circuit_rate=0.5)
+        url = 'https://spb.hh.ru/search/vacancy'
+        circuit = mock.Mock(number=1)
+        for _ in range(10):
+            limiter.report(url, circuit)
+        host_bucket, circuit_bucket = limiter.get_buckets(url, circuit)
+        self.assertAlmostEqual(host_bucket.rate, 2.0 + 10 * 2.0 * params.rate_limit_increase)
+        self.assertAlmostEqual(circuit_bucket.rate, 0.5 + 10 * 0.5 * params.rate_limit_increase)
+        limiter.report(url, circuit, blocked=True)
+        self.assertAlmostEqual(host_bucket.rate, (2.0 + 10 * 2.0 * params.rate_limit_increase) * params.rate_limit_decrease)
+        self.assertEqual(limiter.get_stats()['host:hh.ru']['blocks'], 1)
+# Step of increase does not depend on current rate
+        rate = host_bucket.rate
+        limiter.report(url)
+        self.assertAlmostEqual(host_bucket.rate - rate, 2.0 * params.rate_limit_increase)
+        for _ in range(100):
+            limiter.report(url, blocked=True)
+        self.assertAlmostEqual(host_bucket.rate, host_bucket.min_rate)
+        for _ in range(10000):
+            limiter.report(url)
+        self.assertAlmostEqual(host_bucket.rate, host_bucket.max_rate)
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self) -> None:
+        '''
+        Create cache in temporary directory.
+        '''
+        self.cache = ResponseCache(path=tempfile.mkdtemp(), ttl=60, replay=False)
+
+    def tearDown(self) -> None:
+        self.cache.close()
+
+    def test_get(self) -> None:
+        '''
+        Test url is canonical: order of parameters does not matter.
+        '''
+        self.cache.put('https://HH.ru/search/vacancy?text=python&area=1', b'content')
+        self.assertEqual(self.cache.get('https://hh.ru/search/vacancy', {'area': 1, 'text': 'python'}), b'content')
+        self.assertIsNone(self.cache.get('https://hh.ru/search/vacancy', {'area': 2, 'text': 'python'}))
+
+    def test_ttl(self) -> None:
+        '''
+        Test expired response is missed, but is replayed in replay mode.
+        '''
+        url = 'https://hh.ru/vacancy/1'
+        self.cache.put(url, b'content')
+        with mock.patch('src.ResponseCache.time.time', return_value=time.time() + 120):
+            self.assertIsNone(self.cache.get(url))
+            self.cache.replay = True
+            self.assertEqual(self.cache.get(url), b'content')
+        self.assertEqual(self.cache.get_stats()['hits'], 1)
+        self.assertEqual(self.cache.get_stats()['misses'], 1)
+
+    def test_iter_responses(self) -> None:
+        '''
+        Test replay iterates over responses of prefix with time of load.
+        '''
+        start = time.time()
+        self.cache.put('https://hh.ru/vacancy/1', b'first')
+        self.cache.put('https://hh.ru/vacancy/2', b'second')
+        self.cache.put('https://hh.ru/search/vacancy', b'map')
+        responses = list(self.cache.iter_responses('https://hh.ru/vacancy/'))
+        self.assertEqual(
+            [(url, content) for url, content, _ in responses],
+            [('https://hh.ru/vacancy/1', b'first'), ('https://hh.ru/vacancy/2', b'second')]
+            )
+        self.assertTrue(all(created >= start for _, _, created in responses))
+
+
+class TestSalaryAnalytics(unittest.TestCase):
+    def test_get_distribution(self) -> None:
+        '''
+        Test distribution by skills in one sort is equal to numpy.percentile of every skill.
+        '''
+        random_state = np.random.RandomState(0)
+        skill_id = random_state.randint(0, 20, 1000)
+        salary = random_state.lognormal(11, 0.5, 1000)
+        result = SalaryAnalytics.get_distribution(skill_id, salary, [10, 50, 90])
+        for i, value in enumerate(result['skill_id']):
+            expected = np.percentile(salary[skill_id == value], [10, 50, 90])
+            self.assertEqual(result['count_vacancy'][i], (skill_id == value).sum())
+            np.testing.assert_allclose([result[f'salary_p{p}'][i] for p in [10, 50, 90]], expected)
+        salary = SalaryAnalytics.get_salary(np.array([1.0, np.nan, 1.0]), np.array([3.0, 2.0, np.nan]))
+        self.assertEqual(salary.tolist(), [2.0, 2.0, 1.0])
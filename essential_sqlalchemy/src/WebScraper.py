@@ -3,33 +3,49 @@ from src.Params import Params
 
 # Work with data base
 from src.ORM import ORM
-from src.ORM import Map, VacancyHTML
+from src.BatchWriter import BatchWriter
+from src.ORM import Map, VacancyHTML, DeadLetter
 
 # Work with geo data
 from src.Geo import Geo
 
+# Work with response of map
+from src.MapParser import MapParser
+
+# Work with asynchronous crawl
+from src.AsyncCrawler import AsyncCrawler
+
 # For work with HTTP queries
 import requests
-from requests import ConnectTimeout, ConnectionError, ReadTimeout
+from requests import RequestException
 # For work with browser
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
-# Work with HTML
-from bs4 import BeautifulSoup
 from urllib3.exceptions import MaxRetryError
 # For generate fake user agent
 from fake_useragent import UserAgent
 
 # For work with TOR
-from stem import Signal
-from stem.control import Controller
+from src.TorCircuitPool import TorCircuitPool, Circuit
+
+# For work with persistent HTTP sessions
+from src.SessionPool import SessionPool
 
-# Work with json
-import json
+# For limit rate of requests
+from src.RateLimiter import RateLimiter
+
+# For retries of requests
+from src.Retry import RetryPolicy, RetryableError, PermanentError
+
+# For cache of HTTP responses
+from src.ResponseCache import ResponseCache, CacheMissError
 
 # Work with random objects
 import random
 
+# For work with data type
+from typing import Callable
+
 # Work with parallelism
 from multiprocessing.dummy import Pool as ThreadPool
 
@@ -51,7 +67,22 @@ class WebScraper:
     def __init__(self) -> None:
         self.params = Params()
         self.orm = ORM()
-        self.geo = Geo()
+# Background batch writer into data base
+        self.writer = BatchWriter(self.orm)
+# Cache of HTTP responses (replay mode works without network)
+        self.response_cache = ResponseCache()
+        self.geo = Geo(response_cache=self.response_cache)
+        self.map_parser = MapParser()
+# Multipolygon of the city for quadtree tiles
+        self.city_multipolygon = None
+# Pool of TOR circuits
+        self.circuit_pool = TorCircuitPool()
+# Pool of persistent HTTP sessions
+        self.session_pool = SessionPool()
+# Limits of requests by hosts and circuits
+        self.rate_limiter = RateLimiter()
+# Retries with backoff and breakers of hosts
+        self.retry_policy = RetryPolicy()
 # Set HTTP headers
         self.headers = {'User-Agent': ua.random}
 # Get Chrome options
@@ -75,27 +106,34 @@ class WebScraper:
 
     def close_all(self) -> None:
         '''
-        Close the driver.
+        Close the driver, control connection of TOR, HTTP sessions, write queue of data base and cache.
         '''
         for window_handle in self.driver.window_handles:
             self.driver.switch_to.window(window_handle)
             self.driver.close()
         self.driver.quit()
+        self.circuit_pool.close()
+        self.session_pool.close()
+        self.writer.close()
+        self.response_cache.close()
 
-    def get_session(self) -> requests.sessions.Session:
+    def get_session(self, circuit: Circuit = None) -> requests.sessions.Session:
         '''
-        Get seesion.
+        Get seesion from pool of persistent sessions.
+
+        Parameters
+        ----------
+        circuit : Circuit, optional
+                Circuit of TOR, by default None (common proxy).
+
+        Returns
         -------
         requests.sessions.Session
             return object of session requests.
         '''
-        session = requests.session()
-        session.proxies = {}
-        session.proxies['http'] = self.params.proxies
-        session.proxies['https'] = self.params.proxies
-        return session
+        return self.session_pool.get_session(circuit)
 
-    def get_vacancies_list(self, vacancies_list: list) -> list:
+    def get_vacancies_list(self, vacancies_list: list, date_load: datetime = None) -> list:
         '''
         Get vacancies from list.
 
@@ -103,37 +141,163 @@ class WebScraper:
         ----------
         vacancies_list : list
         List of vacancies.
+        date_load : datetime, optional
+        Date of load of vacancies, by default datetime.utcnow().
 
         Returns
         -------
         list
         List of vacancies for write into data base.
         '''
-        result_list = []
         if vacancies_list:
-            for vacancy in vacancies_list:
-                if vacancy.get('compensation'):
-                    compensation_from = vacancy.get('compensation').get('from')
-                    compensation_to = vacancy.get('compensation').get('to')
-                    compensation_currency_code = vacancy.get('compensation').get('currencyCode')
-                else:
-                    compensation_from, compensation_to, compensation_currency_code = None, None, None
-                current_dict = {
-                        'vacancy_id': vacancy.get('id'),
-                        'vacancy_name': vacancy.get('name'),
-                        'company_id': vacancy.get('company').get('id') if vacancy.get('company') else None,
-                        'company_name': vacancy.get('company').get('name') if vacancy.get('company') else None,
-                        'longitude':  vacancy.get('address').get('lat'),
-                        'latitude': vacancy.get('address').get('lng'),
-                        'compensation_from': compensation_from,
-                        'compensation_to': compensation_to,
-                        'compensation_currency_code': compensation_currency_code,
-                        'date_load': datetime.utcnow()
-                        }
-                result_list.append(current_dict)
-                return result_list
-        else:
-            return None
+            return self.map_parser.get_records(vacancies_list, date_load)
+        return None
+
+    def get_map_url(self, rectangle: shapely.geometry.polygon.Polygon, url_param: str = None) -> str:
+        '''
+        Get url of map for rectangle.
+
+        Parameters
+        ----------
+        rectangle : shapely.geometry.polygon.Polygon
+                Tuple of rectangle bound.
+        url_param : str, optional
+                url with data, by default None
+
+        Returns
+        -------
+        str
+                Url of map.
+        '''
+        if url_param:
+            return url_param
+        bottom_left_lng, bottom_left_lat, top_right_lng, top_right_lat = rectangle.bounds
+        return self.params.hh_map_vacancy_url.format(
+            bottom_left_lng=bottom_left_lng,
+            bottom_left_lat=bottom_left_lat,
+            top_right_lng=top_right_lng,
+            top_right_lat=top_right_lat,
+            items_on_page=self.params.hh_map_items_on_page
+            )
+
+    def parse_vacancies_map(self, content: bytes) -> list:
+        '''
+        Parse response of map.
+
+        Parameters
+        ----------
+        content : bytes
+                Content of response.
+
+        Returns
+        -------
+        list
+                Vacancies from response of map.
+        '''
+        return self.map_parser.parse(content)
+
+    def get_vacancies_map(self, rectangle: shapely.geometry.polygon.Polygon, url_param: str = None) -> list:
+        '''
+        Get vacancies of rectangle from map.
+
+        Parameters
+        ----------
+        rectangle : shapely.geometry.polygon.Polygon
+                Tuple of rectangle bound.
+        url_param : str, optional
+                url with data, by default None
+
+        Returns
+        -------
+        list
+                Vacancies from response of map.
+        '''
+
+        url = self.get_map_url(rectangle=rectangle, url_param=url_param)
+        try:
+            return self.fetch(url, parse=self.parse_vacancies_map)
+        except PermanentError as e:
+            self.write_dead_letter(kind='map', key=url, error=e)
+            return []
+        except CacheMissError:
+            return []
+
+    def fetch(self, url: str, parse: Callable = None) -> object:
+        '''
+        Get response from cache or by retry policy: circuit of TOR, limit of rate, backoff and breaker of host.
+
+        Parameters
+        ----------
+        url : str
+                Url.
+        parse : Callable, optional
+                Function content -> result, errors of parsing are retried, by default None.
+
+        Returns
+        -------
+        object
+                Content of response or result of parse.
+
+        Raises
+        ------
+        PermanentError
+                Error is permanent (404, 410) or attempts are exhausted.
+        CacheMissError
+                Response is not in cache in replay mode.
+        '''
+# Responses are read from cache only in replay mode: crawl of snapshot must get current pages
+        content = self.response_cache.get(url) if self.response_cache.replay else None
+        if content is not None:
+            try:
+                return parse(content) if parse else content
+            except ValueError:
+                self.response_cache.delete(url)
+        if self.response_cache.replay:
+            raise CacheMissError(url)
+
+        def attempt():
+            circuit = self.circuit_pool.acquire()
+            self.rate_limiter.acquire(url, circuit)
+# Any error of requests (timeouts, ChunkedEncodingError, TooManyRedirects, ContentDecodingError) is retried
+            try:
+                r = self.session_pool.get(url, circuit=circuit, headers=self.headers)
+            except (RequestException, MaxRetryError) as e:
+                self.circuit_pool.report(circuit, success=False)
+                raise RetryableError(str(e)) from e
+            blocked = r.status_code in self.params.blocked_status_codes
+            self.circuit_pool.report(circuit, success=not blocked, blocked=blocked)
+            self.rate_limiter.report(url, circuit, blocked=blocked)
+            self.retry_policy.check_status(r.status_code)
+            try:
+                result = parse(r.content) if parse else r.content
+            except ValueError as e:
+                raise RetryableError(f'Parse error: {e}') from e
+            self.response_cache.put(url, r.content)
+            return result
+        return self.retry_policy.run(url, attempt)
+
+    def write_dead_letter(self, kind: str, key: object, error: PermanentError) -> None:
+        '''
+        Write element with permanent error or exhausted attempts into data base.
+
+        Parameters
+        ----------
+        kind : str
+                Kind of element (map, vacancy_html).
+        key : object
+                Key of element (url, id of vacancy).
+        error : PermanentError
+                Error.
+        '''
+        record = {
+            'kind': kind,
+            'key': str(key),
+            'error': str(error),
+            'attempts': error.attempts,
+            'reason': error.reason,
+            'date_load': datetime.utcnow()
+        }
+        self.writer.put(records=[record], table=DeadLetter)
 
     def write_vacancies_map(self, rectangle: shapely.geometry.polygon.Polygon, url_param: str = None) -> None:
         '''
@@ -147,31 +311,98 @@ class WebScraper:
                 url with data, by default None
         '''
 
-        bottom_left_lng, bottom_left_lat, top_right_lng, top_right_lat = rectangle.bounds
-        if url_param:
-            url = url_param
-        else:
-            url = self.params.hh_map_vacancy_url.format(
-                bottom_left_lng=bottom_left_lng,
-                bottom_left_lat=bottom_left_lat,
-                top_right_lng=top_right_lng,
-                top_right_lat=top_right_lat
-                )
-        while True:
-            time.sleep(10)
-            self.change_ip()
-            session = self.get_session()
-            try:
-                r = session.get(url, headers=self.headers, timeout=10)
-                bsObj = BeautifulSoup(r.content, 'html5lib')
-                if bsObj.text:
-                    json_vacancies = json.loads(bsObj.text)
-                    records = self.get_vacancies_list(json_vacancies['vacancies'])
-                    if records:
-                        self.orm.insert_values(records=records, table=Map)
-                break
-            except (ConnectTimeout, ConnectionError, ReadTimeout, MaxRetryError):
-                continue
+        records = self.get_vacancies_list(self.get_vacancies_map(rectangle=rectangle, url_param=url_param))
+        if records:
+            self.writer.put(records=records, table=Map)
+
+    def write_quadtree_tile(self, tile: tuple) -> tuple:
+        '''
+        Write vacancies of quadtree tile or split it, if response hits limit of map.
+
+        Parameters
+        ----------
+        tile : tuple
+                Rectangle of tile and flag what tile can be split.
+
+        Returns
+        -------
+        tuple
+                Count of vacancies in response and list of child tiles.
+        '''
+        rectangle, can_split = tile
+        vacancies = self.get_vacancies_map(rectangle=rectangle)
+        if can_split and len(vacancies) >= self.params.hh_map_items_on_page:
+            return (len(vacancies), self.geo.split_rectangle(rectangle, city_multipolygon=self.city_multipolygon))
+        records = self.get_vacancies_list(vacancies)
+        if records:
+            self.writer.put(records=records, table=Map)
+        return (len(vacancies), [])
+
+    def write_quadtree_vacancies_map(
+        self,
+        start_level: int = None,
+        min_level: int = None,
+        threads_namber: int = 25
+    ) -> dict:
+        '''
+        Write vacancies with adaptive quadtree: start from large tiles,
+        split tile only when response hits limit of map.
+
+        Parameters
+        ----------
+        start_level : int, optional
+        Level of start tiles, by default Params.quadtree_start_level
+        min_level : int, optional
+        Level of the smallest tiles, by default Params.quadtree_min_level
+        threads_namber : int, optional
+        Count of threads, by default 25
+
+        Returns
+        -------
+        dict
+        Report: tiles fetched by levels against tiles of fixed grid.
+        '''
+        start_level = self.params.quadtree_start_level if start_level is None else start_level
+        min_level = self.params.quadtree_min_level if min_level is None else min_level
+
+# Get city data
+        city_data = self.geo.get_city_polygon()
+        self.city_multipolygon = self.geo.get_city_multipolygon(city_data[0])
+        tiles = self.geo.generate_rectangle(city_data=city_data, level=start_level)
+
+        report = {
+            'fixed_grid_tiles': len(self.geo.generate_rectangle(city_data=city_data)),
+            'tiles_fetched': 0,
+            'tiles_split': 0,
+            'tiles_truncated': 0,
+            'vacancies': 0,
+            'levels': {}
+            }
+        level = start_level
+        with ThreadPool(threads_namber) as p:
+            while tiles:
+                random.shuffle(tiles)
+                can_split = level > min_level
+                next_tiles = []
+                for vacancies_number, children in tqdm_notebook(
+                    p.imap_unordered(self.write_quadtree_tile, [(i, can_split) for i in tiles]),
+                    total=len(tiles),
+                    desc=f'level {level}'
+                ):
+                    if children:
+                        report['tiles_split'] += 1
+                        next_tiles.extend(children)
+                    else:
+                        report['vacancies'] += vacancies_number
+                        if vacancies_number >= self.params.hh_map_items_on_page:
+                            report['tiles_truncated'] += 1
+                report['levels'][level] = len(tiles)
+                report['tiles_fetched'] += len(tiles)
+                tiles = next_tiles
+                level -= 1
+        self.writer.flush()
+        report['requests_ratio'] = report['tiles_fetched'] / max(report['fixed_grid_tiles'], 1)
+        return report
 
     def get_bypass_dict(
         self,
@@ -213,7 +444,7 @@ class WebScraper:
 # Shuffle data
         return bypass_dict
 
-    def write_mass_vacancies_map(self, threads_namber: int = 25) -> None:
+    def write_mass_vacancies_map(self, threads_namber: int = 25) -> dict:
         '''
         Mass write data.
 
@@ -221,6 +452,11 @@ class WebScraper:
         ----------
         threads_namber : int, optional
         Count of threads, by default 25
+
+        Returns
+        -------
+        dict
+        Statistics of crawl.
         '''
 
 # Get all rectanles
@@ -230,9 +466,84 @@ class WebScraper:
         random.shuffle(rectangle_all)
         bypass_dict = self.get_bypass_dict(multiplicity_number=threads_namber, last_number=len(rectangle_all))
 
+        start = time.perf_counter()
         with ThreadPool(threads_namber) as p:
             for i in tqdm_notebook(bypass_dict.keys()):
                 p.map(self.write_vacancies_map, rectangle_all[bypass_dict[i][0]:bypass_dict[i][1]])
+        self.writer.flush()
+        return self.get_crawl_stats(items_number=len(rectangle_all), seconds=time.perf_counter() - start)
+
+    def write_map_content(self, content: bytes) -> None:
+        '''
+        Parse response of map and write vacancies into data base.
+
+        Parameters
+        ----------
+        content : bytes
+        Content of response.
+        '''
+        records = self.get_vacancies_list(self.parse_vacancies_map(content))
+        if records:
+            self.writer.put(records=records, table=Map)
+
+    def write_mass_vacancies_map_async(self, concurrency: int = None) -> dict:
+        '''
+        Mass write data with asynchronous crawler (without barriers between chunks).
+
+        Parameters
+        ----------
+        concurrency : int, optional
+        Count of requests in flight, by default Params.crawl_concurrency
+
+        Returns
+        -------
+        dict
+        Statistics of crawl.
+        '''
+
+# Get all rectanles
+        rectangle_all = self.geo.generate_rectangle()
+# Shufle data
+        random.shuffle(rectangle_all)
+
+        crawler = AsyncCrawler(
+            concurrency=concurrency,
+            headers=self.headers,
+            circuit_pool=self.circuit_pool,
+            rate_limiter=self.rate_limiter,
+            retry_policy=self.retry_policy,
+            response_cache=self.response_cache
+            )
+        stats = crawler.crawl(
+            rectangle_all,
+            get_url=self.get_map_url,
+            handle=lambda rectangle, content: self.write_map_content(content),
+            handle_dead_letter=lambda rectangle, error: self.write_dead_letter('map', self.get_map_url(rectangle), error)
+            )
+        self.writer.flush()
+        return stats
+
+    def get_crawl_stats(self, items_number: int, seconds: float) -> dict:
+        '''
+        Get statistics of crawl with thread pool.
+
+        Parameters
+        ----------
+        items_number : int
+        Count of items.
+        seconds : float
+        Duration of crawl.
+
+        Returns
+        -------
+        dict
+        Statistics of crawl in format of AsyncCrawler.
+        '''
+        return {
+            'items': items_number,
+            'seconds': seconds,
+            'items_per_second': items_number / seconds if seconds else 0.0
+            }
 
     def test_proxy(self, timout: int = 10) -> bool:
         '''
@@ -248,25 +559,20 @@ class WebScraper:
         bool
                 Result testing proxy.
         '''
-        session1 = self.get_session()
-        r1 = session1.get(self.params.url_get_external_ip, headers=self.headers, timeout=timout)
+        circuit = self.circuit_pool.acquire()
+        r1 = self.session_pool.get(self.params.url_get_external_ip, circuit=circuit, headers=self.headers, timeout=timout)
 
-# Wait for change ip
-        self.change_ip()
-        time.sleep(timout)
+# New credentials of circuit give new circuit (and IP)
+        self.circuit_pool.rotate(circuit)
 
-        session2 = self.get_session()
-        r2 = session2.get(self.params.url_get_external_ip, headers=self.headers, timeout=timout)
+        r2 = self.session_pool.get(self.params.url_get_external_ip, circuit=circuit, headers=self.headers, timeout=timout)
         return r1.content != r2.content
 
     def change_ip(self) -> None:
         '''
-        Change IP via TOR.
+        Change IP of all circuits via TOR (NEWNYM through persistent control connection).
         '''
-
-        with Controller.from_port(address=self.params.tor_host, port=int(self.params.tor_control_port)) as controller:
-            controller.authenticate(password=self.params.tor_password)
-            controller.signal(Signal.NEWNYM)
+        self.circuit_pool.newnym()
 
     def write_vacancies_html(self, vacancy_id: int) -> None:
         '''
@@ -277,25 +583,68 @@ class WebScraper:
         vacancy_id : int
                 Id of vacancy.
         '''
-        url = f'{self.params.hh_main_url}{vacancy_id}'
-        while True:
-            time.sleep(10)
-            self.change_ip()
-            session = self.get_session()
-            try:
-                r = session.get(url, headers=self.headers, timeout=10)
-                bsObj = BeautifulSoup(r.content, 'html5lib')
-                records = {
-                        'vacancy_id': vacancy_id,
-                        'html': str(bsObj),
-                        'date_load': datetime.utcnow()
-                }
-                self.orm.insert_values(records=[records], table=VacancyHTML)
-                break
-            except (ConnectTimeout, ConnectionError, ReadTimeout, MaxRetryError):
-                continue
-
-    def write_mass_vacancies_html(self, threads_namber: int = 25) -> None:
+        url = self.get_vacancy_url(vacancy_id)
+        try:
+            content = self.fetch(url)
+        except PermanentError as e:
+            self.write_dead_letter(kind='vacancy_html', key=vacancy_id, error=e)
+            return
+        except CacheMissError:
+            return
+        self.write_vacancy_content(vacancy_id, content)
+
+    def get_vacancy_id_list(self) -> list:
+        '''
+        Get id of vacancies from map without vacancies of dead letter (see ORM.get_dead_letter_condition).
+
+        Returns
+        -------
+        list
+                List of id vacancies.
+        '''
+        dead_keys = self.orm.get_dead_letter_keys(kind='vacancy_html')
+        return [i for i in self.orm.get_vacancy_id_map() if str(i) not in dead_keys]
+
+    def get_vacancy_url(self, vacancy_id: int) -> str:
+        '''
+        Get url of vacancy.
+
+        Parameters
+        ----------
+        vacancy_id : int
+                Id of vacancy.
+
+        Returns
+        -------
+        str
+                Url of vacancy.
+        '''
+        return f'{self.params.hh_main_url}{vacancy_id}'
+
+    def write_vacancy_content(self, vacancy_id: int, content: bytes) -> None:
+        '''
+        Write original content of vacancy page into data base (compressed).
+
+        Parameters
+        ----------
+        vacancy_id : int
+                Id of vacancy.
+        content : bytes
+                Content of response.
+        '''
+        records = {
+                'vacancy_id': vacancy_id,
+                'content': self.orm.content_store.compress(content),
+                'date_load': datetime.utcnow()
+        }
+        self.writer.put(records=[records], table=VacancyHTML, replace=True)
+
+    def write_mass_vacancies_html(
+        self,
+        threads_namber: int = 25,
+        incremental: bool = False,
+        stale_days: int = None
+    ) -> dict:
         '''
         Mass write data.
 
@@ -303,14 +652,134 @@ class WebScraper:
         ----------
         threads_namber : int, optional
         Count of threads, by default 25
+        incremental : bool, optional
+        Load only id what are not in vacncy_html (or are stale), by default False
+        stale_days : int, optional
+        Pages older than stale_days are loaded again in incremental mode, by default None
+
+        Returns
+        -------
+        dict
+        Statistics of crawl.
         '''
 
+        if incremental:
+            start = time.perf_counter()
+            items_number = 0
+            with ThreadPool(threads_namber) as p:
+                for _ in tqdm_notebook(p.imap_unordered(
+                    self.write_vacancies_html,
+                    self.orm.get_missing_vacancy_id(stale_days=stale_days)
+                )):
+                    items_number += 1
+            self.writer.flush()
+            return self.get_crawl_stats(items_number=items_number, seconds=time.perf_counter() - start)
+
 # Get id list
-        id_list = self.orm.get_vacancy_id_map()
+        id_list = self.get_vacancy_id_list()
 # Shufle data
         random.shuffle(id_list)
         bypass_dict = self.get_bypass_dict(multiplicity_number=threads_namber, last_number=len(id_list))
 
+        start = time.perf_counter()
         with ThreadPool(threads_namber) as p:
             for i in tqdm_notebook(bypass_dict.keys()):
                 p.map(self.write_vacancies_html, id_list[bypass_dict[i][0]:bypass_dict[i][1]])
+        self.writer.flush()
+        return self.get_crawl_stats(items_number=len(id_list), seconds=time.perf_counter() - start)
+
+    def write_mass_vacancies_html_async(
+        self,
+        concurrency: int = None,
+        incremental: bool = False,
+        stale_days: int = None
+    ) -> dict:
+        '''
+        Mass write data with asynchronous crawler (without barriers between chunks).
+
+        Parameters
+        ----------
+        concurrency : int, optional
+        Count of requests in flight, by default Params.crawl_concurrency
+        incremental : bool, optional
+        Stream only id what are not in vacncy_html (or are stale), by default False
+        stale_days : int, optional
+        Pages older than stale_days are loaded again in incremental mode, by default None
+
+        Returns
+        -------
+        dict
+        Statistics of crawl.
+        '''
+
+        if incremental:
+            id_list = self.orm.get_missing_vacancy_id(stale_days=stale_days)
+        else:
+# Get id list
+            id_list = self.get_vacancy_id_list()
+# Shufle data
+            random.shuffle(id_list)
+
+        crawler = AsyncCrawler(
+            concurrency=concurrency,
+            headers=self.headers,
+            circuit_pool=self.circuit_pool,
+            rate_limiter=self.rate_limiter,
+            retry_policy=self.retry_policy,
+            response_cache=self.response_cache
+            )
+        stats = crawler.crawl(
+            id_list,
+            get_url=self.get_vacancy_url,
+            handle=self.write_vacancy_content,
+            handle_dead_letter=lambda vacancy_id, error: self.write_dead_letter('vacancy_html', vacancy_id, error)
+            )
+        self.writer.flush()
+        return stats
+
+    def replay_vacancies_map(self) -> dict:
+        '''
+        Parse cached responses of map again and write vacancies into data base (without network):
+        vacancies get time of load of response, so snapshot is not duplicated by time of replay,
+        and rows what are already stored are skipped.
+
+        Returns
+        -------
+        dict
+        Count of responses and vacancies.
+        '''
+        stats = {'responses': 0, 'vacancies': 0}
+        prefix = self.params.hh_map_vacancy_url.split('?')[0]
+        for _, content, created in tqdm_notebook(self.response_cache.iter_responses(prefix)):
+            records = self.get_vacancies_list(self.parse_vacancies_map(content), datetime.utcfromtimestamp(created))
+            stats['responses'] += 1
+            if records:
+                stats['vacancies'] += len(records)
+                self.writer.put(records=records, table=Map, ignore=True)
+        self.writer.flush()
+        return stats
+
+    def replay_vacancies_html(self, insert_skill: bool = True) -> dict:
+        '''
+        Write cached pages of vacancies into data base and extract skills again (without network).
+
+        Parameters
+        ----------
+        insert_skill : bool, optional
+        Extract skills of all pages, by default True
+
+        Returns
+        -------
+        dict
+        Count of pages and statistics of skill extraction.
+        '''
+        stats = {'pages': 0}
+        for url, content, _ in tqdm_notebook(self.response_cache.iter_responses(self.params.hh_main_url)):
+            vacancy_id = url[len(self.params.hh_main_url):].split('?')[0]
+            if vacancy_id.isdigit():
+                self.write_vacancy_content(int(vacancy_id), content)
+                stats['pages'] += 1
+        self.writer.flush()
+        if insert_skill:
+            stats['skill'] = self.orm.insert_skill(incremental=False, watermark_lag=0)
+        return stats
@@ -0,0 +1,256 @@
+# For work with parameters
+from .params import params
+# For work with database
+from .database import Database, table_address
+
+# Work with parallelism
+import threading
+import queue
+import atexit
+
+# For work with files
+import os
+import io
+import csv
+
+# For work with time
+import time
+from datetime import datetime
+
+# Flush buffer and stop writer
+FLUSH = object()
+STOP = object()
+
+
+class AddressWriter:
+    '''
+    Пакетная запись координат домов в geo.address: записи всех потоков геокодирования собираются в очередь
+    и пишутся COPY (или executemany) одной транзакцией на пакет; пакет пишется по размеру или по времени.
+    Пакет, который не удалось записать, сохраняется в файл и дописывается при следующем запуске.
+    '''
+    def __init__(
+        self,
+        database: Database = None,
+        batch_size: int = None,
+        flush_interval: float = None,
+        method: str = None,
+        spill_path: str = None
+    ) -> None:
+        '''
+        Init.
+
+        Parameters
+        ----------
+        database : Database, optional
+            Work with database, by default Database().
+        batch_size : int, optional
+            Count of rows for flush, by default params['address_batch_size'].
+        flush_interval : float, optional
+            Seconds between flushes, by default params['address_flush_interval'].
+        method : str, optional
+            Method of write: copy or executemany, by default params['address_write_method']
+            (executemany if database is not Postgres).
+        spill_path : str, optional
+            File of rows what were not written, by default params['address_spill_path'].
+        '''
+        self.params = params
+        self.database = database or Database()
+        self.batch_size = batch_size or self.params.get('address_batch_size')
+        self.flush_interval = flush_interval or self.params.get('address_flush_interval')
+        self.method = method or self.params.get('address_write_method')
+        self.spill_path = spill_path or self.params.get('address_spill_path')
+        if self.method not in ['copy', 'executemany']:
+            raise ValueError(f'Unknown method of address writer: {self.method}')
+        self.queue = queue.Queue()
+        self.stats = {
+            'rows': 0,
+            'batches': 0,
+            'spilled_rows': 0,
+            'lost_rows': 0,
+            'write_seconds': 0.0,
+            'last_error': None
+        }
+        self.replay_spill()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def put(self, values: tuple) -> None:
+        '''
+        Put values into queue of writer.
+
+        Parameters
+        ----------
+        values : tuple
+            Values (address, latitude, longitude).
+        '''
+        self.queue.put((values[0], values[1], values[2], datetime.utcnow()))
+
+    def flush(self) -> None:
+        '''
+        Write all values from queue and wait for it.
+        '''
+        if self.thread.is_alive():
+            self.queue.put(FLUSH)
+            self.queue.join()
+        else:
+            self.spill_queue()
+
+    def close(self) -> None:
+        '''
+        Write all values from queue and stop writer.
+        '''
+        if self.thread.is_alive():
+            self.queue.put(STOP)
+            self.thread.join()
+        self.spill_queue()
+
+    def spill_queue(self) -> None:
+        '''
+        Save values left in queue into spill file (writer is stopped), they are written at the next start.
+        '''
+        records = []
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, tuple):
+                records.append(item)
+            self.queue.task_done()
+        if records:
+            self.spill(records)
+
+    def run(self) -> None:
+        '''
+        Loop of writer: flush by size of buffer or by time.
+        '''
+        buffer, pending = [], 0
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self.queue.get(timeout=max(0.0, last_flush + self.flush_interval - time.monotonic()))
+                pending += 1
+            except queue.Empty:
+                item = FLUSH
+            if isinstance(item, tuple):
+                buffer.append(item)
+            if item is FLUSH or item is STOP or len(buffer) >= self.batch_size:
+                if buffer:
+                    self.write(buffer)
+                buffer = []
+                last_flush = time.monotonic()
+                for _ in range(pending):
+                    self.queue.task_done()
+                pending = 0
+            if item is STOP:
+                return
+
+    def write(self, records: list) -> None:
+        '''
+        Write batch, batch is saved into spill file if it is not written.
+
+        Parameters
+        ----------
+        records : list
+            Rows (address, latitude, longitude, load_dttm).
+        '''
+        start = time.perf_counter()
+        try:
+            self.write_batch(records)
+            self.stats['rows'] += len(records)
+            self.stats['batches'] += 1
+        except Exception as e:
+            # Errors of COPY are errors of driver (psycopg2.Error), not of sqlalchemy
+            self.stats['last_error'] = f'{type(e).__name__}: {e}'
+            self.spill(records)
+        self.stats['write_seconds'] += time.perf_counter() - start
+
+    def write_batch(self, records: list) -> None:
+        '''
+        Write rows into table_address in one transaction.
+
+        Parameters
+        ----------
+        records : list
+            Rows (address, latitude, longitude, load_dttm).
+        '''
+        columns = ['address', 'latitude', 'longitude', 'load_dttm']
+        with self.database.engine.begin() as con:
+            if self.method == 'copy' and con.dialect.name == 'postgresql':
+                data = io.StringIO()
+                csv.writer(data).writerows(records)
+                data.seek(0)
+                with con.connection.cursor() as cursor:
+                    cursor.copy_expert(
+                        f'COPY {table_address.schema}.{table_address.name} ({", ".join(columns)}) '
+                        'FROM STDIN WITH (FORMAT csv)',
+                        data
+                    )
+            else:
+                con.execute(table_address.insert(), [dict(zip(columns, record)) for record in records])
+
+    def spill(self, records: list) -> None:
+        '''
+        Append rows into spill file (rows are counted as lost if file can not be written).
+
+        Parameters
+        ----------
+        records : list
+            Rows (address, latitude, longitude, load_dttm).
+        '''
+        try:
+            with open(self.spill_path, 'a', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerows((i[0], i[1], i[2], i[3].isoformat()) for i in records)
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            self.stats['lost_rows'] += len(records)
+            self.stats['last_error'] = f'{type(e).__name__}: {e}'
+            return
+        self.stats['spilled_rows'] += len(records)
+
+    def replay_spill(self) -> int:
+        '''
+        Write rows of spill file (file is removed if they are written).
+
+        Returns
+        -------
+        int
+            Count of written rows.
+        '''
+        if not os.path.exists(self.spill_path):
+            return 0
+        with open(self.spill_path, newline='', encoding='utf-8') as f:
+            records = [
+                (address, float(latitude), float(longitude), datetime.fromisoformat(load_dttm))
+                for address, latitude, longitude, load_dttm in csv.reader(f)
+            ]
+        try:
+            for i in range(0, len(records), self.batch_size):
+                self.write_batch(records[i:i + self.batch_size])
+        except Exception as e:
+            self.stats['last_error'] = f'{type(e).__name__}: {e}'
+            # Written batches are removed from file, the rest is written at the next start
+            records = records[i:]
+            with open(self.spill_path, 'w', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerows((j[0], j[1], j[2], j[3].isoformat()) for j in records)
+            return i
+        os.remove(self.spill_path)
+        self.stats['rows'] += len(records)
+        return len(records)
+
+    def get_stats(self) -> dict:
+        '''
+        Get statistics of writer.
+
+        Returns
+        -------
+        dict
+            Count of rows, batches, spilled and lost rows, rows per second, size of queue, state of writer.
+        '''
+        stats = dict(self.stats)
+        stats['rows_per_second'] = stats['rows'] / stats['write_seconds'] if stats['write_seconds'] else None
+        stats['queue_size'] = self.queue.qsize()
+        stats['alive'] = self.thread.is_alive()
+        return stats
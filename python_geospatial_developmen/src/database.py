@@ -3,16 +3,28 @@ from .params import params
 
 # Work with database and SQL
 from sqlalchemy.engine import URL
-from sqlalchemy import create_engine, select, Table, Column, MetaData, Integer, DateTime, Text, Float, JSON
-from sqlalchemy.engine.base import Engine
+from sqlalchemy import (
+    create_engine, select, exists, func, or_, Table, Column, MetaData, Integer, DateTime, Text, Float, JSON, event, exc
+)
+from sqlalchemy.engine.base import Engine, Connection
 from sqlalchemy.sql.expression import Executable
 from geoalchemy2 import Geometry
 # For work with date
-from datetime import datetime
+from datetime import datetime, timedelta
+# For work with time
+import time
+# Work with parallelism and processes
+import os
+import threading
+import atexit
 # For work with data type
-from typing import Union, List
+from typing import Union, List, Iterator
 # Fro work with data frame
 from pandas import DataFrame
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
 
 metadata = MetaData(schema='geo')
 
@@ -75,32 +87,232 @@ table_polygon = Table(
     comment='Координаты домов'
 )
 
+table_dead_letter = Table(
+    'dead_letter',
+    metadata,
+    Column(
+        'kind',
+        Text,
+        comment='Вид элемента (address)'
+    ),
+    Column(
+        'key',
+        Text,
+        comment='Ключ элемента (адрес)'
+    ),
+    Column(
+        'error',
+        Text,
+        comment='Текст ошибки'
+    ),
+    Column(
+        'attempts',
+        Integer,
+        comment='Количество попыток'
+    ),
+    Column(
+        'reason',
+        Text,
+        comment='Причина (permanent - постоянная ошибка, exhausted - исчерпаны попытки)'
+    ),
+    Column('load_dttm', DateTime, default=datetime.utcnow, comment='Дата и время вставки данных (UTC)'),
+    comment='Элементы с постоянными ошибками загрузки'
+)
+
+
+class PoolStats:
+    '''
+    Статистика пула соединений с базой данных.
+    '''
+    def __init__(self) -> None:
+        '''
+        Init.
+        '''
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.checkouts = 0
+        self.checkout_seconds = 0.0
+        self.checkout_seconds_max = 0.0
+        self.fork_reconnects = 0
+
+    def add_checkout(self, seconds: float) -> None:
+        '''
+        Count checkout of connection.
+
+        Parameters
+        ----------
+        seconds : float
+            Time of checkout (with connect and pre-ping).
+        '''
+        with self.lock:
+            self.checkouts += 1
+            self.checkout_seconds += seconds
+            self.checkout_seconds_max = max(self.checkout_seconds_max, seconds)
+
+
+# Engines of process by url of database (engine is created once and shared by all Database)
+engines = {}
+engines_lock = threading.Lock()
+
+
+def create_pooled_engine(url: URL, stats: PoolStats) -> Engine:
+    '''
+    Create engine with pool of connections. Connections of parent process are not used
+    and are not closed in child process (fork of process pool), child opens its own connections.
+
+    Parameters
+    ----------
+    url : URL
+        Url of database.
+    stats : PoolStats
+        Statistics of pool.
+
+    Returns
+    -------
+    Engine
+        Engine for sqlalchemy.
+    '''
+    engine = create_engine(
+        url,
+        pool_size=params.get('postgres_pool_size'),
+        max_overflow=params.get('postgres_max_overflow'),
+        pool_timeout=params.get('postgres_pool_timeout'),
+        pool_recycle=params.get('postgres_pool_recycle'),
+        pool_pre_ping=params.get('postgres_pool_pre_ping')
+    )
+
+    @event.listens_for(engine, 'connect')
+    def connect(dbapi_connection, connection_record):
+        connection_record.info['pid'] = os.getpid()
+        with stats.lock:
+            stats.connections += 1
+
+    @event.listens_for(engine, 'checkout')
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        if connection_record.info['pid'] != os.getpid():
+            # Connection of parent: forget it without close, pool connects again
+            connection_record.dbapi_connection = connection_proxy.dbapi_connection = None
+            with stats.lock:
+                stats.fork_reconnects += 1
+            raise exc.DisconnectionError('Connection belongs to other process')
+
+    return engine
+
+
+def dispose_engines() -> None:
+    '''
+    Close connections of all engines of process (at shutdown).
+    '''
+    with engines_lock:
+        for engine, stats in engines.values():
+            engine.dispose()
+        engines.clear()
+
+
+atexit.register(dispose_engines)
+
 
 class Database():
     def __init__(self):
         self.params = params
 
+    @property
+    def url(self) -> URL:
+        '''
+        Get url of database.
+
+        Returns
+        -------
+        URL
+            Url of database.
+        '''
+        return URL.create(
+            username=self.params.get('postgres_login'),
+            password=self.params.get('postgres_password'),
+            host=self.params.get('postgres_host'),
+            port=self.params.get('postgres_port'),
+            database=self.params.get('postgres_database'),
+            drivername='postgresql'
+        )
+
     @property
     def engine(self) -> Engine:
-            '''
-            Create engine.
-
-            Returns
-            -------
-            Engine
-                Engine for sqlalchemy.
-            '''
-            engine = create_engine(
-                URL.create(
-                    username=self.params.get('postgres_login'),
-                    password=self.params.get('postgres_password'),
-                    host=self.params.get('postgres_host'),
-                    port=self.params.get('postgres_port'),
-                    database=self.params.get('postgres_database'),
-                    drivername='postgresql'
-                    )
-            )
-            return engine
+        '''
+        Get engine of process (it is created at the first call).
+
+        Returns
+        -------
+        Engine
+            Engine for sqlalchemy.
+        '''
+        return self.get_engine()[0]
+
+    def get_engine(self) -> tuple:
+        '''
+        Get engine of process and statistics of its pool.
+
+        Returns
+        -------
+        tuple
+            Engine and statistics of pool.
+        '''
+        key = str(self.url)
+        with engines_lock:
+            if key not in engines:
+                stats = PoolStats()
+                engines[key] = (create_pooled_engine(self.url, stats), stats)
+            return engines[key]
+
+    def connect(self) -> Connection:
+        '''
+        Get connection from pool (time of checkout is counted).
+
+        Returns
+        -------
+        Connection
+            Connection.
+        '''
+        engine, stats = self.get_engine()
+        start = time.perf_counter()
+        connection = engine.connect()
+        stats.add_checkout(time.perf_counter() - start)
+        return connection
+
+    def get_pool_stats(self) -> dict:
+        '''
+        Get statistics of pool of connections.
+
+        Returns
+        -------
+        dict
+            Size of pool, checked out and overflow connections, count of connections and checkouts,
+            mean and maximum time of checkout.
+        '''
+        engine, stats = self.get_engine()
+        with stats.lock:
+            result = {
+                'connections': stats.connections,
+                'checkouts': stats.checkouts,
+                'fork_reconnects': stats.fork_reconnects,
+                'checkout_seconds_mean': stats.checkout_seconds / stats.checkouts if stats.checkouts else None,
+                'checkout_seconds_max': stats.checkout_seconds_max
+            }
+        result.update({
+            'pool_size': engine.pool.size(),
+            'checked_in': engine.pool.checkedin(),
+            'checked_out': engine.pool.checkedout(),
+            'overflow': engine.pool.overflow()
+        })
+        return result
+
+    def dispose(self) -> None:
+        '''
+        Close connections of engine (new engine is created at the next call).
+        '''
+        key = str(self.url)
+        with engines_lock:
+            if key in engines:
+                engines.pop(key)[0].dispose()
 
     def execute(self, query: Union[str, Executable], return_result: bool = False) -> Union[None, List]:
         '''
@@ -116,20 +328,66 @@ class Database():
         Union[None, List]
             Query columns and query result.
         '''
-        with self.engine.connect() as con:
-                rows = con.execute(query)
-                columns = rows.keys()
-        if return_result:
-            return [columns, rows]
+        with self.connect() as con:
+            result = con.execute(query)
+            if return_result:
+                # Rows are fetched before connection is returned to pool
+                return [list(result.keys()), result.fetchall()]
 
-    def get_house_df(self) -> DataFrame:
+    def stream(
+        self,
+        query: Executable,
+        chunk_size: int = None,
+        output: str = 'pandas'
+    ) -> Iterator[Union[DataFrame, 'pyarrow.Table']]:
         '''
-        Get house from database.
+        Execute query with server-side cursor and get result by chunks
+        (only one chunk is in memory, connection is held until iterator is exhausted or closed).
+
+        Parameters
+        ----------
+        query : Executable
+            Query.
+        chunk_size : int, optional
+            Count of rows in chunk, by default params['postgres_chunk_size'].
+        output : str, optional
+            Type of chunk: pandas or arrow, by default pandas.
 
         Returns
         -------
-        DataFrame
-            Result dataframe.
+        Iterator[Union[DataFrame, pyarrow.Table]]
+            Chunks of result.
+        '''
+        chunk_size = chunk_size or self.params.get('postgres_chunk_size')
+        if output not in ['pandas', 'arrow']:
+            raise ValueError(f'Unknown output of stream: {output}')
+        if output == 'arrow' and pyarrow is None:
+            raise ImportError('pyarrow is not installed')
+        with self.connect() as con:
+            result = con.execution_options(stream_results=True, max_row_buffer=chunk_size).execute(query)
+            columns = list(result.keys())
+            for rows in result.partitions(chunk_size):
+                if output == 'arrow':
+                    yield pyarrow.Table.from_pydict({
+                        column: list(values) for column, values in zip(columns, zip(*rows))
+                    })
+                else:
+                    yield DataFrame(rows, columns=columns)
+
+    def get_house_query(self, start_address: str = None) -> Executable:
+        '''
+        Get query of houses without coordinates (ordered by address, so checkpoints of geocoding are ordered)
+        and without dead letter: permanent errors and exhausted attempts younger than params['dead_letter_retry_days'].
+
+        Parameters
+        ----------
+        start_address : str, optional
+            Houses with address from start_address (checkpoint of geocoding), by default all houses.
+
+        Returns
+        -------
+        Executable
+            Query.
         '''
         query = select([
             table_house.c.houseguid,
@@ -141,11 +399,75 @@ class Database():
             isouter=True
         ).where(
             table_address.c.longitude == None
+        ).where(
+            ~exists().where(
+                table_dead_letter.c.kind == 'address'
+            ).where(
+                table_dead_letter.c.key == table_house.c.address
+            ).where(
+                or_(
+                    table_dead_letter.c.reason == 'permanent',
+                    table_dead_letter.c.load_dttm > datetime.utcnow() - timedelta(
+                        days=self.params.get('dead_letter_retry_days')
+                    )
+                )
+            )
+        ).order_by(
+            table_house.c.address
         )
-        columns, rows = self.execute(query, return_result=True)
+        if start_address is not None:
+            query = query.where(table_house.c.address >= start_address)
+        return query
+
+    def get_house_df(self) -> DataFrame:
+        '''
+        Get house from database.
+
+        Returns
+        -------
+        DataFrame
+            Result dataframe.
+        '''
+        columns, rows = self.execute(self.get_house_query(), return_result=True)
         df = DataFrame(rows, columns=columns)
         return df
 
+    def get_house_chunks(self, chunk_size: int = None, start_address: str = None) -> Iterator[DataFrame]:
+        '''
+        Get house from database by chunks (server-side cursor).
+
+        Parameters
+        ----------
+        chunk_size : int, optional
+            Count of houses in chunk, by default params['postgres_chunk_size'].
+        start_address : str, optional
+            Houses with address from start_address, by default all houses.
+
+        Returns
+        -------
+        Iterator[DataFrame]
+            Chunks of houses.
+        '''
+        return self.stream(self.get_house_query(start_address), chunk_size=chunk_size)
+
+    def get_house_count(self, start_address: str = None) -> int:
+        '''
+        Get count of houses without coordinates.
+
+        Parameters
+        ----------
+        start_address : str, optional
+            Houses with address from start_address, by default all houses.
+
+        Returns
+        -------
+        int
+            Count of houses.
+        '''
+        query = select([func.count()]).select_from(self.get_house_query(start_address).subquery())
+        columns, rows = self.execute(query, return_result=True)
+        return rows[0][0]
+
     def insert_table_address(self, values: tuple) -> None:
         '''
         Insert data to table_address.
@@ -159,6 +481,20 @@ class Database():
         stmt = table_address.insert(values)
         self.execute(stmt)
 
+    def insert_table_dead_letter(self, values: tuple) -> None:
+        '''
+        Insert data to table_dead_letter.
+
+        Parameters
+        ----------
+        values : tuple
+            Values for insert (kind, key, error, attempts, reason).
+        '''
+        stmt = table_dead_letter.insert().values(
+            kind=values[0], key=values[1], error=values[2], attempts=values[3], reason=values[4]
+        )
+        self.execute(stmt)
+
     # def get_bypass_dict(
     #     self,
     #     first_number: int = 0,
@@ -0,0 +1,145 @@
+# For work with parameters
+from .params import params
+
+# Work with index of cache
+import sqlite3
+
+# Work with parallelism
+import threading
+
+# For work with time
+import time
+
+# For reqular expressions
+import re
+
+# For work with data type
+from typing import List
+
+
+class GeocodeCache:
+    '''
+    Постоянный кэш геокодирования (SQLite): координаты по нормализованному адресу и геокодеру.
+    Ненайденные адреса хранятся отдельным сроком жизни (отрицательный кэш).
+    '''
+    def __init__(self, path: str = None, ttl: float = None, negative_ttl: float = None) -> None:
+        '''
+        Init.
+
+        Parameters
+        ----------
+        path : str, optional
+            File of cache, by default params['geocode_cache_path'].
+        ttl : float, optional
+            Time to live of found coordinates in seconds, by default params['geocode_cache_ttl'].
+        negative_ttl : float, optional
+            Time to live of not found address in seconds, by default params['geocode_cache_negative_ttl'].
+        '''
+        self.params = params
+        self.path = path or self.params.get('geocode_cache_path')
+        self.ttl = ttl or self.params.get('geocode_cache_ttl')
+        self.negative_ttl = negative_ttl or self.params.get('geocode_cache_negative_ttl')
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS geocode (
+                provider TEXT NOT NULL,
+                key TEXT NOT NULL,
+                latitude REAL,
+                longitude REAL,
+                created REAL NOT NULL,
+                PRIMARY KEY (provider, key)
+            )''')
+        self.stats = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'writes': 0}
+
+    def get_key(self, address_text: str) -> str:
+        '''
+        Get key of address: case, ё, punctuation and spaces are normalized.
+
+        Parameters
+        ----------
+        address_text : str
+            Address (result of Scraper.prepare_text).
+
+        Returns
+        -------
+        str
+            Key of address.
+        '''
+        text = address_text.lower().replace('ё', 'е')
+        return ' '.join(re.sub(r'[,.;]', ' ', text).split())
+
+    def get(self, provider: str, address_text: str) -> List[float]:
+        '''
+        Get coordinates from cache.
+
+        Parameters
+        ----------
+        provider : str
+            Geocoder (yandex, nominatim).
+        address_text : str
+            Address.
+
+        Returns
+        -------
+        List[float]
+            [latitude, longitude], [0.0, 0.0] if address was not found,
+            None if address is not in cache or expired.
+        '''
+        key = self.get_key(address_text)
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT latitude, longitude, created FROM geocode WHERE provider = ? AND key = ?', (provider, key)
+            ).fetchone()
+            if row is not None:
+                found = row[0] is not None
+                if time.time() - row[2] <= (self.ttl if found else self.negative_ttl):
+                    self.stats['hits' if found else 'negative_hits'] += 1
+                    return [row[0], row[1]] if found else [0.0, 0.0]
+            self.stats['misses'] += 1
+        return None
+
+    def put(self, provider: str, address_text: str, coords: List[float]) -> None:
+        '''
+        Put coordinates into cache.
+
+        Parameters
+        ----------
+        provider : str
+            Geocoder (yandex, nominatim).
+        address_text : str
+            Address.
+        coords : List[float]
+            [latitude, longitude], [0.0, 0.0] if address was not found.
+        '''
+        latitude, longitude = coords if any(coords) else (None, None)
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO geocode (provider, key, latitude, longitude, created) VALUES (?, ?, ?, ?, ?)',
+                (provider, self.get_key(address_text), latitude, longitude, time.time())
+            )
+            self.stats['writes'] += 1
+
+    def get_stats(self) -> dict:
+        '''
+        Get statistics of cache.
+
+        Returns
+        -------
+        dict
+            Count of hits, negative hits, misses, writes and addresses, ratio of hits.
+        '''
+        with self.lock:
+            stats = dict(self.stats)
+            stats['addresses'] = self.conn.execute('SELECT COUNT(*) FROM geocode').fetchone()[0]
+        requests_number = stats['hits'] + stats['negative_hits'] + stats['misses']
+        stats['hit_ratio'] = (stats['hits'] + stats['negative_hits']) / requests_number if requests_number else None
+        return stats
+
+    def close(self) -> None:
+        '''
+        Close cache.
+        '''
+        with self.lock:
+            self.conn.close()
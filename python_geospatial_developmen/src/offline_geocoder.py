@@ -0,0 +1,316 @@
+# For work with parameters
+from .params import params
+# For work with database
+from .database import Database, table_address
+
+# For work with sql
+from sqlalchemy import select
+
+# For work with files
+import os
+import gzip
+import pickle
+import csv
+
+# For reqular expressions
+import re
+# For fuzzy matching
+import difflib
+
+# Work with parallelism
+import threading
+
+# For work with time
+import time
+
+# For work with data type
+from typing import List, Iterable, Tuple
+
+# Full names of types of street -> short names
+STREET_TYPES = {
+    'улица': 'ул',
+    'проспект': 'пр-кт',
+    'просп': 'пр-кт',
+    'пр': 'пр-кт',
+    'переулок': 'пер',
+    'шоссе': 'ш',
+    'бульвар': 'б-р',
+    'бул': 'б-р',
+    'набережная': 'наб',
+    'площадь': 'пл',
+    'тупик': 'туп',
+    'аллея': 'ал',
+    'микрорайон': 'мкр',
+    'поселок': 'п',
+    'пос': 'п',
+    'квартал': 'кв-л'
+}
+# Words of address what do not define street
+STOP_WORDS = {'россия', 'российская', 'федерация', 'г', 'город', 'москва'}
+# Number of house, letter is a suffix only if digit does not follow it (5к2 is корпус 2 of house 5, not house 5к)
+NUMBER = r'\d+(?:[а-я](?!\d))?'
+# Number of house with корпус and строение written without spaces (5к2, 5с1, 5к2с1 - addr:housenumber of OSM)
+HOUSE_NUMBER = rf'({NUMBER}(?:/{NUMBER})?)(?:к({NUMBER}))?(?:с({NUMBER}))?'
+HOUSE_PATTERN = re.compile(rf'(?:^|\s)(?:д|дом|вл|влд|владение)\s*{HOUSE_NUMBER}')
+KORPUS_PATTERN = re.compile(rf'(?:^|\s)(?:к|корп|корпус)\s*({NUMBER})')
+BUILDING_PATTERN = re.compile(rf'(?:^|\s)(?:с|стр|строение)\s*({NUMBER})')
+# Number of house at the end of address, only корпус and строение can follow it
+NUMBER_PATTERN = re.compile(
+    rf'(?:^|\s){HOUSE_NUMBER}(?=(?:\s+(?:к|корп|корпус|с|стр|строение)\s*{NUMBER})*\s*$)'
+)
+
+
+class OfflineGeocoder:
+    '''
+    Офлайн геокодер по локальному индексу адресов (снимок geo.address или выгрузка OSM):
+    точный поиск по нормализованной улице и дому, нечеткий - по вариантам дома (без корпуса, строения) и улицы
+    с теми же номерами (1-я и 2-я улица - разные улицы). Нечеткий результат возвращается только по запросу.
+    Индекс хранится на диске в сжатом виде и загружается в память.
+    '''
+    def __init__(self, path: str = None, fuzzy_cutoff: float = None) -> None:
+        '''
+        Init.
+
+        Parameters
+        ----------
+        path : str, optional
+            File of index, by default params['offline_index_path'] (index is loaded if file exists).
+        fuzzy_cutoff : float, optional
+            Minimum similarity of street for fuzzy match (0-1), by default params['offline_fuzzy_cutoff'].
+        '''
+        self.params = params
+        self.path = path or self.params.get('offline_index_path')
+        self.fuzzy_cutoff = fuzzy_cutoff or self.params.get('offline_fuzzy_cutoff')
+        self.index = {}
+        self.streets = {}
+        # Similar streets by street of query (houses of one street are geocoded with the same spelling)
+        self.similar_streets = {}
+        self.stats = {'hits': 0, 'fuzzy_hits': 0, 'misses': 0, 'seconds': 0.0}
+        self.lock = threading.Lock()
+        if os.path.exists(self.path):
+            self.load()
+
+    def parse(self, address_text: str) -> Tuple[str, str]:
+        '''
+        Parse address into normalized street and house.
+
+        Parameters
+        ----------
+        address_text : str
+            Address (raw or result of Scraper.prepare_text).
+
+        Returns
+        -------
+        Tuple[str, str]
+            Street (sorted words) and house (number, к - корпус, с - строение), house is '' if it is not found.
+        '''
+        text = address_text.lower().replace('ё', 'е').replace('_', '/')
+        text = re.sub(r'[.,;()"«»]', ' ', text)
+        text = re.sub(r'\b\d{6}\b', ' ', text)
+        house = ''
+        match = HOUSE_PATTERN.search(text) or NUMBER_PATTERN.search(text)
+        if match:
+            house, korpus, building = match.groups()
+            # корпус and строение written separately (д 5 корп 2 стр 1)
+            separate_korpus = KORPUS_PATTERN.search(text, match.end())
+            separate_building = BUILDING_PATTERN.search(text, match.end())
+            korpus = korpus or separate_korpus and separate_korpus.group(1)
+            building = building or separate_building and separate_building.group(1)
+            if korpus:
+                house += f'к{korpus}'
+            if building:
+                house += f'с{building}'
+            text = text[:match.start()]
+        words = [STREET_TYPES.get(i, i) for i in text.split() if i not in STOP_WORDS]
+        return ' '.join(sorted(words)), house
+
+    def build(self, records: Iterable[tuple]) -> int:
+        '''
+        Build index and save it into path.
+
+        Parameters
+        ----------
+        records : Iterable[tuple]
+            Addresses (address, latitude, longitude), addresses without coordinates are skipped.
+
+        Returns
+        -------
+        int
+            Count of addresses in index.
+        '''
+        index = {}
+        for address, latitude, longitude in records:
+            if not latitude or not longitude:
+                continue
+            street, house = self.parse(address)
+            if street:
+                index.setdefault(street, {})[house] = (float(latitude), float(longitude))
+        self.index = index
+        self.streets = self.get_streets()
+        temp_path = f'{self.path}.tmp'
+        with gzip.open(temp_path, 'wb') as f:
+            pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, self.path)
+        return sum(len(houses) for houses in index.values())
+
+    def build_from_database(self, database: Database = None) -> int:
+        '''
+        Build index from snapshot of geo.address (rows are streamed by chunks).
+
+        Parameters
+        ----------
+        database : Database, optional
+            Work with database, by default Database().
+
+        Returns
+        -------
+        int
+            Count of addresses in index.
+        '''
+        database = database or Database()
+        query = select([table_address.c.address, table_address.c.latitude, table_address.c.longitude])
+        return self.build(
+            record for chunk in database.stream(query) for record in chunk.itertuples(index=False, name=None)
+        )
+
+    def build_from_csv(self, path: str) -> int:
+        '''
+        Build index from csv file of addresses (for example export of OSM: address, latitude, longitude).
+
+        Parameters
+        ----------
+        path : str
+            File with columns address, latitude, longitude.
+
+        Returns
+        -------
+        int
+            Count of addresses in index.
+        '''
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            return self.build((row['address'], row['latitude'], row['longitude']) for row in reader)
+
+    def load(self) -> None:
+        '''
+        Load index from path.
+        '''
+        with gzip.open(self.path, 'rb') as f:
+            self.index = pickle.load(f)
+        self.streets = self.get_streets()
+
+    def get_streets(self) -> dict:
+        '''
+        Get streets of index by numbers of street and length (for fuzzy match).
+
+        Returns
+        -------
+        dict
+            Streets by numbers of street and length.
+        '''
+        self.similar_streets = {}
+        streets = {}
+        for street in self.index:
+            streets.setdefault((tuple(re.findall(r'\d+', street)), len(street)), []).append(street)
+        return streets
+
+    def get_similar_streets(self, street: str) -> List[str]:
+        '''
+        Get similar streets: numbers of street must be equal (2-я and 1-я Тверская-Ямская are different streets),
+        only streets of close length can have similarity not less than fuzzy_cutoff.
+
+        Parameters
+        ----------
+        street : str
+            Street.
+
+        Returns
+        -------
+        List[str]
+            The most similar streets.
+        '''
+        if street in self.similar_streets:
+            return self.similar_streets[street]
+        numbers = tuple(re.findall(r'\d+', street))
+        delta = int(len(street) * (1 - self.fuzzy_cutoff) / self.fuzzy_cutoff) + 1
+        candidates = [
+            i for length in range(len(street) - delta, len(street) + delta + 1)
+            for i in self.streets.get((numbers, length), [])
+        ]
+        self.similar_streets[street] = difflib.get_close_matches(street, candidates, n=3, cutoff=self.fuzzy_cutoff)
+        return self.similar_streets[street]
+
+    def find_house(self, houses: dict, house: str) -> tuple:
+        '''
+        Find house of street: exact, then without строение, without корпус
+        (other корпус or строение of the same number is another building and is not matched).
+
+        Parameters
+        ----------
+        houses : dict
+            Coordinates by house of street.
+        house : str
+            House.
+
+        Returns
+        -------
+        tuple
+            Coordinates and flag of exact match, None if house is not found.
+        '''
+        if house in houses:
+            return houses[house], True
+        number = re.match(r'[^кс]*', house).group()
+        for variant in [house.split('с')[0], number]:
+            if variant in houses:
+                return houses[variant], False
+        return None
+
+    def geocode(self, address_text: str, fuzzy: bool = False) -> List[float]:
+        '''
+        Geocode address by index (the same result as Scraper.yandex_geocoder).
+
+        Parameters
+        ----------
+        address_text : str
+            Address.
+        fuzzy : bool, optional
+            Return result of fuzzy match (similar street, house without корпус or строение), by default False.
+
+        Returns
+        -------
+        List[float]
+            [latitude, longitude], None if address is not in index.
+        '''
+        start = time.perf_counter()
+        street, house = self.parse(address_text)
+        result = None
+        if street in self.index:
+            result = self.find_house(self.index[street], house)
+        if result is not None and not result[1] and not fuzzy:
+            result = None
+        if result is None and street and fuzzy:
+            for similar_street in self.get_similar_streets(street):
+                result = self.find_house(self.index[similar_street], house)
+                if result is not None:
+                    result = (result[0], False)
+                    break
+        with self.lock:
+            self.stats['seconds'] += time.perf_counter() - start
+            self.stats['misses' if result is None else 'hits' if result[1] else 'fuzzy_hits'] += 1
+        return list(result[0]) if result is not None else None
+
+    def get_stats(self) -> dict:
+        '''
+        Get statistics of geocoder.
+
+        Returns
+        -------
+        dict
+            Count of addresses, exact and fuzzy hits, misses, mean microseconds of lookup.
+        '''
+        with self.lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['fuzzy_hits'] + stats['misses']
+        stats['addresses'] = sum(len(houses) for houses in self.index.values())
+        stats['lookup_microseconds_mean'] = stats.pop('seconds') / lookups * 1e6 if lookups else None
+        return stats
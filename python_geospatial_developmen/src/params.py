@@ -9,13 +9,61 @@ params = {
     'tor_control_port': os.environ.get('TOR_CONTROL_PORT'),
     'tor_socks_port': os.environ.get('TOR_SOCKS_PORT'),
     'tor_password': os.environ.get('TOR_PASSWORD'),
+    'tor_socks_ports': os.environ.get('TOR_SOCKS_PORTS', os.environ.get('TOR_SOCKS_PORT', '')).split(','),
+    'tor_circuits_per_port': 5,
+    'tor_max_failures': 3,
+    'http_pool_connections': 10,
+    'http_pool_maxsize': 25,
+    'http_timeout': 10,
+    'rate_limit_hosts': {'yandex.ru': 0.5, 'nominatim.openstreetmap.org': 1.0},
+    'rate_limit_default': 1.0,
+    'rate_limit_circuit': 0.2,
+    'rate_limit_increase': 0.01,
+    'rate_limit_decrease': 0.5,
+    'retry_max_attempts': 5,
+    'retry_base_delay': 1,
+    'retry_max_delay': 60,
+    'retry_status_codes': [403, 429, 500, 502, 503, 504],
+    'blocked_status_codes': [403, 429],
+    'retry_permanent_status_codes': [404, 410],
+    'breaker_failure_threshold': 20,
+    'breaker_reset_timeout': 60,
+    'response_cache_path': os.environ.get('RESPONSE_CACHE_PATH', 'response_cache'),
+    'response_cache_ttl': 30 * 24 * 60 * 60,
+    'response_cache_max_size': 2 * 1024 ** 3,
+    'response_cache_replay': False,
+    'response_cache_evict_every': 1000,
+    'response_cache_chunk_size': 1000,
     'url_reformagkh_moscow_region': 'https://www.reformagkh.ru/opendata/export/184',
     'url_yandex_geocoder': 'https://yandex.ru/maps/213/moscow/search/{text_url}',
     'url_current_ip': 'https://api.ipify.org/?format=json',
     'url_osm': 'https://nominatim.openstreetmap.org/search?',
+    # Usage policy of Nominatim requires identifying User-Agent: application and contact (email or url)
+    'nominatim_user_agent': os.environ.get('NOMINATIM_USER_AGENT', 'python_geospatial_developmen/1.0'),
     'postgres_host':  os.environ.get('POSTGRES_HOST'),
     'postgres_port':  os.environ.get('POSTGRES_PORT'),
     'postgres_database':  os.environ.get('POSTGRES_DATABASE'),
     'postgres_login':  os.environ.get('POSTGRES_LOGIN'),
-    'postgres_password':  os.environ.get('POSTGRES_PASSWORD')
+    'postgres_password':  os.environ.get('POSTGRES_PASSWORD'),
+    'postgres_pool_size': 5,
+    'postgres_max_overflow': 10,
+    'postgres_pool_timeout': 30,
+    'postgres_pool_recycle': 1800,
+    'postgres_pool_pre_ping': True,
+    'postgres_chunk_size': 10000,
+    'address_batch_size': 1000,
+    'address_flush_interval': 5,
+    'address_write_method': 'copy',
+    'address_spill_path': os.environ.get('ADDRESS_SPILL_PATH', 'address_spill.csv'),
+    'geocode_cache_path': os.environ.get('GEOCODE_CACHE_PATH', 'geocode_cache.db'),
+    'geocode_cache_ttl': 180 * 24 * 60 * 60,
+    'geocode_cache_negative_ttl': 7 * 24 * 60 * 60,
+    'geocode_provider': 'yandex',
+    # Days before addresses with exhausted attempts (not permanent errors) in dead letter are geocoded again
+    'dead_letter_retry_days': 1,
+    'geocode_workers': None,
+    'geocode_checkpoint_path': os.environ.get('GEOCODE_CHECKPOINT_PATH', 'geocode_checkpoint.json'),
+    'geocode_checkpoint_every': 500,
+    'offline_index_path': os.environ.get('OFFLINE_INDEX_PATH', 'offline_index.pkl.gz'),
+    'offline_fuzzy_cutoff': 0.9
 }
@@ -0,0 +1,307 @@
+# For work with parameters
+from .params import params
+
+# For work with index of cache
+import sqlite3
+
+# For work with compression and hashes
+import zlib
+import hashlib
+
+# For work with OS
+import os
+
+# Work with parallelism
+import threading
+
+# For work with time
+import time
+
+# For work with data type
+from typing import Iterator
+
+# For work with url
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+
+class CacheMissError(Exception):
+    '''
+    Ответа нет в кэше, а сеть выключена (режим воспроизведения).
+    '''
+
+
+class ResponseCache:
+    '''
+    Кэш HTTP ответов на диске: тела ответов хранятся сжатыми по хэшу содержимого,
+    индекс (url с параметрами -> хэш) хранится в SQLite; срок жизни и вытеснение по размеру.
+    '''
+    def __init__(self, path: str = None, ttl: float = None, max_size: int = None, replay: bool = None) -> None:
+        '''
+        Init.
+
+        Parameters
+        ----------
+        path : str, optional
+            Directory of cache, by default params['response_cache_path'].
+        ttl : float, optional
+            Time to live of response in seconds, by default params['response_cache_ttl'].
+        max_size : int, optional
+            Maximum size of compressed responses in bytes, by default params['response_cache_max_size'].
+        replay : bool, optional
+            Replay mode: responses only from cache (expired too), without network,
+            by default params['response_cache_replay'].
+        '''
+        self.params = params
+        self.path = path or self.params.get('response_cache_path')
+        self.ttl = ttl or self.params.get('response_cache_ttl')
+        self.max_size = max_size or self.params.get('response_cache_max_size')
+        self.replay = self.params.get('response_cache_replay') if replay is None else replay
+        os.makedirs(os.path.join(self.path, 'objects'), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(self.path, 'index.db'), check_same_thread=False, isolation_level=None)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS response (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS response_url_idx ON response (url)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS response_digest_idx ON response (digest)')
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+
+    def get_url(self, url: str, query: dict = None) -> str:
+        '''
+        Get canonical url: parameters are added to query and sorted.
+
+        Parameters
+        ----------
+        url : str
+            Url.
+        query : dict, optional
+            Parameters of query, by default None.
+
+        Returns
+        -------
+        str
+            Canonical url.
+        '''
+        parts = urlsplit(url)
+        query_list = parse_qsl(parts.query, keep_blank_values=True) + list((query or {}).items())
+        return urlunsplit((
+            parts.scheme.lower(),
+            parts.netloc.lower(),
+            parts.path,
+            urlencode(sorted((str(key), str(value)) for key, value in query_list)),
+            ''
+            ))
+
+    def get_object_path(self, digest: str) -> str:
+        '''
+        Get path of file of response.
+
+        Parameters
+        ----------
+        digest : str
+            Hash of content.
+
+        Returns
+        -------
+        str
+            Path.
+        '''
+        return os.path.join(self.path, 'objects', digest[:2], digest)
+
+    def get(self, url: str, query: dict = None) -> bytes:
+        '''
+        Get response from cache.
+
+        Parameters
+        ----------
+        url : str
+            Url.
+        query : dict, optional
+            Parameters of query, by default None.
+
+        Returns
+        -------
+        bytes
+            Content of response, None if response is not in cache or expired.
+        '''
+        url = self.get_url(url, query)
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute('SELECT digest, created FROM response WHERE key = ?', (key,)).fetchone()
+            if row is None or (not self.replay and now - row[1] > self.ttl):
+                self.stats['misses'] += 1
+                return None
+            self.conn.execute('UPDATE response SET accessed = ? WHERE key = ?', (now, key))
+            self.stats['hits'] += 1
+        try:
+            with open(self.get_object_path(row[0]), 'rb') as f:
+                return zlib.decompress(f.read())
+        except (OSError, zlib.error):
+            self.delete(url)
+            return None
+
+    def put(self, url: str, content: bytes, query: dict = None) -> None:
+        '''
+        Put response into cache.
+
+        Parameters
+        ----------
+        url : str
+            Url.
+        content : bytes
+            Content of response.
+        query : dict, optional
+            Parameters of query, by default None.
+        '''
+        url = self.get_url(url, query)
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        digest = hashlib.sha256(content).hexdigest()
+        path = self.get_object_path(digest)
+        if not os.path.exists(path):
+            data = zlib.compress(content)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+# Write into temporary file and rename, so reader never sees part of file
+            temp_path = f'{path}.{threading.get_ident()}.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        size = os.path.getsize(path)
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO response (key, url, digest, size, created, accessed) VALUES (?, ?, ?, ?, ?, ?)',
+                (key, url, digest, size, now, now)
+                )
+            self.stats['writes'] += 1
+            check_size = self.stats['writes'] % self.params.get('response_cache_evict_every') == 0
+        if check_size:
+            self.evict()
+
+    def delete(self, url: str, query: dict = None) -> None:
+        '''
+        Delete response from cache.
+
+        Parameters
+        ----------
+        url : str
+            Url.
+        query : dict, optional
+            Parameters of query, by default None.
+        '''
+        key = hashlib.sha256(self.get_url(url, query).encode('utf-8')).hexdigest()
+        with self.lock:
+            self.conn.execute('DELETE FROM response WHERE key = ?', (key,))
+
+    def get_size(self) -> int:
+        '''
+        Get size of compressed responses (file of identical responses is counted once).
+
+        Returns
+        -------
+        int
+            Size in bytes.
+        '''
+        with self.lock:
+            return self.conn.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM response)'
+                ).fetchone()[0]
+
+    def evict(self) -> int:
+        '''
+        Delete expired responses, then the least recently used responses until size of cache is under max_size.
+
+        Returns
+        -------
+        int
+            Count of deleted responses.
+        '''
+        with self.lock:
+            digests = {row[0] for row in self.conn.execute(
+                'SELECT digest FROM response WHERE created < ?', (time.time() - self.ttl,)
+                )}
+            deleted = self.conn.execute('DELETE FROM response WHERE created < ?', (time.time() - self.ttl,)).rowcount
+        excess = self.get_size() - self.max_size
+        if excess > 0:
+            with self.lock:
+                keys = []
+                for key, digest, size in self.conn.execute('SELECT key, digest, size FROM response ORDER BY accessed'):
+                    keys.append((key,))
+                    digests.add(digest)
+                    excess -= size
+                    if excess <= 0:
+                        break
+                self.conn.executemany('DELETE FROM response WHERE key = ?', keys)
+                deleted += len(keys)
+# Delete files what are not used by other urls
+        with self.lock:
+            for digest in digests:
+                if self.conn.execute('SELECT 1 FROM response WHERE digest = ?', (digest,)).fetchone() is None:
+                    try:
+                        os.remove(self.get_object_path(digest))
+                    except FileNotFoundError:
+                        pass
+            self.stats['evictions'] += deleted
+        return deleted
+
+    def iter_responses(self, prefix: str = '') -> Iterator[tuple]:
+        '''
+        Iterate over cached responses (for replay without network).
+
+        Parameters
+        ----------
+        prefix : str, optional
+            Prefix of url, by default '' (all responses).
+
+        Returns
+        -------
+        Iterator[tuple]
+            Url, content of response and time of load (seconds since epoch).
+        '''
+        prefix = self.get_url(prefix) if prefix else ''
+        last_url = ''
+        while True:
+            with self.lock:
+                rows = self.conn.execute(
+                    "SELECT url, digest, created FROM response WHERE url > ? AND url LIKE ? ESCAPE '\\' ORDER BY url LIMIT ?",
+                    (last_url, prefix.replace('%', r'\%').replace('_', r'\_') + '%', self.params.get('response_cache_chunk_size'))
+                    ).fetchall()
+            if not rows:
+                return
+            for url, digest, created in rows:
+                try:
+                    with open(self.get_object_path(digest), 'rb') as f:
+                        yield url, zlib.decompress(f.read()), created
+                except (OSError, zlib.error):
+                    continue
+            last_url = rows[-1][0]
+
+    def get_stats(self) -> dict:
+        '''
+        Get statistics of cache.
+
+        Returns
+        -------
+        dict
+            Count of hits, misses, writes, evictions, responses and size of cache.
+        '''
+        with self.lock:
+            responses = self.conn.execute('SELECT COUNT(*) FROM response').fetchone()[0]
+            stats = dict(self.stats)
+        stats['responses'] = responses
+        stats['size'] = self.get_size()
+        stats['hit_ratio'] = stats['hits'] / (stats['hits'] + stats['misses']) if stats['hits'] + stats['misses'] else None
+        return stats
+
+    def close(self) -> None:
+        '''
+        Close index of cache.
+        '''
+        with self.lock:
+            self.conn.close()
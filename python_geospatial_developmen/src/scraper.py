@@ -2,6 +2,8 @@
 from .params import params
 # For work with database
 from .database import Database, table_house, table_polygon
+# For batched write of coordinates
+from .address_writer import AddressWriter
 
 # For pulling data out of HTML
 from bs4 import BeautifulSoup
@@ -14,9 +16,19 @@ from requests.exceptions import ChunkedEncodingError
 from requests.sessions import Session
 import urllib
 # For work wit tor
-import stem
-from stem.control import Controller
-from stem.process import launch_tor_with_config
+from .tor_pool import TorCircuitPool, Circuit
+# For work with persistent HTTP sessions
+from .session_pool import SessionPool
+# For limit rate of requests
+from .rate_limiter import RateLimiter
+# For retries of requests
+from .retry import RetryPolicy, RetryableError, PermanentError
+# For cache of HTTP responses
+from .response_cache import ResponseCache, CacheMissError
+# For cache of coordinates
+from .geocode_cache import GeocodeCache
+# For geocoding by local index of addresses
+from .offline_geocoder import OfflineGeocoder
 # For reqular expressions
 import re
 # For work with data type
@@ -32,7 +44,10 @@ import json
 # For work with sql
 from sqlalchemy import dialects
 # Work with parallelism
-from multiprocessing.dummy import Pool as ThreadPool
+import threading
+import queue
+# For work with files
+import os
 # For work with loop
 from tqdm import tqdm
 
@@ -45,6 +60,17 @@ class Scraper():
     def __init__(self):
         self.params = params
         self.database = Database()
+        self.circuit_pool = TorCircuitPool()
+        self.session_pool = SessionPool()
+        self.rate_limiter = RateLimiter()
+        self.retry_policy = RetryPolicy()
+        self.response_cache = ResponseCache()
+        self.address_writer = AddressWriter(self.database)
+        self.geocode_cache = GeocodeCache()
+        self.offline_geocoder = OfflineGeocoder()
+        self.geocoders = {'yandex': self.yandex_geocoder, 'nominatim': self.nominatim_geocoder}
+        # Circuit of TOR of worker of geocoding pipeline
+        self.local = threading.local()
 
     def prepare_text(self, raw_text: str) -> str:
         '''
@@ -65,24 +91,34 @@ class Scraper():
         patern2 = re.compile(r'\sк.')
         return 'Россия, Москва, ' + patern2.sub(r' к', result)
 
+    def get_session(self, circuit: Circuit) -> Session:
+        '''
+        Get persistent session of circuit of TOR from pool.
+
+        Parameters
+        ----------
+        circuit : Circuit
+            Circuit of TOR.
+
+        Returns
+        -------
+        Session
+            Session with proxies of circuit.
+        '''
+        return self.session_pool.get_session(circuit)
+
     def change_session_ip(self) -> Session:
         '''
-        Change session IP.
+        Change session IP: circuit from pool gets new credentials (new circuit without NEWNYM).
 
         Returns
         -------
         Session
             Session with changed IP.
         '''
-        session = requests.session()
-        with Controller.from_port(address=params.get('tor_host'), port=int(params.get('tor_control_port'))) as controller:
-                controller.authenticate(password=params.get('tor_password'))
-                controller.signal(stem.Signal.NEWNYM)
-        session.proxies = {}
-        proxies = 'socks5h://{tor_host}:{tor_socks_port}'.format(tor_host=params.get('tor_host'), tor_socks_port=params.get('tor_socks_port'))
-        session.proxies['http'] = proxies
-        session.proxies['https'] = proxies
-        return session
+        circuit = self.circuit_pool.acquire()
+        self.circuit_pool.rotate(circuit)
+        return self.get_session(circuit)
 
     def check_ip(self, session: Session) -> dict:
         '''
@@ -98,48 +134,212 @@ class Scraper():
         dict
             Current IP.
         '''
-        result = session.get(params.get('url_current_ip'))
+        result = session.get(params.get('url_current_ip'), timeout=self.session_pool.timeout)
         return result.json()
 
-    def yandex_geocoder(self, address_text: str, delay: int = 5) -> List[str]:
+    def parse_yandex_geocoder(self, text: str) -> List[float]:
+        '''
+        Parse page of Yandex geocoder.
+
+        Parameters
+        ----------
+        text : str
+            Text of page.
+
+        Returns
+        -------
+        List[float]
+            [latitude, longitude], [0.0, 0.0] if address is not found.
+
+        Raises
+        ------
+        RetryableError
+            Page of block.
         '''
-        Yandex geocoder.
+        bsObj = BeautifulSoup(text, 'html5lib')
+        if re.findall('нам очень жаль', bsObj.text.lower()):
+            raise RetryableError('Page of block')
+        if bsObj.find_all("div", class_="toponym-card-title-view__coords"):
+            coords_text = bsObj.find_all("div", class_="toponym-card-title-view__coords")[0].text
+            coords_raw = re.sub(r'Координаты:|\s', '', coords_text).split(',')
+            return [float(i) for i in coords_raw]
+        return [0.0, 0.0]
+
+    def yandex_geocoder(self, address_text: str) -> List[str]:
+        '''
+        Yandex geocoder. Rate of requests is limited by rate_limiter instead of fixed delay,
+        pages are taken from cache of responses if they are there.
 
         Parameters
         ----------
         address_text : str
             Address.
-        delay : int
-            Delay in seconds for load page.
 
         Returns
         -------
         List[str]
             [latitude, longitude]
+
+        Raises
+        ------
+        PermanentError
+            Error is permanent or attempts are exhausted.
+        CacheMissError
+            Page is not in cache in replay mode.
         '''
-        # Loop until we get the coordinates
-        while True:
+        text_url = urllib.parse.quote(f'{address_text}')
+        url = self.params.get('url_yandex_geocoder').format(text_url=text_url)
+        # Responses are read from cache only in replay mode, coordinates are cached by geocode_cache
+        content = self.response_cache.get(url) if self.response_cache.replay else None
+        if content is not None:
             try:
-                text_url = urllib.parse.quote(f'{address_text}')
-                url = self.params.get('url_yandex_geocoder').format(text_url=text_url)
-                session = self.change_session_ip()
-                r = session.get(url)
-                time.sleep(delay)
-                bsObj = BeautifulSoup(r.text, 'html5lib')
-                if re.findall('нам очень жаль', bsObj.text.lower()):
-                    continue
-                if bsObj.find_all("div", class_="toponym-card-title-view__coords"):
-                    coords_text = bsObj.find_all("div", class_="toponym-card-title-view__coords")[0].text
-                    coords_raw = re.sub(r'Координаты:|\s', '', coords_text).split(',')
-                    latitude, longitude = [float(i) for i in coords_raw]
-                    break
-                else:
-                    latitude, longitude = [0.0, 0.0]
-                    break
-            except (ChunkedEncodingError, ConnectTimeout, ConnectionError, ReadTimeout, IndexError) as e:
-                continue
+                return self.parse_yandex_geocoder(content.decode('utf-8', errors='replace'))
+            except (RetryableError, IndexError, ValueError):
+                self.response_cache.delete(url)
+        if self.response_cache.replay:
+            raise CacheMissError(url)
+
+        def attempt() -> List[float]:
+            circuit = getattr(self.local, 'circuit', None) or self.circuit_pool.acquire()
+            self.rate_limiter.acquire(url, circuit)
+            try:
+                r = self.session_pool.get(url, circuit=circuit)
+            except (ChunkedEncodingError, ConnectTimeout, ConnectionError, ReadTimeout) as e:
+                self.circuit_pool.report(circuit, success=False)
+                raise RetryableError(f'{type(e).__name__}: {e}') from e
+            # Status is classified before parse, so page of error is never reported as success
+            if r.status_code in self.params.get('blocked_status_codes'):
+                # Block or rate limit: rotate circuit and slow down
+                self.circuit_pool.report(circuit, success=False, blocked=True)
+                self.rate_limiter.report(url, circuit, blocked=True)
+                raise RetryableError(f'HTTP {r.status_code}')
+            try:
+                self.retry_policy.check_status(r.status_code)
+                if not r.ok:
+                    raise RetryableError(f'HTTP {r.status_code}')
+            except RetryableError:
+                self.circuit_pool.report(circuit, success=False)
+                raise
+            try:
+                coords = self.parse_yandex_geocoder(r.text)
+            except RetryableError:
+                # Page of block (captcha) with status 200
+                self.circuit_pool.report(circuit, success=False, blocked=True)
+                self.rate_limiter.report(url, circuit, blocked=True)
+                raise
+            except (IndexError, ValueError) as e:
+                self.circuit_pool.report(circuit, success=False)
+                raise RetryableError(f'{type(e).__name__}: {e}') from e
+            self.circuit_pool.report(circuit, success=True)
+            self.rate_limiter.report(url, circuit)
+            self.response_cache.put(url, r.content)
+            return coords
+
+        # Attempts with backoff until we get the coordinates
+        latitude, longitude = self.retry_policy.run(url, attempt)
         return [latitude, longitude]
 
+    def nominatim_geocoder(self, address_text: str) -> List[float]:
+        '''
+        Nominatim (OpenStreetMap) geocoder: direct requests with identifying User-Agent,
+        attempts and breaker of host as in yandex_geocoder.
+
+        Parameters
+        ----------
+        address_text : str
+            Address.
+
+        Returns
+        -------
+        List[float]
+            [latitude, longitude], [0.0, 0.0] if address is not found.
+
+        Raises
+        ------
+        PermanentError
+            Error is permanent or attempts are exhausted.
+        CacheMissError
+            Response is not in cache in replay mode.
+        '''
+        params = {'format': 'json', 'limit': '1', 'q': address_text}
+        url = self.params.get('url_osm')
+        # Responses are read from cache only in replay mode, coordinates are cached by geocode_cache
+        content = self.response_cache.get(url, params) if self.response_cache.replay else None
+        if content is not None:
+            try:
+                return self.parse_nominatim_geocoder(content)
+            except (KeyError, ValueError):
+                self.response_cache.delete(url, params)
+        if self.response_cache.replay:
+            raise CacheMissError(url)
+        headers = {'User-Agent': self.params.get('nominatim_user_agent')}
+
+        def attempt() -> List[float]:
+            self.rate_limiter.acquire(url)
+            try:
+                r = requests.get(url, params=params, headers=headers, timeout=self.session_pool.timeout)
+                if r.status_code == 429:
+                    self.rate_limiter.report(url, blocked=True)
+                    raise RetryableError('HTTP 429')
+                self.retry_policy.check_status(r.status_code)
+                if r.status_code != 200:
+                    raise RetryableError(f'HTTP {r.status_code}')
+                coords = self.parse_nominatim_geocoder(r.content)
+                self.rate_limiter.report(url)
+                self.response_cache.put(url, r.content, params)
+                return coords
+            except (ChunkedEncodingError, ConnectTimeout, ConnectionError, ReadTimeout, KeyError, ValueError) as e:
+                raise RetryableError(f'{type(e).__name__}: {e}') from e
+
+        return self.retry_policy.run(url, attempt)
+
+    def parse_nominatim_geocoder(self, content: bytes) -> List[float]:
+        '''
+        Parse response of Nominatim.
+
+        Parameters
+        ----------
+        content : bytes
+            Response (json).
+
+        Returns
+        -------
+        List[float]
+            [latitude, longitude], [0.0, 0.0] if address is not found.
+        '''
+        places = json.loads(content)
+        if places:
+            return [float(places[0]['lat']), float(places[0]['lon'])]
+        return [0.0, 0.0]
+
+    def geocode(self, address_text: str, provider: str = None) -> List[float]:
+        '''
+        Geocode address: local index of addresses (if it is built, only exact match is final),
+        then cache of coordinates and geocoder.
+
+        Parameters
+        ----------
+        address_text : str
+            Address (result of prepare_text).
+        provider : str, optional
+            Geocoder: yandex or nominatim, by default params['geocode_provider'].
+
+        Returns
+        -------
+        List[float]
+            [latitude, longitude], [0.0, 0.0] if address is not found.
+        '''
+        provider = provider or self.params.get('geocode_provider')
+        if self.offline_geocoder.index:
+            coords = self.offline_geocoder.geocode(address_text, fuzzy=False)
+            if coords is not None:
+                return coords
+        coords = self.geocode_cache.get(provider, address_text)
+        if coords is None:
+            coords = self.geocoders[provider](address_text)
+            self.geocode_cache.put(provider, address_text, coords)
+        return coords
+
     def get_moscow_houses_df(self) -> pd.DataFrame:
         '''
         Get Moscow houses.
@@ -173,17 +373,47 @@ class Scraper():
 
     def insert_table_address(self, raw_text: str) -> None:
         '''
-        Insert values to table_address.
+        Insert values to table_address (through batched writer).
 
         Parameters
         ----------
         raw_text : str
             Raw text.
         '''
-        prepare_text = self.prepare_text(raw_text)
-        latitude, longitude = self.yandex_geocoder(address_text=prepare_text)
-        values = (raw_text, latitude, longitude)
-        self.database.insert_table_address(values)
+        self.insert_table_address_list([raw_text])
+
+    def insert_table_address_list(self, raw_text_list: List[str]) -> int:
+        '''
+        Insert values to table_address: addresses with the same key of cache are geocoded once,
+        not found addresses are not inserted.
+
+        Parameters
+        ----------
+        raw_text_list : List[str]
+            Raw texts.
+
+        Returns
+        -------
+        int
+            Count of geocoded distinct addresses.
+        '''
+        groups = {}
+        for raw_text in raw_text_list:
+            prepare_text = self.prepare_text(raw_text)
+            groups.setdefault(self.geocode_cache.get_key(prepare_text), (prepare_text, []))[1].append(raw_text)
+        for prepare_text, raw_texts in groups.values():
+            try:
+                latitude, longitude = self.geocode(prepare_text)
+            except PermanentError as e:
+                for raw_text in raw_texts:
+                    self.database.insert_table_dead_letter(('address', raw_text, str(e), e.attempts, e.reason))
+                continue
+            # Not found address is not written: house is selected again and retried after negative ttl of cache
+            if not any((latitude, longitude)):
+                continue
+            for raw_text in raw_texts:
+                self.address_writer.put((raw_text, latitude, longitude))
+        return len(groups)
 
     def get_region_polygon(self, query: str = 'Москва Южный административный округ') -> tuple:
         '''
@@ -200,11 +430,22 @@ class Scraper():
             Tuple of the region data.
         '''
         params = {'format': 'json', 'limit': '1', 'polygon_geojson': '10', 'q': query}
-        region = requests.get(self.params.get('url_osm'), params=params)
+        url = self.params.get('url_osm')
+        # Responses are read from cache only in replay mode
+        content = self.response_cache.get(url, params) if self.response_cache.replay else None
+        if content is None:
+            if self.response_cache.replay:
+                raise CacheMissError(url)
+            self.rate_limiter.acquire(url)
+            region = requests.get(url, params=params)
+            region.raise_for_status()
+            content = region.content
+            self.response_cache.put(url, content, params)
+        region_json = json.loads(content)
 
 # Get min and max coordinates
-        min_coordinates = region.json()[0]['boundingbox'][0::2]
-        max_coordinates = region.json()[0]['boundingbox'][1::2]
+        min_coordinates = region_json[0]['boundingbox'][0::2]
+        max_coordinates = region_json[0]['boundingbox'][1::2]
 
 # Get polygon
         polygon_rectangle = Polygon([
@@ -213,7 +454,7 @@ class Scraper():
             (float(max_coordinates[1]), float(max_coordinates[0])),
             (float(max_coordinates[1]), float(min_coordinates[0]))
         ])
-        return (region.json(), polygon_rectangle, min_coordinates, max_coordinates)
+        return (region_json, polygon_rectangle, min_coordinates, max_coordinates)
 
     def insert_table_polygon(self) -> None:
         '''
@@ -234,36 +475,227 @@ class Scraper():
 
     def insert_table_address_from_df(self) -> None:
         '''
-        Insert to table_address from table_hose.
-        '''
-        df = self.database.get_house_df()
-        for index, row in tqdm(df.iterrows(), total=df.shape[0]):
-            self.insert_table_address(row.get('address'))
-
-    # def mass_insert_table_address(self, multiplicity_number: int=25) -> None:
-    #     '''
-    #     Mass insert data to table_address.
-
-    #     Parameters
-    #     ----------
-    #     multiplicity_number : int, optional
-    #         Multiplicity number for generate bypass dict and
-    #         set thread count, by default 25
-    #     '''
-
-    #     # Get house dataframe.
-    #     df = self.database.get_house_df()
-
-    #     # Get bypass dataframe
-    #     bypass_dict = self.database.get_bypass_dict(
-    #         last_number=df.shape[0],
-    #         multiplicity_number=multiplicity_number
-    #     )
-
-    #     # Get data
-    #     with ThreadPool(multiplicity_number) as p:
-    #         for i in tqdm(bypass_dict.keys()):
-    #             p.map(
-    #                 self.insert_table_address,
-    #                 df[bypass_dict[i][0]:bypass_dict[i][1]]['address']
-    #             )
\ No newline at end of file
+        Insert to table_address from table_hose (houses are read by chunks, addresses of chunk are deduplicated).
+        '''
+        progress = tqdm(total=self.database.get_house_count())
+        for chunk in self.database.get_house_chunks():
+            self.insert_table_address_list(chunk['address'].tolist())
+            progress.update(chunk.shape[0])
+        progress.close()
+        self.address_writer.flush()
+
+    def replay_table_address(self) -> dict:
+        '''
+        Insert to table_address from cached pages of geocoder (without network).
+
+        Returns
+        -------
+        dict
+            Count of inserted and missed addresses.
+        '''
+        stats = {'inserted': 0, 'missed': 0}
+        replay = self.response_cache.replay
+        self.response_cache.replay = True
+        try:
+            progress = tqdm(total=self.database.get_house_count())
+            for chunk in self.database.get_house_chunks():
+                for raw_text in chunk['address']:
+                    try:
+                        self.insert_table_address(raw_text)
+                        stats['inserted'] += 1
+                    except CacheMissError:
+                        stats['missed'] += 1
+                    progress.update()
+            progress.close()
+            self.address_writer.flush()
+        finally:
+            self.response_cache.replay = replay
+        return stats
+
+    def geocode_worker(self, number: int, tasks: queue.Queue, results: queue.Queue) -> None:
+        '''
+        Worker of geocoding pipeline: worker uses its own circuit of TOR.
+
+        Parameters
+        ----------
+        number : int
+            Number of worker.
+        tasks : queue.Queue
+            Tasks (number, prepared address, raw addresses), None - stop.
+        results : queue.Queue
+            Results (number, count of houses, status, first raw address).
+        '''
+        self.local.circuit = self.circuit_pool.circuits[number % len(self.circuit_pool.circuits)]
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            task_number, prepare_text, raw_texts = task
+            try:
+                latitude, longitude = self.geocode(prepare_text)
+                # Not found address is not written: house is selected again and retried after negative ttl of cache
+                if not any((latitude, longitude)):
+                    status = 'not_found'
+                else:
+                    for raw_text in raw_texts:
+                        self.address_writer.put((raw_text, latitude, longitude))
+                    status = 'inserted'
+            except PermanentError as e:
+                for raw_text in raw_texts:
+                    self.database.insert_table_dead_letter(('address', raw_text, str(e), e.attempts, e.reason))
+                status = 'failed'
+            except CacheMissError:
+                status = 'missed'
+            except Exception as e:
+                status = f'error: {type(e).__name__}: {e}'
+            results.put((task_number, len(raw_texts), status, raw_texts[0]))
+
+    def read_checkpoint(self, path: str) -> dict:
+        '''
+        Read checkpoint of geocoding.
+
+        Parameters
+        ----------
+        path : str
+            File of checkpoint.
+
+        Returns
+        -------
+        dict
+            Checkpoint, empty if file does not exist.
+        '''
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def write_checkpoint(self, checkpoint: dict, path: str) -> None:
+        '''
+        Write checkpoint of geocoding (addresses are written before checkpoint).
+
+        Parameters
+        ----------
+        checkpoint : dict
+            Checkpoint.
+        path : str
+            File of checkpoint.
+        '''
+        self.address_writer.flush()
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def mass_insert_table_address(
+        self,
+        workers_number: int = None,
+        checkpoint_path: str = None,
+        resume: bool = True
+    ) -> dict:
+        '''
+        Mass insert data to table_address: houses are streamed from database, addresses of chunk are deduplicated
+        and geocoded by bounded count of workers (one circuit of TOR per worker).
+        Ordered checkpoint: all houses before address of checkpoint are processed, so restart of interrupted run
+        continues from address of checkpoint (final checkpoint has no address: next run starts from the beginning).
+
+        Parameters
+        ----------
+        workers_number : int, optional
+            Count of workers, by default params['geocode_workers'] (count of circuits).
+        checkpoint_path : str, optional
+            File of checkpoint, by default params['geocode_checkpoint_path'].
+        resume : bool, optional
+            Continue from checkpoint of interrupted run, by default True.
+
+        Returns
+        -------
+        dict
+            Count of houses, distinct addresses, inserted, not found, failed, missed addresses and errors,
+            addresses per minute.
+        '''
+        workers_number = workers_number or self.params.get('geocode_workers') or len(self.circuit_pool.circuits)
+        checkpoint_path = checkpoint_path or self.params.get('geocode_checkpoint_path')
+        checkpoint_every = self.params.get('geocode_checkpoint_every')
+        start_address = self.read_checkpoint(checkpoint_path).get('address') if resume else None
+        tasks, results = queue.Queue(maxsize=workers_number * 2), queue.Queue()
+        stats = {
+            'workers': workers_number,
+            'start_address': start_address,
+            'houses': 0,
+            'addresses': 0,
+            'inserted': 0,
+            'not_found': 0,
+            'failed': 0,
+            'missed': 0,
+            'errors': 0
+        }
+        start = time.perf_counter()
+
+        def produce() -> None:
+            task_number = 0
+            try:
+                for chunk in self.database.get_house_chunks(start_address=start_address):
+                    groups = {}
+                    for raw_text in chunk['address']:
+                        prepare_text = self.prepare_text(raw_text)
+                        key = self.geocode_cache.get_key(prepare_text)
+                        groups.setdefault(key, (prepare_text, []))[1].append(raw_text)
+                    for prepare_text, raw_texts in groups.values():
+                        tasks.put((task_number, prepare_text, raw_texts))
+                        task_number += 1
+            except Exception as e:
+                stats['last_error'] = f'{type(e).__name__}: {e}'
+            finally:
+                results.put(('end', task_number))
+                for _ in range(workers_number):
+                    tasks.put(None)
+
+        threads = [threading.Thread(target=produce, daemon=True)] + [
+            threading.Thread(target=self.geocode_worker, args=(i, tasks, results), daemon=True)
+            for i in range(workers_number)
+        ]
+        for thread in threads:
+            thread.start()
+
+        progress = tqdm(total=self.database.get_house_count(start_address))
+        done, next_number, tasks_number, last_checkpoint, checkpoint_address = {}, 0, None, 0, start_address
+        while tasks_number is None or next_number < tasks_number:
+            result = results.get()
+            if result[0] == 'end':
+                tasks_number = result[1]
+                continue
+            task_number, houses_number, status, raw_text = result
+            stats['houses'] += houses_number
+            stats['addresses'] += 1
+            if status.startswith('error'):
+                stats['errors'] += 1
+                stats['last_error'] = status
+            else:
+                stats[status] += 1
+            progress.update(houses_number)
+            done[task_number] = raw_text
+            # Checkpoint moves only over continuous prefix of finished tasks: first address of task
+            # is not less than addresses of previous tasks, so houses before it are processed
+            while next_number in done:
+                checkpoint_address = done.pop(next_number)
+                next_number += 1
+            if next_number - last_checkpoint >= checkpoint_every:
+                last_checkpoint = next_number
+                seconds = time.perf_counter() - start
+                self.write_checkpoint({
+                    'tasks': next_number,
+                    'address': checkpoint_address,
+                    'addresses_per_minute': stats['addresses'] / seconds * 60,
+                    'houses_per_minute': stats['houses'] / seconds * 60,
+                    'load_dttm': time.strftime('%Y-%m-%dT%H:%M:%S')
+                }, checkpoint_path)
+        progress.close()
+        for thread in threads:
+            thread.join()
+        self.address_writer.flush()
+
+        stats['seconds'] = time.perf_counter() - start
+        stats['addresses_per_minute'] = stats['addresses'] / stats['seconds'] * 60
+        stats['houses_per_minute'] = stats['houses'] / stats['seconds'] * 60
+        self.write_checkpoint(dict(stats, tasks=next_number), checkpoint_path)
+        return stats
@@ -0,0 +1,243 @@
+# For work with parameters
+from .params import params
+# For work with tor
+from .tor_pool import Circuit
+
+# For HTML query
+import requests
+from requests.adapters import HTTPAdapter
+
+# Work with parallelism
+import threading
+
+# For work with time
+import time
+
+
+class SessionStats:
+    '''
+    Статистика соединений пула сессий.
+    '''
+    def __init__(self) -> None:
+        '''
+        Init.
+        '''
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.handshake_seconds = 0.0
+
+    def add_request(self, response: requests.Response, *args, **kwargs) -> None:
+        '''
+        Count request (hook of session).
+
+        Parameters
+        ----------
+        response : requests.Response
+            Response.
+        '''
+        with self.lock:
+            self.requests += 1
+
+    def add_connection(self, seconds: float) -> None:
+        '''
+        Count new connection.
+
+        Parameters
+        ----------
+        seconds : float
+            Time of handshake (TCP, SOCKS and TLS).
+        '''
+        with self.lock:
+            self.connections += 1
+            self.handshake_seconds += seconds
+
+
+class PooledAdapter(HTTPAdapter):
+    '''
+    Адаптер с замером времени установки новых соединений.
+    '''
+    def __init__(self, stats: SessionStats, **kwargs) -> None:
+        '''
+        Init.
+
+        Parameters
+        ----------
+        stats : SessionStats
+            Statistics of connections.
+        '''
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def get_timed_pool_classes(self, pool_classes: dict) -> dict:
+        '''
+        Get classes of connection pools what measure time of connect.
+
+        Parameters
+        ----------
+        pool_classes : dict
+            Classes of connection pools by scheme.
+
+        Returns
+        -------
+        dict
+            Classes of connection pools by scheme.
+        '''
+        stats = self.stats
+        timed_pool_classes = {}
+        for scheme, pool_class in pool_classes.items():
+            class TimedConnection(pool_class.ConnectionCls):
+                def connect(self):
+                    start = time.perf_counter()
+                    super().connect()
+                    stats.add_connection(time.perf_counter() - start)
+            timed_pool_classes[scheme] = type(pool_class.__name__, (pool_class,), {'ConnectionCls': TimedConnection})
+        return timed_pool_classes
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = self.get_timed_pool_classes(self.poolmanager.pool_classes_by_scheme)
+
+    def proxy_manager_for(self, proxy: str, **proxy_kwargs):
+        is_new = proxy not in self.proxy_manager
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        if is_new:
+            manager.pool_classes_by_scheme = self.get_timed_pool_classes(manager.pool_classes_by_scheme)
+        return manager
+
+
+class SessionPool:
+    '''
+    Пул постоянных HTTP сессий по цепочкам TOR (keep-alive соединения переиспользуются).
+    '''
+    def __init__(
+        self,
+        pool_connections: int = None,
+        pool_maxsize: int = None,
+        timeout: int = None
+    ) -> None:
+        '''
+        Init.
+
+        Parameters
+        ----------
+        pool_connections : int, optional
+            Count of cached connection pools (hosts) of session, by default params['http_pool_connections'].
+        pool_maxsize : int, optional
+            Count of connections to one host of session, by default params['http_pool_maxsize'].
+        timeout : int, optional
+            Default timeout of request in seconds, by default params['http_timeout'].
+        '''
+        self.params = params
+        self.pool_connections = pool_connections or self.params.get('http_pool_connections')
+        self.pool_maxsize = pool_maxsize or self.params.get('http_pool_maxsize')
+        self.timeout = timeout or self.params.get('http_timeout')
+        self.proxies = 'socks5h://{tor_host}:{tor_socks_port}'.format(
+            tor_host=self.params.get('tor_host'),
+            tor_socks_port=self.params.get('tor_socks_port')
+            )
+        self.stats = SessionStats()
+        self.lock = threading.Lock()
+        self.sessions = {}
+
+    def create_session(self, proxies: str) -> requests.Session:
+        '''
+        Create session with pooled adapter.
+
+        Parameters
+        ----------
+        proxies : str
+            Proxy url.
+
+        Returns
+        -------
+        requests.Session
+            Session.
+        '''
+        session = requests.session()
+        adapter = PooledAdapter(
+            stats=self.stats,
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize
+            )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.proxies = {}
+        session.proxies['http'] = proxies
+        session.proxies['https'] = proxies
+        session.hooks['response'].append(self.stats.add_request)
+        return session
+
+    def get_session(self, circuit: Circuit = None) -> requests.Session:
+        '''
+        Get session of circuit. Session of rotated circuit is created again.
+
+        Parameters
+        ----------
+        circuit : Circuit, optional
+            Circuit of TOR, by default None (common proxy of TOR).
+
+        Returns
+        -------
+        requests.Session
+            Session.
+        '''
+        key = circuit.number if circuit else None
+        proxies = circuit.proxies if circuit else self.proxies
+        with self.lock:
+            if key in self.sessions:
+                session_proxies, session = self.sessions[key]
+                if session_proxies == proxies:
+                    return session
+                # Old session is not closed: other threads may still use it, connections are closed by garbage collector
+            session = self.create_session(proxies)
+            self.sessions[key] = (proxies, session)
+            return session
+
+    def get(self, url: str, circuit: Circuit = None, **kwargs) -> requests.Response:
+        '''
+        GET request via session of circuit with default timeout.
+
+        Parameters
+        ----------
+        url : str
+            Url.
+        circuit : Circuit, optional
+            Circuit of TOR, by default None (common proxy of TOR).
+
+        Returns
+        -------
+        requests.Response
+            Response.
+        '''
+        kwargs.setdefault('timeout', self.timeout)
+        return self.get_session(circuit).get(url, **kwargs)
+
+    def get_stats(self) -> dict:
+        '''
+        Get statistics of connections.
+
+        Returns
+        -------
+        dict
+            Count of requests and new connections, reuse ratio of connections, mean time of handshake.
+        '''
+        with self.stats.lock:
+            requests_number, connections = self.stats.requests, self.stats.connections
+            handshake_seconds = self.stats.handshake_seconds
+        return {
+            'sessions': len(self.sessions),
+            'requests': requests_number,
+            'connections': connections,
+            'reuse_ratio': 1 - connections / requests_number if requests_number else None,
+            'handshake_seconds_mean': handshake_seconds / connections if connections else None
+            }
+
+    def close(self) -> None:
+        '''
+        Close all sessions.
+        '''
+        with self.lock:
+            for _, session in self.sessions.values():
+                session.close()
+            self.sessions = {}
@@ -0,0 +1,48 @@
+# For work with tests
+import unittest
+
+# For work with files
+import os
+import tempfile
+
+# For work with address
+from src.offline_geocoder import OfflineGeocoder
+
+
+class TestOfflineGeocoder(unittest.TestCase):
+    def test_parse(self) -> None:
+        '''
+        Test parse of house: корпус and строение are not a letter of house, number at the end of address is house.
+        '''
+        geocoder = OfflineGeocoder()
+        addresses = {
+            'Москва, ул. Тверская, д. 5к2': ('тверская ул', '5к2'),
+            'ул. Тверская, д. 5с1': ('тверская ул', '5с1'),
+            'Тверская улица, дом 5/2к1с3': ('тверская ул', '5/2к1с3'),
+            'г. Москва, ул. Ленина, д. 12а, корп. 3, стр. 1': ('ленина ул', '12ак3с1'),
+            'ул. Новый Арбат, 5к2': ('арбат новый ул', '5к2'),
+            'ул. Новый Арбат, 5 корп 2 стр 1': ('арбат новый ул', '5к2с1'),
+            '2-я Тверская-Ямская ул., 10': ('2-я тверская-ямская ул', '10'),
+            'ул. 1905 года, 5а': ('1905 года ул', '5а')
+            }
+        for address, expected in addresses.items():
+            self.assertEqual(geocoder.parse(address), expected, address)
+
+    def test_geocode(self) -> None:
+        '''
+        Test fuzzy match: other number of street and other корпус are not matched, fuzzy result only by request.
+        '''
+        geocoder = OfflineGeocoder(path=os.path.join(tempfile.mkdtemp(), 'offline_index.pkl.gz'))
+        geocoder.build([
+            ('1-я Тверская-Ямская ул., д. 10', 55.77, 37.59),
+            ('3-й Самотечный пер., д. 2', 55.78, 37.61),
+            ('Новый Арбат ул., д. 5к1', 55.75, 37.58),
+            ('Новый Арбат ул., д. 7', 55.76, 37.57)
+            ])
+        self.assertEqual(geocoder.geocode('ул. Новый Арбат, 5к1'), [55.75, 37.58])
+        self.assertIsNone(geocoder.geocode('2-я Тверская-Ямская ул., д. 10', fuzzy=True))
+        self.assertIsNone(geocoder.geocode('1-й Самотечный пер., д. 2', fuzzy=True))
+        self.assertIsNone(geocoder.geocode('ул. Новый Арбат, 5к2', fuzzy=True))
+        self.assertIsNone(geocoder.geocode('ул. Новый Арбат, 7с1'))
+        self.assertEqual(geocoder.geocode('ул. Новый Арбат, 7с1', fuzzy=True), [55.76, 37.57])
+        self.assertEqual(geocoder.geocode('ул. Новый Арбатъ, 7', fuzzy=True), [55.76, 37.57])
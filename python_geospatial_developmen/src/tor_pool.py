@@ -0,0 +1,252 @@
+# For work with parameters
+from .params import params
+
+# For work with TOR
+from stem import Signal
+from stem.control import Controller
+
+# Work with parallelism
+import threading
+
+# For work with date-time
+import time
+
+# Work with random objects
+import secrets
+
+# For work with collections
+from collections import deque
+
+
+class Circuit:
+    '''
+    Цепочка TOR: SOCKS порт и учетные данные для изоляции (IsolateSOCKSAuth).
+    '''
+    def __init__(self, host: str, port: int, number: int, scheme: str = 'socks5h') -> None:
+        '''
+        Init.
+
+        Parameters
+        ----------
+        host : str
+            Host of TOR.
+        port : int
+            SOCKS port of TOR.
+        number : int
+            Number of circuit in pool.
+        scheme : str, optional
+            Scheme of proxy, by default 'socks5h'.
+        '''
+        self.host = host
+        self.port = port
+        self.number = number
+        self.scheme = scheme
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.rotations = 0
+        self.new_credentials()
+
+    def new_credentials(self) -> None:
+        '''
+        Generate new credentials: TOR builds new circuit for them.
+        '''
+        self.username = f'circuit{self.number}'
+        self.password = secrets.token_hex(8)
+
+    @property
+    def proxies(self) -> str:
+        '''
+        Proxy url of circuit.
+
+        Returns
+        -------
+        str
+            Proxy url.
+        '''
+        return f'{self.scheme}://{self.username}:{self.password}@{self.host}:{self.port}'
+
+    @property
+    def success_rate(self) -> float:
+        '''
+        Share of successful requests.
+
+        Returns
+        -------
+        float
+            Success rate, None if there are no requests.
+        '''
+        total = self.successes + self.failures
+        return self.successes / total if total else None
+
+
+class TorCircuitPool:
+    '''
+    Пул цепочек TOR с одним постоянным управляющим соединением.
+    '''
+    def __init__(
+        self,
+        socks_ports: list = None,
+        circuits_per_port: int = None,
+        max_failures: int = None,
+        scheme: str = 'socks5h'
+    ) -> None:
+        '''
+        Init.
+
+        Parameters
+        ----------
+        socks_ports : list, optional
+            SOCKS ports of TOR, by default params['tor_socks_ports'].
+        circuits_per_port : int, optional
+            Count of isolated circuits on every port, by default params['tor_circuits_per_port'].
+        max_failures : int, optional
+            Count of failures in a row before rotation of circuit, by default params['tor_max_failures'].
+        scheme : str, optional
+            Scheme of proxy, by default 'socks5h'.
+        '''
+        self.params = params
+        socks_ports = socks_ports or self.params.get('tor_socks_ports')
+        circuits_per_port = circuits_per_port or self.params.get('tor_circuits_per_port')
+        self.max_failures = max_failures or self.params.get('tor_max_failures')
+        self.circuits = [
+            Circuit(host=self.params.get('tor_host'), port=int(port), number=number, scheme=scheme)
+            for number, port in enumerate(
+                port for port in socks_ports for _ in range(circuits_per_port)
+                )
+            ]
+        self.lock = threading.Lock()
+        self.newnym_lock = threading.Lock()
+        self.next_number = 0
+        self.rotation_times = deque()
+        self.controller = None
+
+    def get_controller(self) -> Controller:
+        '''
+        Get persistent control connection (reconnect, if it is closed).
+
+        Returns
+        -------
+        Controller
+            Authenticated controller.
+        '''
+        if self.controller is None or not self.controller.is_alive():
+            self.controller = Controller.from_port(
+                address=self.params.get('tor_host'),
+                port=int(self.params.get('tor_control_port'))
+                )
+            self.controller.authenticate(password=self.params.get('tor_password'))
+        return self.controller
+
+    def acquire(self) -> Circuit:
+        '''
+        Get circuit for worker (round robin).
+
+        Returns
+        -------
+        Circuit
+            Circuit.
+        '''
+        with self.lock:
+            circuit = self.circuits[self.next_number % len(self.circuits)]
+            self.next_number += 1
+        return circuit
+
+    def rotate(self, circuit: Circuit) -> None:
+        '''
+        Rotate circuit: new credentials give new circuit without NEWNYM.
+
+        Parameters
+        ----------
+        circuit : Circuit
+            Circuit.
+        '''
+        with self.lock:
+            circuit.new_credentials()
+            circuit.rotations += 1
+            circuit.consecutive_failures = 0
+            self.rotation_times.append(time.monotonic())
+            self.prune_rotation_times()
+
+    def report(self, circuit: Circuit, success: bool, blocked: bool = False) -> None:
+        '''
+        Report result of request via circuit.
+        Circuit is rotated when it is blocked (rate limit, ban) or fails max_failures times in a row.
+
+        Parameters
+        ----------
+        circuit : Circuit
+            Circuit.
+        success : bool
+            Request is successful.
+        blocked : bool, optional
+            Response is rate limit or ban, by default False.
+        '''
+        with self.lock:
+            if success and not blocked:
+                circuit.successes += 1
+                circuit.consecutive_failures = 0
+                return
+            circuit.failures += 1
+            circuit.consecutive_failures += 1
+            rotate = blocked or circuit.consecutive_failures >= self.max_failures
+        if rotate:
+            self.rotate(circuit)
+
+    def newnym(self) -> None:
+        '''
+        Signal NEWNYM via persistent control connection (all circuits are changed).
+        '''
+        # Cooldown of NEWNYM is waited without lock of pool, so acquire and report are not blocked
+        with self.newnym_lock:
+            with self.lock:
+                controller = self.get_controller()
+            time.sleep(controller.get_newnym_wait())
+            controller.signal(Signal.NEWNYM)
+            with self.lock:
+                for circuit in self.circuits:
+                    circuit.new_credentials()
+                self.rotation_times.append(time.monotonic())
+                self.prune_rotation_times()
+
+    def prune_rotation_times(self) -> None:
+        '''
+        Drop rotations older than one minute.
+        '''
+        now = time.monotonic()
+        while self.rotation_times and now - self.rotation_times[0] > 60:
+            self.rotation_times.popleft()
+
+    def get_stats(self) -> dict:
+        '''
+        Get statistics of pool.
+
+        Returns
+        -------
+        dict
+            Rotations per minute and success rate of every circuit.
+        '''
+        with self.lock:
+            self.prune_rotation_times()
+            return {
+                'rotations_per_minute': len(self.rotation_times),
+                'circuits': [
+                    {
+                        'number': circuit.number,
+                        'port': circuit.port,
+                        'successes': circuit.successes,
+                        'failures': circuit.failures,
+                        'rotations': circuit.rotations,
+                        'success_rate': circuit.success_rate
+                    }
+                    for circuit in self.circuits
+                    ]
+                }
+
+    def close(self) -> None:
+        '''
+        Close control connection.
+        '''
+        if self.controller is not None:
+            self.controller.close()
+            self.controller = None